@@ -1,5 +1,6 @@
 import subprocess
 import re
+import planner_pool
 
 def extract_plan_from_prost(problem_instance, planner_settings="[Prost -s 1 -se [IPC2014]]"):
     """
@@ -12,7 +13,8 @@ def extract_plan_from_prost(problem_instance, planner_settings="[Prost -s 1 -se
     try:
         # Run PROST
         planner_settings="[Prost -s 1 -se [IPC2014]]"
-        prost_command = ["./prost.py", problem_instance, planner_settings]
+        prost_command = [planner_pool.configured("PROST_CLIENT", "./prost.py", planner_pool.FAKE_PROST),
+                         problem_instance, planner_settings]
         result = subprocess.run(prost_command, capture_output=True, text=True, check=True)
 
         #print(result)
@@ -0,0 +1,136 @@
+# async_planner.py
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import planner_pool
+import pddl_backend
+import run_context
+
+# --- Configuration ---
+FAST_DOWNWARD_SCRIPT = "fast-downward.py"
+FAST_DOWNWARD_ALIAS = "seq-sat-lama-2011"
+MAX_CONCURRENT = planner_pool.POOL_SIZE
+
+
+class AsyncPlanner:
+    """
+    asyncio backend for the planners. Every job is an asyncio subprocess, so a
+    single event loop can drive many planning runs without a thread per job.
+    At most max_concurrent planners run at once per event loop; cancelling a
+    plan() task or exceeding its timeout kills the planner's whole process group.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT, planner_script=planner_pool.PLANNER_SCRIPT,
+                 prost_client=planner_pool.PROST_CLIENT, fast_downward=FAST_DOWNWARD_SCRIPT):
+        self.planner_script = planner_script
+        self.prost_client = prost_client
+        self.fast_downward = fast_downward
+        self.max_concurrent = max_concurrent
+        # asyncio primitives belong to the loop they are first used on, and every
+        # asyncio.run() call has a loop of its own
+        self._semaphores = {}
+
+    def semaphore(self):
+        """The concurrency limit of the running event loop."""
+        loop = asyncio.get_running_loop()
+        for closed in [l for l in self._semaphores if l.is_closed()]:
+            del self._semaphores[closed]
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphores[loop]
+
+    async def run_command(self, command, timeout=None, check=False, pass_fds=()):
+        """Run a planner command and return its combined stdout/stderr as text."""
+        returncode, output = await self.run_command_status(command, timeout, pass_fds)
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command, output=output, stderr=output)
+        return output
+
+    async def run_command_status(self, command, timeout=None, pass_fds=()):
+        """Run a planner command and return (return code, combined stdout/stderr as text)."""
+        async with self.semaphore():
+            proc = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, start_new_session=True,
+                pass_fds=pass_fds)
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(proc)
+                logging.warning(f"Planner {command[0]} exceeded {timeout} s and was killed")
+                raise subprocess.TimeoutExpired(command, timeout)
+            except asyncio.CancelledError:
+                await self._kill(proc)
+                raise
+
+        return proc.returncode, stdout.decode(errors="replace")
+
+    async def _kill(self, proc):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+    async def plan(self, domain, instance, settings=planner_pool.PLANNER_ARGS, timeout=None, check=False):
+        """
+        Plan an instance and return the planner output.
+
+        RDDL instances are planned with PROST (domain None plans a named
+        instance through the PROST client). PDDL problems are planned with
+        Fast Downward, in which case settings is the search alias and the
+        result is a (planner output, plan text) tuple.
+        """
+        if str(instance).endswith(".pddl"):
+            alias = settings if settings != planner_pool.PLANNER_ARGS else FAST_DOWNWARD_ALIAS
+            return await self.plan_pddl(domain, instance, alias=alias, timeout=timeout, check=check)
+
+        if domain is None:
+            command = [self.prost_client, instance, settings]
+        else:
+            command = [self.planner_script, domain, os.fspath(instance), settings]
+        return await self.run_command(command, timeout, check, planner_pool.instance_fds(instance))
+
+    async def plan_pddl(self, domain, problem, plan_file="sas_plan", alias=FAST_DOWNWARD_ALIAS, timeout=None, check=False):
+        """
+        Run Fast Downward on a PDDL domain/problem and return (planner output, plan text).
+        The translated SAS+ task is cached; problems that only differ from a
+        cached one in their initial state skip translation and run the search only.
+        """
+        sas_cache = pddl_backend.get_cache()
+        # the task file is private to this call, so concurrent plans never search each other's task
+        with run_context.RunContext("pddl") as ctx:
+            task_file = ctx.file("output.sas")
+            key, reused = sas_cache.lookup(domain, problem, task_file)
+            output = ""
+            if not reused:
+                command = ["python3", self.fast_downward, "--sas-file", task_file, "--translate", domain, problem]
+                returncode, output = await self.run_command_status(command, timeout)
+                if returncode != 0:
+                    if check:
+                        raise subprocess.CalledProcessError(returncode, command, output=output, stderr=output)
+                    return output, None
+                sas_cache.store(key, problem, task_file)
+
+            command = ["python3", self.fast_downward, "--alias", alias, "--plan-file", plan_file, task_file]
+            output += await self.run_command(command, timeout, check)
+        return output, read_plan_file(plan_file)
+
+    async def plan_many(self, jobs, timeout=None):
+        """Plan several (domain, instance, settings) jobs concurrently, returning results in order."""
+        return await asyncio.gather(*(self.plan(d, i, s, timeout) for d, i, s in jobs), return_exceptions=True)
+
+
+def read_plan_file(plan_file):
+    """Read a Fast Downward plan; anytime aliases number their plans, so the last one is the best."""
+    candidates = [plan_file] if os.path.exists(plan_file) else []
+    index = 1
+    while os.path.exists(f"{plan_file}.{index}"):
+        candidates = [f"{plan_file}.{index}"]
+        index += 1
+    if not candidates:
+        return None
+    with open(candidates[0], "r") as f:
+        return f.read()
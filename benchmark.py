@@ -0,0 +1,219 @@
+# benchmark.py
+
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+import planner_pool
+import posthoc
+import prehoc
+import reactive
+import stage_timing
+
+# --- Configuration ---
+STRATEGIES = ("prehoc", "posthoc", "reactive")
+REGRESSION_TOLERANCE = 0.2  # relative slowdown/growth tolerated against the baseline
+MIN_REGRESSION_SECONDS = 0.05  # ignore differences below this (timer noise)
+MANIFEST_FILE = "manifest.json"
+
+
+def run_prehoc(domain_path, instance_path):
+    return prehoc.main_gui(domain_path, instance_path, concurrent=True, use_cache=False)
+
+
+def run_posthoc(domain_path, instance_path):
+    return posthoc.main_gui(domain_path, instance_path, use_cache=False)
+
+
+def run_reactive(domain_path, instance_path):
+    return reactive.main_gui(domain_path, instance_path)
+
+
+RUNNERS = {"prehoc": run_prehoc, "posthoc": run_posthoc, "reactive": run_reactive}
+
+
+def run_case(strategy, domain_path, instance_path, repeat=0):
+    """
+    Run one strategy on one instance and measure it. Meant to run in a fresh
+    worker process, so CPU time and peak RSS (of this process and of the
+    planner/simulator processes it started) belong to this case only.
+    The strategy's console output is swallowed.
+    """
+    start_wall = time.perf_counter()
+    start_self = resource.getrusage(resource.RUSAGE_SELF)
+    start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    error = None
+    plan = None
+    with stage_timing.collect() as stages, contextlib.redirect_stdout(io.StringIO()):
+        try:
+            plan = RUNNERS[strategy](domain_path, instance_path)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+    wall_time = time.perf_counter() - start_wall
+    end_self = resource.getrusage(resource.RUSAGE_SELF)
+    end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time = sum(end.ru_utime + end.ru_stime - start.ru_utime - start.ru_stime
+                   for start, end in ((start_self, end_self), (start_children, end_children)))
+    planner_pool.shutdown_pool()
+    return {
+        "strategy": strategy,
+        "instance": instance_path,
+        "repeat": repeat,
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "peak_rss_kb": max(end_self.ru_maxrss, end_children.ru_maxrss),
+        "plan_length": len(plan or []),
+        "error": error,
+        "stages": dict(stages),
+    }
+
+
+def find_instances(paths):
+    """Expand instance arguments: files are taken as they are, directories via their manifest or *.rddl."""
+    instances = []
+    for path in paths:
+        if not os.path.isdir(path):
+            instances.append(path)
+            continue
+        manifest = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            with open(manifest, "r") as f:
+                instances += [os.path.join(path, entry["file"]) for entry in json.load(f)["instances"]]
+        else:
+            instances += sorted(p for p in glob.glob(os.path.join(path, "*.rddl"))
+                                if not p.endswith("_alternative.rddl") and "domain" not in os.path.basename(p))
+    return instances
+
+
+def run_benchmark(domain_path, instances, strategies=STRATEGIES, repeats=1, processes=1):
+    """
+    Run every strategy on every instance (repeats times), each case in its own
+    worker process. Returns the report: the individual runs, a per-strategy
+    summary and the suite's wall time and throughput.
+    """
+    cases = [(s, domain_path, i, r) for r in range(repeats) for i in instances for s in strategies]
+    start = time.perf_counter()
+    # one case per worker process (chunksize 1), so no case inherits the caches of another
+    with multiprocessing.Pool(processes, maxtasksperchild=1) as pool:
+        runs = pool.starmap(run_case, cases, chunksize=1)
+    elapsed = time.perf_counter() - start
+    return {
+        "domain": domain_path,
+        "processes": processes,
+        "elapsed": elapsed,
+        "throughput": len(runs) / elapsed if elapsed > 0 else 0.0,
+        "summary": summarize(runs),
+        "runs": runs,
+    }
+
+
+def summarize(runs):
+    """Per strategy: run/error counts, mean and median wall time, mean stage times, peak RSS, throughput."""
+    summary = {}
+    for strategy in sorted({run["strategy"] for run in runs}):
+        selected = [run for run in runs if run["strategy"] == strategy]
+        walls = [run["wall_time"] for run in selected]
+        summary[strategy] = {
+            "runs": len(selected),
+            "errors": sum(1 for run in selected if run["error"]),
+            "mean_wall_time": statistics.mean(walls),
+            "median_wall_time": statistics.median(walls),
+            "mean_cpu_time": statistics.mean(run["cpu_time"] for run in selected),
+            "peak_rss_kb": max(run["peak_rss_kb"] for run in selected),
+            "throughput": len(selected) / sum(walls) if sum(walls) > 0 else 0.0,
+            "stages": {name: statistics.mean(run["stages"].get(name, 0.0) for run in selected)
+                       for name in stage_timing.STAGES},
+        }
+    return summary
+
+
+def compare_to_baseline(summary, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compare a summary with the summary of a stored report and return a list of
+    human-readable regressions (slower stages or wall time, higher peak RSS).
+    """
+    regressions = []
+
+    def check(label, value, reference):
+        if value > reference * (1 + tolerance) and value - reference > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{label}: {reference:.3f} -> {value:.3f}")
+
+    for strategy, current in summary.items():
+        reference = baseline.get(strategy)
+        if reference is None:
+            continue
+        check(f"{strategy} mean wall time [s]", current["mean_wall_time"], reference["mean_wall_time"])
+        for name, value in current["stages"].items():
+            check(f"{strategy} {name} [s]", value, reference["stages"].get(name, 0.0))
+        if current["peak_rss_kb"] > reference["peak_rss_kb"] * (1 + tolerance):
+            regressions.append(f"{strategy} peak RSS [kB]: {reference['peak_rss_kb']} -> {current['peak_rss_kb']}")
+        if current["errors"] > reference["errors"]:
+            regressions.append(f"{strategy} errors: {reference['errors']} -> {current['errors']}")
+    return regressions
+
+
+def write_json(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def write_csv(report, path):
+    """One row per run, with a column per stage."""
+    columns = ["strategy", "instance", "repeat", "wall_time", "cpu_time", "peak_rss_kb", "plan_length", "error"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns + [f"{name}_time" for name in stage_timing.STAGES])
+        for run in report["runs"]:
+            writer.writerow([run[c] for c in columns] + [run["stages"].get(name, 0.0) for name in stage_timing.STAGES])
+
+
+def print_summary(report):
+    print(f"{len(report['runs'])} runs in {report['elapsed']:.2f} s ({report['throughput']:.2f} runs/s)")
+    for strategy, s in report["summary"].items():
+        stages = ", ".join(f"{name} {value:.3f}" for name, value in s["stages"].items())
+        print(f"  {strategy}: {s['runs']} runs, {s['errors']} errors, mean {s['mean_wall_time']:.3f} s, "
+              f"peak RSS {s['peak_rss_kb']} kB | {stages}")
+
+
+def main():
+    """Run the benchmark suite headless and optionally check it against a baseline report."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("instances", nargs="+", help="Instance files or directories (a generator family or *.rddl)")
+    parser.add_argument("--domain", type=str, default="./domain.rddl", help="Path to the domain file")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=1, help="Cases run at the same time")
+    parser.add_argument("--json", type=str, help="Write the full report as JSON")
+    parser.add_argument("--csv", type=str, help="Write one row per run as CSV")
+    parser.add_argument("--baseline", type=str, help="Report to compare against")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    report = run_benchmark(args.domain, find_instances(args.instances), args.strategies, args.repeats, args.processes)
+    print_summary(report)
+    if args.json:
+        write_json(report, args.json)
+    if args.csv:
+        write_csv(report, args.csv)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["summary"]
+        regressions = compare_to_baseline(report["summary"], baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+
+if __name__ == "__main__":
+    main()
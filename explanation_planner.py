@@ -2,17 +2,23 @@ import os
 import subprocess
 from datetime import datetime
 import time
+import asyncio
+from async_planner import AsyncPlanner
 
 class ExplanationPlanning:
-    def __init__(self, domain_file, problem_file, pddl=True):
+    def __init__(self, domain_file, problem_file, pddl=True, plan_file="sas_plan", async_planner=None):
         """
         Initialize the explanation planning system with given PDDL or RDDL files.
         :param domain_file: Path to the domain file.
         :param problem_file: Path to the problem file.
+        :param plan_file: Path Fast Downward writes the plan to (PDDL only).
+        :param async_planner: Shared AsyncPlanner backend, so several instances can run on one event loop.
         """
         self.domain_file_path = domain_file
         self.problem_file_path = problem_file
+        self.plan_file_path = plan_file
         self.pddl_used = pddl
+        self.async_planner = async_planner or AsyncPlanner()
         if pddl == False:
             self.benchmark_path = "./example/"
     
@@ -24,7 +30,7 @@ class ExplanationPlanning:
         Include explanation actions proactively in the initial plan.
         """
         self.log("Generating plan with pre-hoc explanations.")
-        if self.pddl_used
+        if self.pddl_used:
             plan = self._run_planner_pddl()
         else:
             plan = self._run_planner_rddl()
@@ -67,7 +73,16 @@ class ExplanationPlanning:
         # Simulate the detection of a failure (can involve checking logs, feedback, etc.)
         pass
 
+    async def plan_async(self):
+        """Awaitable counterpart of pre_hoc_explanation for callers running an event loop."""
+        if self.pddl_used:
+            return await self._run_planner_pddl_async()
+        return await self._run_planner_rddl_async()
+
     def _run_planner_rddl(self):
+        return asyncio.run(self._run_planner_rddl_async())
+
+    async def _run_planner_rddl_async(self):
         """
         Run the Prost planner with a server in one method.
 
@@ -94,16 +109,11 @@ class ExplanationPlanning:
             print("\nRunning Prost planner...")
             problem_instance = "EXAMPLE_PROBLEM" # this must be automated
             settings = str("[Prost -s 1 -se [IPC2014]]") # this can be hardcoded
-            prost_command = ["./prost.py", problem_instance, settings]
-            prost_result = subprocess.run(prost_command, capture_output=True, text=True, check=True)
-            #prost_result = subprocess.Popen(prost_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            prost_output = await self.async_planner.plan(None, problem_instance, settings, check=True)
 
             print("Prost Output:")
-            if prost_result.stderr != '':
-                print(prost_result.stderr)
-            else:
-                print(prost_result.stdout)
-            return prost_result.stdout  # Return the planner's output for further processing if needed
+            print(prost_output)
+            return prost_output  # Return the planner's output for further processing if needed
 
             # Step 3: Wait for both processes to complete
             #prost_stdout, prost_stderr = prost_result.communicate()
@@ -130,36 +140,21 @@ class ExplanationPlanning:
             return None    
 
     def _run_planner_pddl(self):
+        return asyncio.run(self._run_planner_pddl_async())
+
+    async def _run_planner_pddl_async(self):
         self.log("Running the planner on the domain and problem files.")
         try:
-            command = [
-                "python3", "fast-downward.py",
-                "--alias", "seq-sat-lama-2011",
-                "--plan-file", self.plan_file_path,
-                self.domain_file_path,
-                self.problem_file_path
-            ]
-            
-            # Run the command and capture output
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            # Run Fast Downward (seq-sat-lama-2011) through the asyncio backend
+            output, plan = await self.async_planner.plan_pddl(
+                self.domain_file_path, self.problem_file_path, plan_file=self.plan_file_path, check=True)
 
             print("Planner Output (Python):")
-            print(result.stdout)
-
-            # Read the generated plan file
-            with open(self.plan_file_path+".1", "r") as plan_file_obj:
-                plan = plan_file_obj.read()
-                print("\nGenerated Plan:")
-                print(plan)
-                return result.stdout, plan
-
-
-            # Example call to an external planner (adjust command as needed for your planner)
-            result = subprocess.run(
-                ["fast-downward", "--domain", self.domain_file_path, "--problem", self.problem_file_path, "--search", "astar(blind)"],
-                capture_output=True, text=True, check=True
-            )
-            plan = result.stdout
+            print(output)
+
+            print("\nGenerated Plan:")
+            print(plan)
+            return output, plan
         except subprocess.CalledProcessError as e:
             self.log(f"Planner execution failed: {e.stderr}")
             plan = "No plan generated."
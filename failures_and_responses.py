@@ -1,12 +1,68 @@
-import random
 from collections import defaultdict
+from collections.abc import Mapping
+import numpy as np
 import pandas as pd
 
+# Domain failure object for each scenario of the model
+SCENARIO_FAILURES = {
+    "success": "normal_interaction",
+    "error": "agent_error",
+    "uncertainty": "uncertainty",
+    "inability": "agent_inability",
+    "suboptimal_behavior": "suboptimal_behavior",
+    "social_norm_violation": "social_norm_violation",
+    "unforeseen_circumstances": "unforeseen_circumstances",
+}
+
+
+class ProbabilityView(Mapping):
+    """
+    Dict-like view of a probability vector: reading goes to the array, and
+    assigning a value (or a dict of values for a matrix row) writes into it.
+    """
+
+    def __init__(self, array, index, column_index, on_change):
+        self.array = array
+        self.index = index
+        self.column_index = column_index
+        self.on_change = on_change
+
+    def __getitem__(self, key):
+        value = self.array[self.index[key]]
+        if value.ndim:
+            return ProbabilityView(value, self.column_index, None, self.on_change)
+        return float(value)
+
+    def __setitem__(self, key, value):
+        if isinstance(value, Mapping):
+            row = self.array[self.index[key]]
+            row[:] = [value[label] for label in self.column_index]
+        else:
+            self.array[self.index[key]] = value
+        self.on_change()
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
 class ScenarioResponseModel:
-    def __init__(self):
+    def __init__(self, seed=None):
         """
         Initialize the scenario-response model with predefined probabilities.
+
+        The probabilities are kept as a scenario x response matrix and a
+        scenario vector (rows/entries in the order of self.scenarios and
+        self.responses); the dict tables are views onto these arrays.
+
+        :param seed: Seed of the random generator used for randomization and sampling.
         """
+        self.rng = np.random.default_rng(seed)
         self.scenarios = [
             "success",  
             "error",
@@ -26,10 +82,29 @@ class ScenarioResponseModel:
             "continue_without_comment",
         ]
 
+        self.scenario_index = {scenario: i for i, scenario in enumerate(self.scenarios)}
+        self.response_index = {response: i for i, response in enumerate(self.responses)}
+
         # Initial scenario-response probabilities based on the paper
-        self.response_probability_table = self._initialize_response_probabilities()
+        table = self._initialize_response_probabilities()
+        self.response_matrix = np.array([[table[s][r] for r in self.responses] for s in self.scenarios])
         # Initial scenario probabilities based on the paper
-        self.scenario_probability_table = self._initialize_scenario_probabilities()
+        failure_probs = self._initialize_scenario_probabilities()
+        self.scenario_vector = np.array([failure_probs[SCENARIO_FAILURES[s]] for s in self.scenarios])
+        self._update()
+
+    def _update(self):
+        """Recompute the derived lookups after the arrays changed."""
+        self.best_responses = self.response_matrix.argmax(axis=1)
+        self.response_cdf = self.response_matrix.cumsum(axis=1)
+
+    @property
+    def response_probability_table(self):
+        return ProbabilityView(self.response_matrix, self.scenario_index, self.response_index, self._update)
+
+    @property
+    def scenario_probability_table(self):
+        return ProbabilityView(self.scenario_vector, self.scenario_index, None, self._update)
 
     def _initialize_response_probabilities(self):
         """
@@ -86,7 +161,7 @@ class ScenarioResponseModel:
 
         table["social_norm_violation"] = {
             "apology": 0.23,
-            "why_exfailure_probsplanation": 0.26,
+            "why_explanation": 0.26,
             "what_explanation": 0.18,
             "narrate_next_action": 0.16,
             "ask_for_help": 0.07,
@@ -118,36 +193,50 @@ class ScenarioResponseModel:
             "normal_interaction": 0.05,
         }
     
-    def randomize_probabilities(self):
+    def randomize_probabilities(self, concentration=1.0):
         """
         Randomize the probability values for response preferences and scenarios.
+        Every row and the scenario vector are drawn from a symmetric Dirichlet
+        distribution (concentration 1.0 is uniform over all distributions).
         """
-        # Randomize scenario and response probabilities
-        total_sc = 0.0
-        scenario_probs = {}
-
-        for scenario in self.scenarios:
-            prob = random.random()
-            scenario_probs[scenario] = prob
-            total_sc += prob
+        self.response_matrix[:] = self.rng.dirichlet(np.full(len(self.responses), concentration), len(self.scenarios))
+        self.scenario_vector[:] = self.rng.dirichlet(np.full(len(self.scenarios), concentration))
+        self._update()
 
-            total = 0.0
-            random_probs = {}
+    def randomized_tables(self, count, concentration=1.0):
+        """
+        Draw count independent randomized configurations at once, without
+        changing the model. Returns (response matrices of shape
+        (count, scenarios, responses), scenario vectors of shape (count, scenarios)).
+        """
+        matrices = self.rng.dirichlet(np.full(len(self.responses), concentration), (count, len(self.scenarios)))
+        vectors = self.rng.dirichlet(np.full(len(self.scenarios), concentration), count)
+        return matrices, vectors
 
-            for response in self.responses:
-                prob = random.random()
-                random_probs[response] = prob
-                total += prob
+    def sample_scenarios(self, count):
+        """Draw count scenario indices from the scenario vector."""
+        return self.rng.choice(len(self.scenarios), size=count, p=self.scenario_vector / self.scenario_vector.sum())
 
-            for response in self.responses:
-                random_probs[response] /= total
+    def sample_responses(self, scenario_indices):
+        """Draw one response index per scenario index from the matching matrix rows."""
+        scenario_indices = np.asarray(scenario_indices)
+        cdf = self.response_cdf[scenario_indices]
+        u = self.rng.random(len(scenario_indices)) * cdf[:, -1]
+        picks = (u[:, None] >= cdf).sum(axis=1)
+        return np.minimum(picks, len(self.responses) - 1)
 
-            self.response_probability_table[scenario] = random_probs
+    def sample(self, count):
+        """Draw count (scenario, response) pairs; returns two index arrays."""
+        scenario_indices = self.sample_scenarios(count)
+        return scenario_indices, self.sample_responses(scenario_indices)
 
-        for scenario in self.scenarios:
-            scenario_probs[scenario] /= total_sc
+    def best_response(self, scenario):
+        """Most likely response for a scenario."""
+        return self.responses[self.best_responses[self.scenario_index[scenario]]]
 
-        self.scenario_probability_table = scenario_probs
+    def get_failure_probabilities(self):
+        """Scenario probabilities keyed by the domain's failure objects (see SCENARIO_FAILURES)."""
+        return {SCENARIO_FAILURES[s]: float(p) for s, p in zip(self.scenarios, self.scenario_vector)}
 
     def get_response_probabilities(self):
         """
@@ -165,14 +254,14 @@ class ScenarioResponseModel:
         """
         Display the response probability table
         """
-        df = pd.DataFrame.from_dict(self.response_probability_table, orient="index", columns=self.responses)
+        df = pd.DataFrame(self.response_matrix, index=self.scenarios, columns=self.responses)
         print(df)
 
     def display_scenario_probabilities(self):
         """
         Display the scenario probabilitie table
         """
-        df = pd.DataFrame.from_dict(self.scenario_probability_table.items())
+        df = pd.DataFrame(list(zip(self.scenarios, self.scenario_vector)))
         print(df)
 
 # Example Usage
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# fake_prost.py
+
+"""
+Deterministic stand-in for PROST (run_prost.sh, run_prost_online.sh and the
+prost.py client). Accepts the same command lines and prints the same
+"** Actions received: [...]" records and "END OF ROUND" lines, so the
+pipeline can be run and profiled without a PROST install.
+
+The plan is either scripted or derived from the instance: drive to the
+wanted book, fetch it and bring it to the human, with a seeded draw of the
+instance's failure probabilities deciding whether a failure happens (the plan
+then gives the most likely response instead of the book).
+
+Environment:
+    FAKE_PROST_PLAN          scripted plan, actions separated by ';'
+    FAKE_PROST_LATENCY       seconds to wait before every step (default 0)
+    FAKE_PROST_ROUNDS        number of rounds to print (default 1)
+    FAKE_PROST_SEED          seed of the failure draws (default 0)
+    FAKE_PROST_INSTANCE_DIR  where to find <name>.rddl when only an instance name is given
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import rddl_model  # noqa: E402
+
+REWARD_COMPLETED = 100.0
+REWARD_OTHERWISE = -10.0
+DEFAULT_HORIZON = 15
+
+
+def parse_arguments(argv):
+    """Return the instance argument of any of the PROST command lines (None if there is none)."""
+    positional = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "-p":
+            next(args, None)
+        elif not arg.startswith("["):
+            positional.append(arg)
+    if len(positional) >= 2:
+        return positional[1]  # script form: domain, instance[, plan file]
+    return positional[0] if positional else None
+
+
+def load_instance(instance_arg):
+    if instance_arg is None:
+        return None
+    path = instance_arg
+    if not os.path.exists(path):
+        path = os.path.join(os.environ.get("FAKE_PROST_INSTANCE_DIR", "."), instance_arg + ".rddl")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return rddl_model.parse_instance(f.read())
+
+
+def derived_plan(instance, rng):
+    """Plan the first human's book delivery; a seeded failure turns give_book into give_response."""
+    robots = instance.objects_of("robot")
+    wanted = instance.facts("wants_book")
+    if not robots or not wanted:
+        return []
+    robot = robots[0]
+    human, book = wanted[0]
+    position = next((args[1] for (fluent, args), value in instance.init_state.items()
+                     if fluent == "robot_at" and args[0] == robot and value), None)
+    book_at = next((w for b, w in instance.facts("book_at") if b == book), position)
+    human_at = next((w for h, w in instance.facts("human_at") if h == human), book_at)
+
+    # an init-state after a fetch_book (e.g. a plan repair) continues from there
+    fetched = instance.init_state.get(("book_fetched", (book, robot, human)), False)
+    occurred = [f for f in instance.objects_of("failure")
+                if instance.init_state.get(("failure_occurred", (book, robot, human, f)), False)]
+
+    plan = []
+    if not fetched and not occurred:
+        if position != book_at:
+            plan.append(f"goto_waypoint({robot}, {position}, {book_at})")
+        plan.append(f"fetch_book({robot}, {book}, {human})")
+        position = book_at
+    if position != human_at:
+        plan.append(f"goto_waypoint({robot}, {position}, {human_at})")
+
+    failures = instance.objects_of("failure")
+    if occurred or fetched:
+        fired = occurred
+    else:
+        fired = [f for f in failures if rng.random() < instance.failure_probability(book, f)]
+    if fired:
+        failure = fired[0]
+        responses = instance.objects_of("response")
+        if responses:
+            response = max(responses, key=lambda r: instance.response_probability(failure, r))
+            plan.append(f"give_response({robot}, {response}, {failure}, {book}, {human})")
+    else:
+        plan.append(f"give_book({robot}, {book}, {human})")
+    return plan
+
+
+def main():
+    instance = load_instance(parse_arguments(sys.argv[1:]))
+    latency = float(os.environ.get("FAKE_PROST_LATENCY", "0"))
+    rounds = int(os.environ.get("FAKE_PROST_ROUNDS", "1"))
+    rng = random.Random(int(os.environ.get("FAKE_PROST_SEED", "0")))
+    scripted = [a.strip() for a in os.environ.get("FAKE_PROST_PLAN", "").split(";") if a.strip()]
+    horizon = (instance.horizon if instance is not None else None) or DEFAULT_HORIZON
+
+    for round_index in range(1, rounds + 1):
+        plan = scripted or (derived_plan(instance, rng) if instance is not None else [])
+        reward = 0.0
+        for step in range(horizon):
+            if latency:
+                time.sleep(latency)
+            action = plan[step] if step < len(plan) else None
+            # PROST terminates every action of a record with ';'
+            print(f"** Actions received: [{action};]" if action else "** Actions received: []", flush=True)
+            # the task completes one step after the final action of the plan
+            reward += REWARD_COMPLETED if plan and step > len(plan) else REWARD_OTHERWISE
+        print(f">>> END OF ROUND {round_index} -- REWARD: {reward}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
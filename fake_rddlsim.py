@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# fake_rddlsim.py
+
+"""
+Deterministic stand-in for RDDLSim's run-server.py. Accepts the same command
+line (-b benchmark_dir [-p port]) and, like the interactive session the
+reactive strategies drive, reads one action per line from stdin and answers
+with the resulting state:
+
+    task_failed = false
+    robot_at(tiago, w2) = true
+    book_fetched(b1, tiago, h1) = true
+    task_completed = false
+    state reward = -10.0
+    ----------------------------------------
+
+Every state fluent that is true is reported (like RDDLSim, minus the false
+groundings), so a plan can be repaired from the observed state.
+
+Lines starting with '#' are session commands (used by simulator_session):
+"#ping" answers "pong", "#state" the current state, "#reset" goes back to
+the initial state and "#load" replaces the instance by the RDDL text that
+follows, up to a line "#end", and starts it from its initial state.
+
+Used as a planner server (stdin closed right away) it just stays alive until
+it is killed, so planner pool workers see a running session; with -p it
+listens on that port (and drops every connection), like the real server.
+
+Environment:
+    FAKE_RDDLSIM_INSTANCE      instance whose prob_failure values decide if fetch_book fails
+    FAKE_RDDLSIM_FAILURE_PROB  failure probability of fetch_book without an instance (default 0)
+    FAKE_RDDLSIM_FAIL_AT       comma-separated step numbers (from 1) that always fail
+    FAKE_RDDLSIM_LATENCY       seconds to wait before every answer (default 0)
+    FAKE_RDDLSIM_SEED          seed of the failure draws (default 0)
+"""
+
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import prost_output  # noqa: E402
+import rddl_model  # noqa: E402
+
+REWARD_COMPLETED = 100.0
+REWARD_OTHERWISE = -10.0
+SEPARATOR = "-" * 40
+
+
+# state fluents over objects, besides robot_at, in the order they are reported
+ATOM_FLUENTS = ("book_fetched", "failure_occurred", "response_triggered", "response_given", "book_given")
+
+
+class FakeSession:
+    """State of one simulated run: robot positions, the true atoms of the other state fluents and the task flags."""
+
+    def __init__(self, instance=None, failure_prob=0.0, fail_at=(), seed=0):
+        self.failure_prob = failure_prob
+        self.fail_at = set(fail_at)
+        self.rng = random.Random(seed)
+        self.load(instance)
+
+    def load(self, instance):
+        """Simulate instance (None: no instance) from its initial state."""
+        self.instance = instance
+        self.reset()
+
+    def reset(self):
+        init_state = self.instance.init_state if self.instance is not None else {}
+        self.steps = 0
+        self.task_failed = init_state.get(("task_failed", ()), False)
+        self.task_completed = init_state.get(("task_completed", ()), False)
+        self.robot_at = {args[0]: args[1] for (fluent, args), value in init_state.items()
+                         if fluent == "robot_at" and value}
+        self.atoms = {name: {args for (fluent, args), value in init_state.items() if fluent == name and value}
+                      for name in ATOM_FLUENTS}
+
+    def fetch_failures(self, book):
+        """The failures a fetch of book runs into (without an instance: [None] if it fails)."""
+        if self.instance is None:
+            return [None] if self.rng.random() < self.failure_prob else []
+        # one independent draw per failure, as in the domain's task_failed' CPF
+        return [f for f in self.instance.objects_of("failure")
+                if self.rng.random() < self.instance.failure_probability(book, f)]
+
+    def state_lines(self, reward):
+        lines = [f"task_failed = {str(self.task_failed).lower()}"]
+        lines += [f"robot_at({robot}, {waypoint}) = true" for robot, waypoint in sorted(self.robot_at.items())]
+        lines += [f"{name}({', '.join(args)}) = true" for name in ATOM_FLUENTS for args in sorted(self.atoms[name])]
+        lines += [f"task_completed = {str(self.task_completed).lower()}", f"state reward = {reward}", SEPARATOR]
+        return lines
+
+    def current_reward(self):
+        return REWARD_COMPLETED if self.task_completed else REWARD_OTHERWISE
+
+    def step(self, line):
+        self.steps += 1
+        action = prost_output.parse_action(line) if line.strip() not in ("", "noop", "noop()") else None
+        # the reward is that of the state the action is applied in
+        reward = self.current_reward()
+        # response_triggered' is drawn from the failures of the current state
+        triggered = set()
+        if self.instance is not None:
+            for *_, failure in self.atoms["failure_occurred"]:
+                triggered.update((response, failure) for response in self.instance.objects_of("response")
+                                 if self.rng.random() < self.instance.response_probability(failure, response))
+        if action is not None:
+            if action.name == "goto_waypoint" and len(action.args) == 3:
+                self.robot_at[action.args[0]] = action.args[2]
+            elif action.name == "fetch_book" and len(action.args) == 3:
+                robot, book, human = action.args
+                failures = self.fetch_failures(book)
+                if failures:
+                    self.task_failed = True
+                else:
+                    self.atoms["book_fetched"].add((book, robot, human))
+                self.atoms["failure_occurred"].update((book, robot, human, f) for f in failures if f is not None)
+            elif action.name == "give_book" and len(action.args) == 3:
+                robot, book, human = action.args
+                self.atoms["book_given"].add((book, robot, human))
+                self.task_completed = True
+            elif action.name == "give_response" and len(action.args) == 5:
+                self.atoms["response_given"].add((action.args[1], action.args[2]))
+                self.task_completed = True
+        self.atoms["response_triggered"] |= triggered
+        if self.steps in self.fail_at:
+            self.task_failed = True
+        return self.state_lines(reward)
+
+
+def handle_command(session, command, stdin):
+    """Answer one '#' session command."""
+    if command == "#ping":
+        return ["pong", SEPARATOR]
+    if command == "#reset":
+        session.reset()
+    elif command == "#load":
+        text = "".join(iter(stdin.readline, "#end\n"))
+        session.load(rddl_model.parse_instance(text))
+    elif command != "#state":
+        return [f"unknown command {command}", SEPARATOR]
+    return session.state_lines(session.current_reward())
+
+
+def listen(port):
+    """Accept and drop connections on port until killed."""
+    with socket.socket() as server:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("localhost", port))
+        server.listen()
+        while True:
+            connection, _ = server.accept()
+            connection.close()
+
+
+def main():
+    # the run-server.py arguments are accepted; -b is ignored, -p is listened on in server mode
+    port = int(sys.argv[sys.argv.index("-p") + 1]) if "-p" in sys.argv[1:-1] else None
+    instance_path = os.environ.get("FAKE_RDDLSIM_INSTANCE")
+    instance = rddl_model.load_instance(instance_path) if instance_path else None
+    fail_at = [int(step) for step in os.environ.get("FAKE_RDDLSIM_FAIL_AT", "").split(",") if step.strip()]
+    session = FakeSession(instance, float(os.environ.get("FAKE_RDDLSIM_FAILURE_PROB", "0")), fail_at,
+                          int(os.environ.get("FAKE_RDDLSIM_SEED", "0")))
+    latency = float(os.environ.get("FAKE_RDDLSIM_LATENCY", "0"))
+
+    served = False
+    for line in iter(sys.stdin.readline, ""):
+        served = True
+        if line.startswith("#"):
+            print("\n".join(handle_command(session, line.strip(), sys.stdin)), flush=True)
+            continue
+        if latency:
+            time.sleep(latency)
+        print("\n".join(session.step(line)), flush=True)
+
+    if not served:
+        # planner server mode: nothing to simulate, keep the session up until killed
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        if port is not None:
+            listen(port)
+        while True:
+            signal.pause()
+
+
+if __name__ == "__main__":
+    main()
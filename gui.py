@@ -5,9 +5,12 @@ import threading
 import subprocess
 import re
 import os
+import tempfile
 from planner import PlanExecutor, PlannerInterface, RDDLAnalyzer
 import prehoc
 import posthoc
+import rddl_model
+import run_context
 import start_rosplan
 import reactive_rosplan
 import signal
@@ -23,6 +26,8 @@ class PlanningGUI:
         self.executor = PlanExecutor(self)
         self.rddl_analyzer = RDDLAnalyzer()
         self.current_plan = []
+        self.run_ctx = None  # workspace of the latest strategy run, the executed plan is saved there
+        self.active_contexts = set()  # workspaces of runs that are still going
 
         self.domain_file = tk.StringVar(value="./domain.rddl")
         self.instance_file = tk.StringVar(value="./instance_failures_responses.rddl")
@@ -105,11 +110,21 @@ class PlanningGUI:
         path = filedialog.askopenfilename(filetypes=[("RDDL files", "*.rddl")])
         if path:
             self.domain_file.set(path)
+            self.preload_model(rddl_model.cached_domain, path)
 
     def select_instance_file(self):
         path = filedialog.askopenfilename(filetypes=[("RDDL files", "*.rddl")])
         if path:
             self.instance_file.set(path)
+            self.preload_model(rddl_model.cached_instance, path)
+
+    def preload_model(self, load, path):
+        # parse the selected file into the shared model cache right away, so the
+        # strategy runs find it there and syntax errors show up on selection
+        try:
+            load(path)
+        except (OSError, rddl_model.RDDLParseError) as e:
+            self.display(f"Could not parse {path}: {e}")
 
     def display(self, text):
         MAX_LINES = 300
@@ -137,11 +152,42 @@ class PlanningGUI:
 
         add_line()
 
+    def new_run_context(self, name):
+        """Allocate the workspace of a strategy run, retiring the one of the previous run."""
+        self.retire_run_context()
+        self.run_ctx = run_context.RunContext(name)
+        return self.run_ctx
+
+    def retire_run_context(self):
+        """The latest run's workspace is no longer current; remove it unless its run is still going."""
+        ctx, self.run_ctx = self.run_ctx, None
+        if ctx is not None and ctx not in self.active_contexts:
+            ctx.cleanup()
+
+    def run_in_context(self, ctx, target):
+        """Run target in a thread; ctx is kept while it runs and removed afterwards if it was retired meanwhile."""
+        self.active_contexts.add(ctx)
+
+        def run():
+            try:
+                target()
+            finally:
+                self.active_contexts.discard(ctx)
+                if ctx is not self.run_ctx:
+                    ctx.cleanup()
+
+        threading.Thread(target=run).start()
+
     def save_plan_to_log(self):
-        os.makedirs("./plans", exist_ok=True)
-        with open("./plans/executed_plan.txt", "w") as f:
+        # the executed plan goes into the workspace of the run it came from, written to a
+        # temp file first so concurrent saves never interleave
+        ctx = self.run_ctx or self.new_run_context("gui")
+        fd, tmp_path = tempfile.mkstemp(dir=ctx.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
             for action in self.current_plan:
                 f.write(action + "\n")
+        os.replace(tmp_path, ctx.file("executed_plan.txt"))
+        print(f"Executed plan saved to {ctx.file('executed_plan.txt')}")
 
     def execute_and_log(self):
         self.save_plan_to_log()
@@ -167,46 +213,53 @@ class PlanningGUI:
         if self.roslaunch_proc and self.roslaunch_proc.poll() is None:
             os.killpg(os.getpgid(self.roslaunch_proc.pid), signal.SIGTERM)
             self.roslaunch_proc.wait()
+        self.retire_run_context()
+        for ctx in list(self.active_contexts):
+            ctx.cleanup()
 
         self.root.destroy()
 
     def run_pre_hoc(self):
         self.display_incrementally(["Running Pre-hoc Planner..."])
         self.root.update_idletasks()
+        ctx = self.new_run_context("prehoc")
 
         def run():
             from io import StringIO
             import sys
             old_stdout = sys.stdout
             sys.stdout = mystdout = StringIO()
-            self.current_plan = prehoc.main_gui(domain_path=self.domain_file.get(), instance_path=self.instance_file.get())
+            self.current_plan = prehoc.main_gui(domain_path=self.domain_file.get(), instance_path=self.instance_file.get(), concurrent=True, ctx=ctx)
             sys.stdout = old_stdout
             output = mystdout.getvalue()
             #self.current_plan = re.findall(r"[a-z_]+\([^)]*\)", output)
             self.display_incrementally(output.splitlines())
 
-        threading.Thread(target=run).start()
+        self.run_in_context(ctx, run)
 
     def run_post_hoc(self):
         self.display_incrementally(["Running Post-hoc Planner..."])
         self.root.update_idletasks()
+        ctx = self.new_run_context("posthoc")
 
         def run():
             from io import StringIO
             import sys
             old_stdout = sys.stdout
             sys.stdout = mystdout = StringIO()
-            self.current_plan = posthoc.main_gui(domain_path=self.domain_file.get(), instance_path=self.instance_file.get())
+            self.current_plan = posthoc.main_gui(domain_path=self.domain_file.get(), instance_path=self.instance_file.get(), ctx=ctx)
             sys.stdout = old_stdout
             output = mystdout.getvalue()
             #self.current_plan = re.findall(r"[a-z_]+\([^)]*\)", output)
             self.display_incrementally(output.splitlines())
 
-        threading.Thread(target=run).start()
+        self.run_in_context(ctx, run)
 
     def run_reactive(self):
         self.display_incrementally(["Running Reactive Planner..."])
         self.root.update_idletasks()
+        # the ROSPlan run keeps no files, an executed plan of it gets a workspace of its own when saved
+        self.retire_run_context()
 
         def run():
             from io import StringIO
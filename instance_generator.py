@@ -0,0 +1,175 @@
+# instance_generator.py
+
+import argparse
+import itertools
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+import rddl_model
+
+# --- Configuration ---
+DOMAIN_NAME = "explanation_planning"
+FAILURES = ["agent_error", "suboptimal_behavior", "agent_inability", "unforeseen_circumstances",
+            "uncertainty", "social_norm_violation", "normal_interaction"]
+RESPONSES = ["why_explanation", "what_explanation", "apology", "ask_for_help",
+             "narrate_next_action", "continue_without_comment"]
+DISTRIBUTIONS = ("uniform", "model", "model-randomized")
+MAX_FAILURE_PROBABILITY = 0.5
+MANIFEST_FILE = "manifest.json"
+PRECISION = 4
+
+
+def failure_response_tables(rng, books, distribution, sparsity=0.0, seed=None):
+    """
+    Draw the prob_failure (book x failure) and prob_response (failure x response)
+    tables for the given distribution:
+
+    - uniform: failure probabilities uniform in [0, MAX_FAILURE_PROBABILITY],
+      response rows from a flat Dirichlet distribution,
+    - model: the tables of ScenarioResponseModel, the same for every book,
+    - model-randomized: Dirichlet-randomized ScenarioResponseModel tables, a
+      scenario vector per book and one response matrix (prob_response does
+      not depend on the book).
+
+    With sparsity > 0 that fraction of the prob_failure entries is set to 0.0.
+    """
+    if distribution == "uniform":
+        failure_table = rng.uniform(0.0, MAX_FAILURE_PROBABILITY, (books, len(FAILURES)))
+        response_table = rng.dirichlet(np.ones(len(RESPONSES)), len(FAILURES))
+    elif distribution in ("model", "model-randomized"):
+        # pandas is only needed for the model's display helpers, so import it on demand
+        import failures_and_responses
+        model = failures_and_responses.ScenarioResponseModel(seed)
+        scenario_of = {failure: scenario for scenario, failure in failures_and_responses.SCENARIO_FAILURES.items()}
+        rows = [model.scenario_index[scenario_of[f]] for f in FAILURES]
+        columns = [model.response_index[r] for r in RESPONSES]
+        if distribution == "model":
+            failure_table = np.tile(model.scenario_vector[rows], (books, 1))
+            response_table = model.response_matrix[np.ix_(rows, columns)]
+        else:
+            matrices, vectors = model.randomized_tables(books)
+            failure_table = vectors[:, rows]
+            response_table = matrices[0][np.ix_(rows, columns)]
+    else:
+        raise ValueError(f"Unknown distribution '{distribution}', expected one of {DISTRIBUTIONS}")
+
+    if sparsity > 0:
+        failure_table = np.where(rng.random(failure_table.shape) < sparsity, 0.0, failure_table)
+    return failure_table.round(PRECISION), response_table.round(PRECISION)
+
+
+def generate_instance(name, robots=1, humans=1, books=2, waypoints=3, distribution="uniform",
+                      sparsity=0.0, horizon=15, seed=None):
+    """
+    Build a random but valid explanation_planning instance.
+
+    Humans, books and robots are placed on random waypoints, and every human
+    wants one book (distinct books as long as there are enough).
+
+    :param name: Instance name; the non-fluents block is called nf_<name>.
+    :param distribution: How failure/response probabilities are drawn (see failure_response_tables).
+    :param sparsity: Fraction of prob_failure entries forced to 0.0.
+    :param seed: Seed for placement and probabilities.
+    :return: An rddl_model.RDDLInstance.
+    """
+    if min(robots, humans, books, waypoints) < 1:
+        raise ValueError("Every object type needs at least one object")
+    rng = np.random.default_rng(seed)
+    instance = rddl_model.RDDLInstance(name, DOMAIN_NAME, f"nf_{name}")
+    instance.objects = OrderedDict([
+        ("robot", [f"robot{i}" for i in range(1, robots + 1)] if robots > 1 else ["tiago"]),
+        ("human", [f"h{i}" for i in range(1, humans + 1)]),
+        ("book", [f"b{i}" for i in range(1, books + 1)]),
+        ("waypoint", [f"w{i}" for i in range(1, waypoints + 1)]),
+        ("failure", list(FAILURES)),
+        ("response", list(RESPONSES)),
+    ])
+    all_waypoints = instance.objects["waypoint"]
+    all_books = instance.objects["book"]
+
+    for human in instance.objects["human"]:
+        instance.non_fluents[("human_at", (human, str(rng.choice(all_waypoints))))] = True
+    wanted = rng.permutation(books)[:humans] if humans <= books else rng.integers(0, books, humans)
+    for human, book in zip(instance.objects["human"], wanted):
+        instance.non_fluents[("wants_book", (human, all_books[book]))] = True
+    for book in all_books:
+        instance.non_fluents[("book_at", (book, str(rng.choice(all_waypoints))))] = True
+
+    failure_table, response_table = failure_response_tables(rng, books, distribution, sparsity, seed)
+    for book, row in zip(all_books, failure_table):
+        for failure, p in zip(FAILURES, row):
+            instance.non_fluents[("prob_failure", (book, failure))] = float(p)
+    for failure, row in zip(FAILURES, response_table):
+        for response, p in zip(RESPONSES, row):
+            instance.non_fluents[("prob_response", (response, failure))] = float(p)
+
+    for robot in instance.objects["robot"]:
+        instance.init_state[("robot_at", (robot, str(rng.choice(all_waypoints))))] = True
+    instance.max_nondef_actions = 1
+    instance.horizon = horizon
+    instance.discount = 1.0
+    instance.build_tables()
+    return instance
+
+
+def generate_family(out_dir, robots=(1,), humans=(1,), books=(2,), waypoints=(3,), distribution="uniform",
+                    sparsity=0.0, horizon=15, repeats=1, seed=0):
+    """
+    Write one instance for every combination of the object counts (repeats
+    times, with different seeds) to out_dir, together with a manifest that
+    records the parameters, seed and grounding sizes of each file.
+    Returns the manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    entries = []
+    combinations = itertools.product(robots, humans, books, waypoints, range(repeats))
+    for index, (r, h, b, w, repeat) in enumerate(combinations):
+        instance_seed = seed + index
+        name = f"instance_r{r}_h{h}_b{b}_w{w}_{repeat}"
+        instance = generate_instance(name, r, h, b, w, distribution, sparsity, horizon, instance_seed)
+        filename = f"{name}.rddl"
+        with open(os.path.join(out_dir, filename), "w") as f:
+            f.write(instance.to_rddl())
+        entries.append({
+            "file": filename,
+            "instance": name,
+            "seed": instance_seed,
+            "robots": r, "humans": h, "books": b, "waypoints": w,
+            "give_response_groundings": r * len(RESPONSES) * len(FAILURES) * b * h,
+        })
+
+    manifest = {
+        "domain": DOMAIN_NAME,
+        "distribution": distribution,
+        "sparsity": sparsity,
+        "horizon": horizon,
+        "seed": seed,
+        "instances": entries,
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    """Generate an instance family from the command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out_dir", help="Directory the instances and the manifest are written to")
+    parser.add_argument("--robots", type=int, nargs="+", default=[1])
+    parser.add_argument("--humans", type=int, nargs="+", default=[1])
+    parser.add_argument("--books", type=int, nargs="+", default=[2])
+    parser.add_argument("--waypoints", type=int, nargs="+", default=[3])
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--sparsity", type=float, default=0.0, help="Fraction of prob_failure entries set to 0.0")
+    parser.add_argument("--horizon", type=int, default=15)
+    parser.add_argument("--repeats", type=int, default=1, help="Instances per parameter combination")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate_family(args.out_dir, args.robots, args.humans, args.books, args.waypoints,
+                               args.distribution, args.sparsity, args.horizon, args.repeats, args.seed)
+    print(f"Wrote {len(manifest['instances'])} instances to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
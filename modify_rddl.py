@@ -1,4 +1,6 @@
 import re
+import rddl_model
+import rddl_rewrite
 
 plan = ['Plan:', 'goto_waypoint(tiago, start_position, bookshelf)', 'fetch_book(tiago, book, visitor)', 'failure_happens(tiago, book, agent_error)', 'goto_waypoint(tiago, bookshelf, visitor_area)']
 
@@ -44,144 +46,74 @@ def extract_plan_details(plan):
 
     return details
 
-details = extract_plan_details(plan)
-print(details['waypoint'])
-
-def modify_problem_file(input_file_path, output_file_path):
+# prob_response(response, failure) values written by modify_problem_file
+DEFAULT_RESPONSE_PROBABILITIES = {
+    "why_explanation": 0.2,
+    "what_explanation": 0.15,
+    "apology": 0.1,
+    "ask_for_help": 0.25,
+    "narrate_next_action": 0.2,
+    "continue_without_comment": 0.05,
+}
+RESPONSE_PROBABILITIES = {
+    failure: dict(DEFAULT_RESPONSE_PROBABILITIES)
+    for failure in ("agent_error", "suboptimal_behavior", "agent_inability", "unforeseen_circumstances",
+                    "uncertainty", "social_norm_violation", "normal_interaction")
+}
+RESPONSE_PROBABILITIES["agent_error"]["why_explanation"] = 0.9
+
+
+def reactive_edits(instance, details):
+    """
+    Build the edits that turn a posthoc problem into the reactive one: the
+    response probabilities of RESPONSE_PROBABILITIES (for the entries the
+    problem defines), the observed failure in the init-state, the robot at the
+    waypoint it was heading to and the reactive instance/non-fluents names.
+    """
+    edits = [
+        rddl_rewrite.set_probability("prob_response", (response, failure), p)
+        for failure, responses in RESPONSE_PROBABILITIES.items()
+        for response, p in responses.items()
+        if ("prob_response", (response, failure)) in instance.non_fluents
+    ]
+    edits += [
+        rddl_rewrite.add_init_fluent("book_fetched", (details["book"], details["robot"], details["human"])),
+        rddl_rewrite.add_init_fluent("failure_triggered", (details["failure"],)),
+        rddl_rewrite.add_init_fluent("failure_happened"),
+        rddl_rewrite.RenameInstance("instance_posthoc", "instance_reactive"),
+        rddl_rewrite.RenameNonFluents("nf_explanation_planning_posthoc", "nf_explanation_planning_reactive"),
+    ]
+    if ("robot_at", ("tiago", "start_position")) in instance.init_state:
+        edits.append(rddl_rewrite.MoveRobot("tiago", details["waypoint"]))
+    return edits
+
+
+def derive_problem(input_file_path, plan=plan):
+    """Derive the reactive problem from a posthoc one in memory, without writing any file."""
+    details = extract_plan_details(plan)
+    instance = rddl_model.cached_instance(input_file_path)
+    return rddl_rewrite.derive_instance(input_file_path, reactive_edits(instance, details))
+
+
+def modify_problem_file(input_file_path, output_file_path, plan=plan):
     """
     Reads an RDDL problem file, modifies its content, and saves the changes to a new file.
 
     :param input_file_path: Path to the original problem file.
     :param output_file_path: Path to save the modified problem file.
+    :param plan: Executed plan the robot, book, human, failure and waypoint are taken from.
     """
-    with open(input_file_path, 'r') as file:
-        content = file.readlines()
-
-    updated_content = []
-
-    # Iterate through the content and modify it as needed
-    for line in content:
-        # Update the non-fluent name
-        if "non-fluents nf_explanation_planning_posthoc" in line:
-            line = line.replace("nf_explanation_planning_posthoc", "nf_explanation_planning_reactive")
-
-        # Update all probabilities for responses and failures based on the new specifications
-        if "prob_response(why_explanation, agent_error)" in line:
-            line = "      prob_response(why_explanation, agent_error) = 0.9; //0.2;\n"
-        elif "prob_response(what_explanation, agent_error)" in line:
-            line = "      prob_response(what_explanation, agent_error) = 0.15;\n"
-        elif "prob_response(apology, agent_error)" in line:
-            line = "      prob_response(apology, agent_error) = 0.1;\n"
-        elif "prob_response(ask_for_help, agent_error)" in line:
-            line = "      prob_response(ask_for_help, agent_error) = 0.25;\n"
-        elif "prob_response(narrate_next_action, agent_error)" in line:
-            line = "      prob_response(narrate_next_action, agent_error) = 0.2;\n"
-        elif "prob_response(continue_without_comment, agent_error)" in line:
-            line = "      prob_response(continue_without_comment, agent_error) = 0.05;\n"
-
-        elif "prob_response(why_explanation, suboptimal_behavior)" in line:
-            line = "      prob_response(why_explanation, suboptimal_behavior) = 0.2;\n"
-        elif "prob_response(what_explanation, suboptimal_behavior)" in line:
-            line = "      prob_response(what_explanation, suboptimal_behavior) = 0.15;\n"
-        elif "prob_response(apology, suboptimal_behavior)" in line:
-            line = "      prob_response(apology, suboptimal_behavior) = 0.1;\n"
-        elif "prob_response(ask_for_help, suboptimal_behavior)" in line:
-            line = "      prob_response(ask_for_help, suboptimal_behavior) = 0.25;\n"
-        elif "prob_response(narrate_next_action, suboptimal_behavior)" in line:
-            line = "      prob_response(narrate_next_action, suboptimal_behavior) = 0.2;\n"
-        elif "prob_response(continue_without_comment, suboptimal_behavior)" in line:
-            line = "      prob_response(continue_without_comment, suboptimal_behavior) = 0.05;\n"
-
-        elif "prob_response(why_explanation, agent_inability)" in line:
-            line = "      prob_response(why_explanation, agent_inability) = 0.2;\n"
-        elif "prob_response(what_explanation, agent_inability)" in line:
-            line = "      prob_response(what_explanation, agent_inability) = 0.15;\n"
-        elif "prob_response(apology, agent_inability)" in line:
-            line = "      prob_response(apology, agent_inability) = 0.1;\n"
-        elif "prob_response(ask_for_help, agent_inability)" in line:
-            line = "      prob_response(ask_for_help, agent_inability) = 0.25;\n"
-        elif "prob_response(narrate_next_action, agent_inability)" in line:
-            line = "      prob_response(narrate_next_action, agent_inability) = 0.2;\n"
-        elif "prob_response(continue_without_comment, agent_inability)" in line:
-            line = "      prob_response(continue_without_comment, agent_inability) = 0.05;\n"
-
-        elif "prob_response(why_explanation, unforeseen_circumstances)" in line:
-            line = "      prob_response(why_explanation, unforeseen_circumstances) = 0.2;\n"
-        elif "prob_response(what_explanation, unforeseen_circumstances)" in line:
-            line = "      prob_response(what_explanation, unforeseen_circumstances) = 0.15;\n"
-        elif "prob_response(apology, unforeseen_circumstances)" in line:
-            line = "      prob_response(apology, unforeseen_circumstances) = 0.1;\n"
-        elif "prob_response(ask_for_help, unforeseen_circumstances)" in line:
-            line = "      prob_response(ask_for_help, unforeseen_circumstances) = 0.25;\n"
-        elif "prob_response(narrate_next_action, unforeseen_circumstances)" in line:
-            line = "      prob_response(narrate_next_action, unforeseen_circumstances) = 0.2;\n"
-        elif "prob_response(continue_without_comment, unforeseen_circumstances)" in line:
-            line = "      prob_response(continue_without_comment, unforeseen_circumstances) = 0.05;\n"
-
-        elif "prob_response(why_explanation, uncertainty)" in line:
-            line = "      prob_response(why_explanation, uncertainty) = 0.2;\n"
-        elif "prob_response(what_explanation, uncertainty)" in line:
-            line = "      prob_response(what_explanation, uncertainty) = 0.15;\n"
-        elif "prob_response(apology, uncertainty)" in line:
-            line = "      prob_response(apology, uncertainty) = 0.1;\n"
-        elif "prob_response(ask_for_help, uncertainty)" in line:
-            line = "      prob_response(ask_for_help, uncertainty) = 0.25;\n"
-        elif "prob_response(narrate_next_action, uncertainty)" in line:
-            line = "      prob_response(narrate_next_action, uncertainty) = 0.2;\n"
-        elif "prob_response(continue_without_comment, uncertainty)" in line:
-            line = "      prob_response(continue_without_comment, uncertainty) = 0.05;\n"
-
-        elif "prob_response(why_explanation, social_norm_violation)" in line:
-            line = "      prob_response(why_explanation, social_norm_violation) = 0.2;\n"
-        elif "prob_response(what_explanation, social_norm_violation)" in line:
-            line = "      prob_response(what_explanation, social_norm_violation) = 0.15;\n"
-        elif "prob_response(apology, social_norm_violation)" in line:
-            line = "      prob_response(apology, social_norm_violation) = 0.1;\n"
-        elif "prob_response(ask_for_help, social_norm_violation)" in line:
-            line = "      prob_response(ask_for_help, social_norm_violation) = 0.25;\n"
-        elif "prob_response(narrate_next_action, social_norm_violation)" in line:
-            line = "      prob_response(narrate_next_action, social_norm_violation) = 0.2;\n"
-        elif "prob_response(continue_without_comment, social_norm_violation)" in line:
-            line = "      prob_response(continue_without_comment, social_norm_violation) = 0.05;\n"
-
-        elif "prob_response(why_explanation, normal_interaction)" in line:
-            line = "      prob_response(why_explanation, normal_interaction) = 0.2;\n"
-        elif "prob_response(what_explanation, normal_interaction)" in line:
-            line = "      prob_response(what_explanation, normal_interaction) = 0.15;\n"
-        elif "prob_response(apology, normal_interaction)" in line:
-            line = "      prob_response(apology, normal_interaction) = 0.1;\n"
-        elif "prob_response(ask_for_help, normal_interaction)" in line:
-            line = "      prob_response(ask_for_help, normal_interaction) = 0.25;\n"
-        elif "prob_response(narrate_next_action, normal_interaction)" in line:
-            line = "      prob_response(narrate_next_action, normal_interaction) = 0.2;\n"
-        elif "prob_response(continue_without_comment, normal_interaction)" in line:
-            line = "      prob_response(continue_without_comment, normal_interaction) = 0.05;\n"
-
-        # Update the initial state and instance name
-        if "init-state {" in line:
-            updated_content.append(line)
-            #updated_content.append("        robot_at(tiago, bookshelf);\n")
-            updated_content.append("        book_fetched("+details["book"]+", "+details["robot"]+", "+details["human"]+");\n")
-            updated_content.append("        failure_triggered("+details["failure"]+");\n")
-            updated_content.append("        failure_happened = true;\n")
-            continue
-
-        if "instance instance_posthoc" in line:
-            line = line.replace("instance_posthoc", "instance_reactive")
-
-        if "nf_explanation_planning_posthoc" in line:
-            line = line.replace("nf_explanation_planning_posthoc", "nf_explanation_planning_reactive")
-
-        if "robot_at(tiago, start_position);" in line:
-            line = line.replace("start_position", details["waypoint"])
-
-        updated_content.append(line)
-
-    # Save the modified content to a new file
+    instance = derive_problem(input_file_path, plan)
     with open(output_file_path, 'w') as file:
-        file.writelines(updated_content)
+        file.write(instance.to_rddl())
+    return instance
+
+
+if __name__ == "__main__":
+    details = extract_plan_details(plan)
+    print(details['waypoint'])
 
-# Example usage
-input_file = "./problem_posthoc.rddl"
-output_file = "./problem_reactive.rddl"
-modify_problem_file(input_file, output_file)
+    # Example usage
+    input_file = "./problem_posthoc.rddl"
+    output_file = "./problem_reactive.rddl"
+    modify_problem_file(input_file, output_file)
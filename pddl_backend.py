@@ -0,0 +1,251 @@
+# pddl_backend.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+# --- Configuration ---
+SAS_CACHE_DIR = "./.sas_cache"
+MAX_MEMORY_TASKS = 16
+
+
+# --- PDDL problem parsing ---
+
+def parse_sexpr(text):
+    """Parse PDDL text (comments stripped, lower-cased) into nested lists of symbols."""
+    text = re.sub(r";[^\n]*", "", text).lower()
+    stack = [[]]
+    for token in re.findall(r"\(|\)|[^\s()]+", text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            expr = stack.pop()
+            stack[-1].append(expr)
+        else:
+            stack[-1].append(token)
+    return stack[0][0] if stack[0] else []
+
+
+def unparse(expr):
+    """Serialize a nested list back into canonical PDDL text."""
+    if isinstance(expr, list):
+        return "(" + " ".join(unparse(e) for e in expr) + ")"
+    return expr
+
+
+def fact_name(expr):
+    """Name of a ground atom in the 'pred(arg1, arg2)' form used by the FD translator."""
+    return f"{expr[0]}({', '.join(expr[1:])})"
+
+
+def split_problem(problem_text):
+    """
+    Split a PDDL problem into its initial state and everything else. The
+    'everything else' part (objects, goal, metric, ...) decides whether a cached
+    translation can be reused; the problem name is left out on purpose.
+    Returns (task_text, init) where init is a list of ground atoms and other
+    init entries (e.g. numeric fluents) as canonical strings.
+    """
+    problem = parse_sexpr(problem_text)
+    init = []
+    rest = []
+    for section in problem[1:]:
+        if not isinstance(section, list) or not section:
+            continue
+        if section[0] == "problem":
+            continue
+        if section[0] == ":init":
+            for fact in section[1:]:
+                if isinstance(fact, list) and fact and all(isinstance(t, str) for t in fact) and fact[0] != "=":
+                    init.append(fact_name(fact))
+                else:
+                    init.append(unparse(fact))
+        else:
+            rest.append(unparse(section))
+    return " ".join(rest), init
+
+
+# --- SAS+ task handling ---
+
+class SASTask:
+    """
+    Just enough of a Fast Downward SAS+ task (output.sas) to swap its initial
+    state: the variables with their values and the begin_state section.
+    """
+
+    def __init__(self, text):
+        self.lines = text.splitlines()
+        self.variables = []
+        self.atoms = {}
+        self.negated = set()
+        i = 0
+        while i < len(self.lines):
+            line = self.lines[i]
+            if line == "begin_variable":
+                axiom_layer = int(self.lines[i + 2])
+                count = int(self.lines[i + 3])
+                values = self.lines[i + 4:i + 4 + count]
+                var = len(self.variables)
+                self.variables.append((axiom_layer, values))
+                for val, value in enumerate(values):
+                    if value.startswith("Atom "):
+                        self.atoms[value[5:]] = (var, val)
+                    elif value.startswith("NegatedAtom "):
+                        self.negated.add(value[12:])
+                i += 4 + count
+            elif line == "begin_state":
+                self.state_start = i + 1
+                i += 1 + len(self.variables)
+            else:
+                i += 1
+
+    def encoded_facts(self, facts):
+        """Return the subset of facts that the task represents as variable values."""
+        return {fact for fact in facts if fact in self.atoms or fact in self.negated}
+
+    def with_initial_state(self, facts):
+        """
+        Return the task text with its initial state replaced by facts, or None
+        if the facts cannot be expressed with the task's variables (two values
+        of one variable true, or a variable without a matching default value).
+        Derived variables keep their original initial value.
+        """
+        state = [None] * len(self.variables)
+        for fact in facts:
+            if fact not in self.atoms:
+                continue
+            var, val = self.atoms[fact]
+            if state[var] is not None and state[var] != val:
+                return None
+            state[var] = val
+
+        for var, (axiom_layer, values) in enumerate(self.variables):
+            if state[var] is not None:
+                continue
+            if axiom_layer != -1:
+                state[var] = int(self.lines[self.state_start + var])
+                continue
+            defaults = [val for val, value in enumerate(values)
+                        if value.startswith("NegatedAtom ") or value == "<none of those>"]
+            if len(defaults) != 1:
+                return None
+            state[var] = defaults[0]
+
+        lines = list(self.lines)
+        lines[self.state_start:self.state_start + len(state)] = [str(val) for val in state]
+        return "\n".join(lines) + "\n"
+
+
+class SASTaskCache:
+    """
+    Cache of translated SAS+ tasks keyed on the domain and the problem without
+    its initial state. A problem that only differs in :init reuses the cached
+    task with the initial state swapped in, so only the search component runs.
+
+    A swap is only done when it is safe: every init fact must be encoded in the
+    task or be one of the facts the translator compiled away for the cached
+    problem (static facts must be identical). Relaxed reachability is monotone
+    in the initial state, so nothing the translator pruned can become reachable.
+    """
+
+    def __init__(self, cache_dir=SAS_CACHE_DIR, max_tasks=MAX_MEMORY_TASKS):
+        self.cache_dir = cache_dir
+        self.max_tasks = max_tasks
+        self.tasks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def task_key(self, domain_text, task_text):
+        digest = hashlib.sha256()
+        digest.update(unparse(parse_sexpr(domain_text)).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(task_text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _load(self, key):
+        """Return (SASTask, unencoded init facts) for a key, from memory or disk."""
+        with self.lock:
+            if key in self.tasks:
+                self.tasks.move_to_end(key)
+                return self.tasks[key]
+        entry = self._entry_dir(key)
+        if not os.path.exists(os.path.join(entry, "meta.json")):
+            return None
+        with open(os.path.join(entry, "output.sas"), "r") as f:
+            task = SASTask(f.read())
+        with open(os.path.join(entry, "meta.json"), "r") as f:
+            unencoded = set(json.load(f)["unencoded_init"])
+        self._remember(key, (task, unencoded))
+        return task, unencoded
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.tasks[key] = value
+            self.tasks.move_to_end(key)
+            while len(self.tasks) > self.max_tasks:
+                self.tasks.popitem(last=False)
+
+    def lookup(self, domain_path, problem_path, task_file):
+        """
+        Try to produce a ready-to-search task for the problem. Returns
+        (key, True) after writing the patched task to task_file, or (key, False)
+        when the problem has to be translated.
+        """
+        with open(domain_path, "r") as f:
+            domain_text = f.read()
+        with open(problem_path, "r") as f:
+            task_text, init = split_problem(f.read())
+        key = self.task_key(domain_text, task_text)
+
+        cached = self._load(key)
+        if cached is not None:
+            task, unencoded = cached
+            init = set(init)
+            if init - task.encoded_facts(init) == unencoded:
+                patched = task.with_initial_state(init)
+                if patched is not None:
+                    with open(task_file, "w") as f:
+                        f.write(patched)
+                    self.hits += 1
+                    logging.info(f"Reusing translated task {key[:12]} for {problem_path}")
+                    return key, True
+        self.misses += 1
+        return key, False
+
+    def store(self, key, problem_path, sas_file):
+        """Store a freshly translated task for the problem under key."""
+        with open(sas_file, "r") as f:
+            task = SASTask(f.read())
+        with open(problem_path, "r") as f:
+            _, init = split_problem(f.read())
+        unencoded = set(init) - task.encoded_facts(init)
+
+        entry = self._entry_dir(key)
+        os.makedirs(entry, exist_ok=True)
+        shutil.copyfile(sas_file, os.path.join(entry, "output.sas"))
+        with open(os.path.join(entry, "meta.json"), "w") as f:
+            json.dump({"problem": problem_path, "unencoded_init": sorted(unencoded)}, f, indent=2)
+        self._remember(key, (task, unencoded))
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide SAS+ task cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SASTaskCache()
+        return _default_cache
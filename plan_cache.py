@@ -0,0 +1,202 @@
+# plan_cache.py
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import planner_pool
+import rddl_model
+
+# --- Configuration ---
+PLAN_CACHE_DIR = "./.plan_cache"
+MAX_MEMORY_ENTRIES = 64
+MAX_DISK_BYTES = 64 * 1024 * 1024
+
+
+def normalize_rddl(text):
+    """Strip comments and collapse whitespace so formatting-only edits keep the same key."""
+    text = re.sub(r"//[^\n]*", "", text)
+    return " ".join(text.split())
+
+
+def read_source(path_or_name):
+    """
+    Return the text of a file. An instance known only by name to the server is
+    resolved to its file in the benchmark directory; None if there is no such
+    file, since the name alone does not tell whether the instance changed.
+    """
+    if path_or_name is None:
+        return ""
+    if isinstance(path_or_name, planner_pool.MemoryInstance):
+        return path_or_name.text
+    path = path_or_name if os.path.isfile(path_or_name) else planner_pool.named_instance_path(path_or_name)
+    if path is None:
+        return None
+    return rddl_model.get_cache().text(path)
+
+
+def planner_identity(pool):
+    """The planner executables a pool runs (resolved), so plans of different planners, e.g. the fakes, never mix."""
+    return "\0".join(os.path.realpath(executable) for executable in (pool.planner_script, pool.prost_client))
+
+
+def plan_key(domain_text, instance_text, settings, seed=None, planner=""):
+    """Hash the normalized domain and instance together with the planner settings, seed and planner identity."""
+    digest = hashlib.sha256()
+    for part in (normalize_rddl(domain_text), normalize_rddl(instance_text), settings, str(seed), planner):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class PlanCache:
+    """
+    Two-level cache of planner outputs: an in-memory LRU in front of an on-disk
+    store. Both levels are content addressed, so editing an instance invalidates
+    its entry automatically while unchanged files are answered without planning.
+    """
+
+    def __init__(self, cache_dir=PLAN_CACHE_DIR, max_entries=MAX_MEMORY_ENTRIES, max_disk_bytes=MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key + ".log")
+
+    def get(self, key):
+        """Return the cached planner output for a key, or None on a miss."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            path = self._disk_path(key)
+            with open(path, "r") as f:
+                output = f.read()
+            os.utime(path)  # keep the disk level in LRU order as well
+            with self.lock:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, output)
+            return output
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, output):
+        """Store a planner output on both cache levels."""
+        with self.lock:
+            self._remember(key, output)
+        if self.cache_dir:
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(output)
+            os.replace(tmp_path, self._disk_path(key))
+            self._evict_disk()
+
+    def _remember(self, key, output):
+        self.entries[key] = output
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _evict_disk(self):
+        """Drop the least recently used files until the disk level fits its size cap."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".log"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        """Empty both cache levels and reset the counters."""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".log"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        """Return the hit/miss counters and current sizes."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self.entries),
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide plan cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PlanCache()
+        return _default_cache
+
+
+def submit_cached(domain, instance, settings=planner_pool.PLANNER_ARGS, seed=None, check=False, timeout=None):
+    """
+    Cache-aware counterpart of PlannerPool.submit. A hit returns an already
+    completed Future, a miss queues the job on the planner pool and stores its
+    output once the planner has finished.
+    """
+    domain_text, instance_text = read_source(domain), read_source(instance)
+    if domain_text is None or instance_text is None:
+        logging.info(f"Not caching the plan of {instance}: its instance file is unknown")
+        return planner_pool.get_pool().submit(domain, instance, settings, check, timeout)
+    cache = get_cache()
+    pool = planner_pool.get_pool()
+    key = plan_key(domain_text, instance_text, settings, seed, planner_identity(pool))
+    output = cache.get(key)
+    if output is not None:
+        logging.info(f"Plan cache hit for {instance}")
+        future = Future()
+        future.set_result(output)
+        return future
+
+    def store(job):
+        if not job.cancelled() and job.exception() is None:
+            output = job.result()
+            if "Actions received" in output:  # never cache crashed or empty planner runs
+                cache.put(key, output)
+
+    future = pool.submit(domain, instance, settings, check, timeout)
+    future.add_done_callback(store)
+    return future
+
+
+def run_planner_cached(domain, instance, settings=planner_pool.PLANNER_ARGS, seed=None, check=False, timeout=None):
+    """
+    Same as planner_pool.run_planner, but answers repeated requests for the same
+    domain, instance, settings and seed from the plan cache.
+    """
+    return submit_cached(domain, instance, settings, seed, check, timeout).result()
@@ -0,0 +1,231 @@
+# plan_evaluator.py
+
+import math
+from collections import namedtuple
+import numpy as np
+import prost_output
+import rddl_model
+
+# --- Configuration ---
+EPISODES = 10000
+CONFIDENCE_Z = 1.96  # 95% intervals
+REWARD_COMPLETED = 100.0  # reward of domains/domain.rddl
+REWARD_OTHERWISE = -10.0
+
+Estimate = namedtuple("Estimate", ["mean", "low", "high"])
+Evaluation = namedtuple("Evaluation", [
+    "episodes", "expected_reward", "completion_rate", "task_failure_rate",
+    "failures", "responses_triggered", "responses_given",
+])
+
+
+def mean_estimate(values, z=CONFIDENCE_Z):
+    """Sample mean with a normal-approximation confidence interval."""
+    mean = float(values.mean())
+    half = z * float(values.std(ddof=1)) / math.sqrt(len(values)) if len(values) > 1 else 0.0
+    return Estimate(mean, mean - half, mean + half)
+
+
+def rate_estimate(successes, n, z=CONFIDENCE_Z):
+    """Proportion with a Wilson score interval (well-behaved for rates near 0 or 1)."""
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return Estimate(p, max(0.0, centre - half), min(1.0, centre + half))
+
+
+class MonteCarloEvaluator:
+    """
+    Simulates the CPFs of the explanation_planning domain for many episodes at
+    once. Every state fluent is a boolean array with the episodes on the first
+    axis, and each step of an open-loop plan updates all episodes with a few
+    array operations.
+
+    As in RDDL, every Bernoulli(...) of a CPF is sampled independently, so
+    book_fetched, failure_occurred and task_failed each draw their own outcome
+    of a fetch_book. An action whose precondition does not hold in an episode
+    is treated as a noop in that episode, and the reward of a step is computed
+    from the state before the transition.
+    """
+
+    def __init__(self, instance, seed=None):
+        self.instance = instance
+        self.rng = np.random.default_rng(seed)
+        self.robots = instance.index("robot")
+        self.humans = instance.index("human")
+        self.books = instance.index("book")
+        self.waypoints = instance.index("waypoint")
+        self.failures = instance.index("failure")
+        self.responses = instance.index("response")
+
+        self.human_at = self._non_fluent_array("human_at", (self.humans, self.waypoints))
+        self.wants_book = self._non_fluent_array("wants_book", (self.humans, self.books))
+        self.book_at = self._non_fluent_array("book_at", (self.books, self.waypoints))
+        self.prob_failure = np.array(instance.failure_table, dtype=float).reshape(len(self.books), len(self.failures))
+        # prob_response is indexed (response, failure) like the instance atoms
+        self.prob_response = np.array(instance.response_table, dtype=float).reshape(
+            len(self.failures), len(self.responses)).T
+        self.response_pairs = np.nonzero(self.prob_response > 0)
+
+    def _non_fluent_array(self, fluent, indices):
+        array = np.zeros([len(index) for index in indices], dtype=bool)
+        for args in self.instance.facts(fluent):
+            array[tuple(index[a] for index, a in zip(indices, args))] = True
+        return array
+
+    def initial_state(self, k):
+        R, H, B, W = len(self.robots), len(self.humans), len(self.books), len(self.waypoints)
+        F, S = len(self.failures), len(self.responses)
+        state = {
+            "robot_at": np.zeros((k, R, W), dtype=bool),
+            "book_fetched": np.zeros((k, B, R, H), dtype=bool),
+            "failure_occurred": np.zeros((k, B, R, H, F), dtype=bool),
+            "response_triggered": np.zeros((k, S, F), dtype=bool),
+            "response_given": np.zeros((k, S, F), dtype=bool),
+            "book_given": np.zeros((k, B, R, H), dtype=bool),
+            "task_completed": np.zeros(k, dtype=bool),
+            "task_failed": np.zeros(k, dtype=bool),
+        }
+        indices = {
+            "robot_at": (self.robots, self.waypoints),
+            "book_fetched": (self.books, self.robots, self.humans),
+            "failure_occurred": (self.books, self.robots, self.humans, self.failures),
+            "response_triggered": (self.responses, self.failures),
+            "response_given": (self.responses, self.failures),
+            "book_given": (self.books, self.robots, self.humans),
+        }
+        for (fluent, args), value in self.instance.init_state.items():
+            if fluent in indices:
+                state[fluent][(slice(None),) + tuple(index[a] for index, a in zip(indices[fluent], args))] = value
+            elif fluent in state:
+                state[fluent][:] = value
+
+        # running aggregates of the fluents above, kept up to date by _apply
+        state["failure_count"] = state["failure_occurred"].reshape(k, -1, F).sum(axis=1, dtype=np.int32)
+        state["any_response_given"] = state["response_given"].reshape(k, -1).any(axis=1)
+        state["any_book_given"] = state["book_given"].any(axis=1)
+        return state
+
+    def ground(self, action):
+        """Turn a PlannedAction into (name, tuple of object indices)."""
+        types = {
+            "goto_waypoint": (self.robots, self.waypoints, self.waypoints),
+            "fetch_book": (self.robots, self.books, self.humans),
+            "give_response": (self.robots, self.responses, self.failures, self.books, self.humans),
+            "give_book": (self.robots, self.books, self.humans),
+        }
+        if action.name not in types:
+            raise ValueError(f"Unknown action {action}")
+        if len(action.args) != len(types[action.name]):
+            raise ValueError(f"Wrong number of arguments in {action}")
+        try:
+            return action.name, tuple(index[a] for index, a in zip(types[action.name], action.args))
+        except KeyError as e:
+            raise ValueError(f"Unknown object {e} in {action}") from None
+
+    def _colocated(self, state):
+        """(episodes, robot, human): the robot and the human are at the same waypoint."""
+        return np.einsum("krw,hw->krh", state["robot_at"], self.human_at) > 0
+
+    def step(self, state, action):
+        """
+        Advance all episodes by one step, in place. Every condition is computed
+        from the current state before any fluent is written.
+        """
+        k = len(state["task_completed"])
+
+        # response_triggered' fires independently for every (book, robot, human) grounding with a
+        # failure; only (response, failure) pairs with a non-zero probability need to be sampled
+        occurred = state["failure_count"]  # (episodes, failure)
+        pending = np.flatnonzero(occurred.any(axis=1))
+        triggered = None
+        if len(pending) and len(self.response_pairs[0]):
+            s, f = self.response_pairs
+            p = 1.0 - (1.0 - self.prob_response[s, f]) ** occurred[pending][:, f]
+            triggered = self.rng.random(p.shape, dtype=np.float32) < p
+
+        # task_completed' is evaluated on the current state
+        colocated = self._colocated(state)
+        done = state["any_response_given"][:, None, None] | state["any_book_given"]
+        completed = (colocated & done).any(axis=(1, 2)) if len(self.books) else None
+
+        if action is not None:
+            self._apply(state, action, colocated, k)
+        if triggered is not None:
+            s, f = self.response_pairs
+            state["response_triggered"][pending[:, None], s, f] |= triggered
+        if completed is not None:
+            state["task_completed"] |= completed
+
+    def _apply(self, state, action, colocated, k):
+        name, args = action
+        if name == "goto_waypoint":
+            r, wf, wt = args
+            ok = state["robot_at"][:, r, wf] & ~state["task_completed"] & (wf != wt)
+            state["robot_at"][:, r, wf] &= ~ok
+            state["robot_at"][:, r, wt] |= ok
+        elif name == "fetch_book":
+            r, b, h = args
+            at_book = (state["robot_at"][:, r, :] & self.book_at[b][None]).any(axis=1)
+            ok = at_book & self.wants_book[h, b] & ~state["failure_occurred"][:, b, r, h, :].any(axis=1)
+            p = self.prob_failure[b]
+            fetch_failed = (self.rng.random((k, len(p)), dtype=np.float32) < p).any(axis=1)
+            failed = ok[:, None] & (self.rng.random((k, len(p)), dtype=np.float32) < p)
+            task_failed = ok & (self.rng.random((k, len(p)), dtype=np.float32) < p).any(axis=1)
+            state["book_fetched"][:, b, r, h] |= ok & ~fetch_failed
+            state["failure_count"] += failed & ~state["failure_occurred"][:, b, r, h, :]
+            state["failure_occurred"][:, b, r, h, :] |= failed
+            state["task_failed"] |= task_failed
+        elif name == "give_response":
+            r, s, f, b, h = args
+            ok = colocated[:, r, h] & state["failure_occurred"][:, b, r, h, f] & state["response_triggered"][:, s, f]
+            state["response_given"][:, s, f] |= ok
+            state["any_response_given"] |= ok
+        elif name == "give_book":
+            r, b, h = args
+            ok = colocated[:, r, h] & state["book_fetched"][:, b, r, h]
+            state["book_given"][:, b, r, h] |= ok
+            state["any_book_given"][:, r, h] |= ok
+
+    def evaluate(self, plan, episodes=EPISODES, horizon=None):
+        """
+        Roll out an open-loop plan and summarize the outcome.
+
+        :param plan: Actions as PlannedAction or 'name(arg, ...)' strings (e.g. from prost_output).
+        :param episodes: Number of parallel episodes.
+        :param horizon: Steps to simulate (default: the instance horizon, or the plan length).
+        :return: An Evaluation with Estimate(mean, low, high) values.
+        """
+        actions = []
+        for action in plan:
+            if isinstance(action, str):
+                action = prost_output.parse_action(action)
+            if action is not None and action.name != "noop":
+                actions.append(self.ground(action))
+        horizon = horizon or self.instance.horizon or len(actions)
+
+        state = self.initial_state(episodes)
+        rewards = np.zeros(episodes)
+        for step in range(horizon):
+            rewards += np.where(state["task_completed"], REWARD_COMPLETED, REWARD_OTHERWISE)
+            self.step(state, actions[step] if step < len(actions) else None)
+
+        failures = state["failure_occurred"].any(axis=(1, 2, 3)).sum(axis=0)
+        triggered = state["response_triggered"].any(axis=2).sum(axis=0)
+        given = state["response_given"].any(axis=2).sum(axis=0)
+        return Evaluation(
+            episodes=episodes,
+            expected_reward=mean_estimate(rewards),
+            completion_rate=rate_estimate(int(state["task_completed"].sum()), episodes),
+            task_failure_rate=rate_estimate(int(state["task_failed"].sum()), episodes),
+            failures={f: rate_estimate(int(failures[i]), episodes) for f, i in self.failures.items()},
+            responses_triggered={s: rate_estimate(int(triggered[i]), episodes) for s, i in self.responses.items()},
+            responses_given={s: rate_estimate(int(given[i]), episodes) for s, i in self.responses.items()},
+        )
+
+
+def evaluate_plan(instance_path, plan, episodes=EPISODES, seed=None, domain_path=None):
+    """Evaluate a plan on an instance file (parsed through the shared model cache)."""
+    instance = rddl_model.cached_instance(instance_path, domain_path)
+    return MonteCarloEvaluator(instance, seed).evaluate(plan, episodes)
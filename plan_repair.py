@@ -0,0 +1,61 @@
+# plan_repair.py
+
+import logging
+from collections import namedtuple
+import planner_pool
+import prost_output
+import rddl_rewrite
+import rddl_simulator
+
+# --- Configuration ---
+REPAIR_SUFFIX = "_repair"
+MIN_HORIZON = 1
+
+RepairedPlan = namedtuple("RepairedPlan", ["plan", "prefix", "suffix", "instance"])
+
+
+def repair_instance(instance, state, executed_steps, edits=()):
+    """
+    Build the instance of a plan repair: a copy of instance whose init-state is
+    the observed state after executed_steps steps (see
+    rddl_simulator.state_atoms) and whose horizon is what is left of the
+    original one. Extra rddl_rewrite edits (e.g. probability changes) are
+    applied on top. The state needs every true state fluent, as the embedded
+    simulator reports it.
+    """
+    horizon = max(MIN_HORIZON, (instance.horizon or executed_steps + MIN_HORIZON) - executed_steps)
+    return rddl_rewrite.apply_edits(instance.copy(), [
+        rddl_rewrite.set_init_state(rddl_simulator.state_atoms(state)),
+        rddl_rewrite.SetHorizon(horizon),
+        rddl_rewrite.RenameInstance(None, instance.name + REPAIR_SUFFIX),
+    ] + list(edits))
+
+
+def plan_suffix(domain_path, repaired, settings=planner_pool.PLANNER_ARGS, timeout=None):
+    """Plan a repair instance (in memory, on the planner pool) and return its actions."""
+    with planner_pool.MemoryInstance(repaired.to_rddl(), repaired.name) as memory_instance:
+        output = planner_pool.run_planner(domain_path, memory_instance, settings, timeout=timeout)
+    return prost_output.action_strings(output.splitlines())
+
+
+def splice(prefix, suffix):
+    """The executed prefix followed by the repaired suffix."""
+    return list(prefix) + list(suffix)
+
+
+def repair_plan(domain_path, instance, state, prefix, edits=(), settings=planner_pool.PLANNER_ARGS, timeout=None):
+    """
+    Repair a plan from the state its execution stopped in instead of replanning
+    from the start: plan only the remaining horizon from that state and splice
+    the result onto the executed prefix.
+
+    :param instance: The RDDLInstance the prefix was executed on.
+    :param state: The observed state after the last action of prefix (a step result).
+    :param prefix: The actions executed so far, including the one that failed.
+    :return: A RepairedPlan(plan, prefix, suffix, instance).
+    """
+    repaired = repair_instance(instance, state, len(prefix), edits)
+    suffix = plan_suffix(domain_path, repaired, settings, timeout)
+    logging.info(f"Repaired {instance.name} after {len(prefix)} steps: {len(suffix)} new actions "
+                 f"(horizon {repaired.horizon})")
+    return RepairedPlan(splice(prefix, suffix), list(prefix), suffix, repaired)
@@ -6,24 +6,36 @@ import time
 import threading
 import os
 import logging
+import resource
+import multiprocessing
+from collections import namedtuple
+import planner_pool
+import plan_cache
+import prost_output
+import rddl_model
 
 # Configure logging to write to a file with timestamped messages
 logging.basicConfig(filename='planner.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Result of an anytime planning call: the best plan found before the deadline plus progress metadata
+AnytimePlan = namedtuple("AnytimePlan", ["plan", "complete", "rounds_completed", "steps_received", "reward", "elapsed"])
+
+
 class PlannerInterface:
     """
     Provides interface for interacting with the PROST planner and generating plans
     for different strategies and RDDL problem instances.
     """
 
-    def generate_plan(self, instance_name):
+    def generate_plan(self, instance_name, use_cache=False):
         """Run the planner on a specific RDDL instance and return extracted actions."""
         try:
             planner_settings = "[Prost -s 1 -se [IPC2014]]"
-            prost_command = ["/home/robolab/planning_ws/planners/prost/prost.py", instance_name, planner_settings]
-            result = subprocess.run(prost_command, capture_output=True, text=True, check=True)
-            actions = re.findall(r"[a-zA-Z_]+\([^()0-9]*\)", result.stdout)
-            plan = [a for a in actions[-len(actions)//2:] if a != 'noop()']
+            if use_cache:
+                lines = plan_cache.run_planner_cached(None, instance_name, planner_settings, check=True).splitlines()
+            else:
+                lines = planner_pool.get_pool().stream(None, instance_name, planner_settings, check=True)
+            plan = prost_output.action_strings(lines)
             logging.info(f"Generated plan for {instance_name}: {plan}")
             return plan
         except subprocess.CalledProcessError as e:
@@ -38,17 +50,32 @@ class PlannerInterface:
         return [plan1, plan2]
 
     def generate_anytime_plan(self, instance_name, timeout):
-        """Run planner in a separate thread with a timeout to simulate anytime planning."""
-        result = []
-
-        def run_planner():
-            nonlocal result
-            result = self.generate_plan(instance_name)
-
-        thread = threading.Thread(target=run_planner)
-        thread.start()
-        thread.join(timeout)
-        final = result if result else ["partial(plan) due to timeout"]
+        """
+        Plan under a hard deadline. PROST output is streamed round by round and
+        the best plan seen so far is kept; when the deadline expires the planner
+        process tree is killed and that best plan is returned as a partial plan.
+        """
+        planner_settings = "[Prost -s 1 -se [IPC2014]]"
+        tracker = prost_output.RoundTracker()
+        start = time.monotonic()
+        complete = False
+        try:
+            for line in planner_pool.get_pool().stream(None, instance_name, planner_settings, check=True, timeout=timeout):
+                tracker.feed(line)
+            complete = True
+        except subprocess.TimeoutExpired:
+            logging.warning(f"Anytime planning for {instance_name} hit its {timeout} s deadline")
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Error generating anytime plan for {instance_name}: {e.stderr}")
+
+        final = AnytimePlan(
+            plan=[str(action) for action in tracker.best_plan()],
+            complete=complete,
+            rounds_completed=tracker.rounds_completed,
+            steps_received=tracker.records,
+            reward=tracker.best_reward,
+            elapsed=time.monotonic() - start,
+        )
         logging.info(f"Anytime plan result for {instance_name}: {final}")
         return final
 
@@ -62,15 +89,53 @@ class PlannerInterface:
         logging.info(f"Loaded plan from log {path}")
         return plan
 
-    def compare_strategies(self):
-        """Generate and return plans for pre-hoc, reactive, and post-hoc for comparison."""
-        plans = {
-            'pre': self.generate_plan("instance_prehoc"),
-            'reactive': self.generate_plan("instance_reactive"),
-            'post': self.generate_plan("instance_posthoc")
-        }
-        logging.info("Compared strategies")
-        return plans
+    def compare_strategies(self, instances=("instance",), processes=None):
+        """
+        Plan every strategy variant (<instance>_prehoc, _reactive, _posthoc) of
+        every given instance in parallel on a process pool and return one
+        StrategyResult per (instance, strategy) with plan and timing figures.
+        """
+        jobs = [(strategy, f"{base}_{suffix}") for base in instances for strategy, suffix in STRATEGY_SUFFIXES.items()]
+        # one job per worker process (chunksize 1), so every measurement starts from a fresh process
+        with multiprocessing.Pool(processes, maxtasksperchild=1) as pool:
+            results = pool.starmap(plan_strategy_timed, jobs, chunksize=1)
+
+        for r in results:
+            logging.info(f"Compared {r.strategy} on {r.instance}: {r.plan_length} actions, wall {r.wall_time:.2f} s, "
+                         f"cpu {r.cpu_time:.2f} s, peak RSS {r.peak_rss_kb} kB")
+        return results
+
+
+# Instance suffix planned for each strategy by compare_strategies
+STRATEGY_SUFFIXES = {'pre': "prehoc", 'reactive': "reactive", 'post': "posthoc"}
+
+# Plan and resource usage of one strategy run in compare_strategies
+StrategyResult = namedtuple("StrategyResult", ["strategy", "instance", "plan", "wall_time", "cpu_time", "peak_rss_kb", "plan_length"])
+
+
+def plan_strategy_timed(strategy, instance_name):
+    """
+    Plan one strategy instance and measure it. Runs in a fresh worker process,
+    so CPU time and peak RSS cover this planner run (including PROST) only;
+    the process's planner pool is started before and shut down after the
+    measurement.
+    """
+    planner_pool.get_pool()
+    start_wall = time.perf_counter()
+    start_self = resource.getrusage(resource.RUSAGE_SELF)
+    start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    # never from the plan cache: a cache hit would time the lookup instead of the planner
+    plan = PlannerInterface().generate_plan(instance_name, use_cache=False)
+
+    wall_time = time.perf_counter() - start_wall
+    end_self = resource.getrusage(resource.RUSAGE_SELF)
+    end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time = sum(end.ru_utime + end.ru_stime - start.ru_utime - start.ru_stime
+                   for start, end in ((start_self, end_self), (start_children, end_children)))
+    peak_rss_kb = max(end_self.ru_maxrss, end_children.ru_maxrss)
+    planner_pool.shutdown_pool()
+    return StrategyResult(strategy, instance_name, plan, wall_time, cpu_time, peak_rss_kb, len(plan))
 
 
 class PlanExecutor:
@@ -197,19 +262,19 @@ class RDDLAnalyzer:
         return "robot1", "visitor1"
 
     def parse_problem_file(self, path):
-        """Parse failure and response probabilities from the problem file."""
-        failure_probs = {}
-        response_probs = {}
-
-        with open(path, 'r') as f:
-            content = f.read()
-
-        failure_matches = re.findall(r"prob_failure\((\w+)\)\s*=\s*([\d.]+);", content)
-        for f, p in failure_matches:
-            failure_probs[f] = float(p)
+        """
+        Parse failure and response probabilities from the problem file.
+        prob_failure is per (book, failure); a failure's probability is taken
+        as its highest probability over all books.
+        """
+        instance = rddl_model.cached_instance(path)
+        failures = instance.objects_of("failure")
+        responses = instance.objects_of("response")
 
-        response_matches = re.findall(r"prob_response\((\w+),\s*(\w+)\)\s*=\s*([\d.]+);", content)
-        for r, f, p in response_matches:
-            response_probs.setdefault(f, {})[r] = float(p)
+        failure_probs = {
+            f: max((row[j] for row in instance.failure_table), default=0.0)
+            for j, f in enumerate(failures)
+        }
+        response_probs = {f: dict(zip(responses, row)) for f, row in zip(failures, instance.response_table)}
 
         return failure_probs, response_probs
@@ -0,0 +1,526 @@
+# planner_pool.py
+
+import atexit
+import hashlib
+import itertools
+import logging
+import os
+import queue
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+import run_context
+
+# --- Configuration ---
+# Setting EXPLANATION_PLANNING_FAKE_PLANNERS=1 replaces PROST and RDDLSim by the
+# stand-ins next to this file (fake_prost.py, fake_rddlsim.py); each executable
+# can also be set on its own through the environment variable named below.
+FAKE_PLANNERS = os.environ.get("EXPLANATION_PLANNING_FAKE_PLANNERS", "") not in ("", "0")
+FAKE_PROST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_prost.py")
+FAKE_RDDLSIM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_rddlsim.py")
+
+
+def configured(env_var, default, fake=None):
+    """Executable to use: the environment variable if set, else the fake (if enabled and given), else default."""
+    if os.environ.get(env_var):
+        return os.environ[env_var]
+    return fake if FAKE_PLANNERS and fake is not None else default
+
+
+PLANNER_SCRIPT = configured("PROST_PLANNER_SCRIPT", "src/rosplan/rosplan_planning_system/common/bin/prost/run_prost.sh", FAKE_PROST)
+PROST_CLIENT = configured("PROST_CLIENT", "/home/robolab/planning_ws/planners/prost/prost.py", FAKE_PROST)
+SERVER_SCRIPT = configured("RDDLSIM_SERVER", "/home/robolab/planning_ws/planners/prost/testbed/run-server.py", FAKE_RDDLSIM)
+# where the RDDLSim server finds the instances that are planned by name (domain None)
+BENCHMARK_DIR = configured("RDDLSIM_BENCHMARK_DIR", "/home/robolab/planning_ws/planners/prost/testbed/benchmarks/explanation_planning",
+                           os.curdir)
+PLANNER_ARGS = "[PROST -s 1 -se [IPPC2014]]"
+BASE_PORT = None  # None: every worker server gets a free port, so several processes can each have a pool
+POOL_SIZE = 2
+MAX_JOBS_PER_WORKER = 50
+# EXPLANATION_PLANNING_WARM_SERVERS=1 makes the workers of the default pool keep an RDDLSim
+# server up and plan every job through the PROST client (see PlannerWorker)
+WARM_SERVERS = os.environ.get("EXPLANATION_PLANNING_WARM_SERVERS", "") not in ("", "0")
+SERVER_STARTUP_TIMEOUT = 30.0  # seconds a worker server may take to accept connections
+INSTANCE_NAME_PATTERN = re.compile(r"\binstance\s+([\w-]+)\s*\{")
+NON_FLUENTS_NAME_PATTERN = re.compile(r"\bnon-fluents\s+([\w-]+)\s*\{")
+
+
+def kill_process_group(proc):
+    """Kill a planner started in its own session together with everything it spawned."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class MemoryInstance:
+    """
+    Instance text held in an anonymous in-memory file (a memfd, or an unlinked
+    temporary file where memfd_create is not available). Planners open it as
+    /dev/fd/<fd>, the descriptor being passed on to the planner process, so a
+    derived instance can be planned without writing it to the working directory.
+    Can be planned any number of times until it is closed.
+    """
+
+    def __init__(self, text, name="instance"):
+        self.text = text
+        self.name = name
+        if hasattr(os, "memfd_create"):
+            self.fd = os.memfd_create(name)
+        else:
+            with tempfile.TemporaryFile() as f:
+                self.fd = os.dup(f.fileno())
+        data = memoryview(text.encode("utf-8"))
+        while data:
+            data = data[os.write(self.fd, data):]
+        self.path = f"/dev/fd/{self.fd}"
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.name
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def free_port():
+    """A TCP port that is free right now, for a worker's RDDLSim server."""
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, proc, timeout=SERVER_STARTUP_TIMEOUT):
+    """Block until the server process proc accepts connections on port; RuntimeError if it exits or times out."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("localhost", port), timeout=1.0):
+                return
+        except OSError:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError(f"RDDLSim server exited (return code {proc.returncode}) before listening on {port}")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"RDDLSim server did not listen on port {port} within {timeout} s")
+        time.sleep(0.05)
+
+
+def served_instance(text):
+    """
+    Name and text under which a warm server serves an instance: the instance
+    and its non-fluents block are renamed after the digest of the text, so
+    derived instances (which keep the names of the instance they came from)
+    never clash with it or with each other in the server's directory.
+    """
+    match = INSTANCE_NAME_PATTERN.search(text)
+    if match is None:
+        raise ValueError("No instance declaration in the instance text")
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+    names = [match.group(1)] + NON_FLUENTS_NAME_PATTERN.findall(text)
+    for name in names:
+        text = re.sub(rf"(?<![\w-]){re.escape(name)}(?![\w-])", f"{name}_{digest}", text)
+    return f"{match.group(1)}_{digest}", text
+
+
+def named_instance_path(name, benchmark_dir=BENCHMARK_DIR):
+    """The file <benchmark_dir>/<name>.rddl a named instance is served from, or None if there is none."""
+    path = os.path.join(benchmark_dir, f"{name}.rddl")
+    return path if os.path.isfile(path) else None
+
+
+def instance_fds(instance):
+    """File descriptors a planner process needs to inherit to read the instance."""
+    return (instance.fd,) if isinstance(instance, MemoryInstance) else ()
+
+
+class PlannerJob(Future):
+    """
+    Future of a planning job that can also stop the planner while it runs.
+    A queued job is simply cancelled, a running one has its process group killed
+    and then fails with subprocess.TimeoutExpired carrying the partial output.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._kill = None
+        self._kill_requested = False
+
+    def attach(self, kill):
+        """Called by the worker with a callable that kills the running planner."""
+        with self._lock:
+            self._kill = kill
+            if not self._kill_requested:
+                return
+        kill()
+
+    def kill(self):
+        """Stop the job, whether it is still queued or already running."""
+        if self.cancel():
+            return
+        with self._lock:
+            self._kill_requested = True
+            kill = self._kill
+        if kill is not None:
+            kill()
+
+
+class PlannerWorker:
+    """
+    One planner slot of the pool. A warm worker keeps its own RDDLSim server
+    alive between jobs, so PROST clients only pay for the planning itself and
+    not for the server start-up and handshake that run_prost.sh goes through on
+    every call. The server serves a private workspace: the files of the
+    benchmark directory (for instances planned by name) and the domain and
+    instance of every job planned so far, each instance under a name of its
+    own (see served_instance). RDDLSim only reads its directory on start-up,
+    so a job that brings a new domain or instance restarts the server, which
+    is no cheaper than the cold path; planning an instance again is warm.
+
+    A cold worker (warm=False) starts run_prost.sh for every job with a domain,
+    and serves the benchmark directory itself if one is given.
+    """
+
+    def __init__(self, worker_id, planner_script=PLANNER_SCRIPT, prost_client=PROST_CLIENT,
+                 benchmark_dir=None, port=None, warm=False):
+        self.worker_id = worker_id
+        self.planner_script = planner_script
+        self.prost_client = prost_client
+        self.benchmark_dir = benchmark_dir
+        self.port = port
+        self.warm = warm
+        self.workspace = None
+        self.served = {}  # file name -> text of the files in the workspace
+        self.server_proc = None
+        self.server_starts = 0
+        self.jobs_done = 0
+
+    def start(self):
+        """Start the RDDLSim session of this worker (if it uses one)."""
+        if self.warm and self.workspace is None:
+            self.workspace = run_context.RunContext(f"planner_worker{self.worker_id}")
+            if self.benchmark_dir is not None:
+                for name in os.listdir(self.benchmark_dir):
+                    if name.endswith(".rddl"):
+                        shutil.copyfile(os.path.join(self.benchmark_dir, name), self.workspace.file(name))
+        server_dir = self.workspace.path if self.warm else self.benchmark_dir
+        if server_dir is None:
+            return
+        if self.port is None:
+            self.port = free_port()
+        command = ["python3", SERVER_SCRIPT, "-b", server_dir, "-p", str(self.port)]
+        self.server_proc = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                            stderr=subprocess.DEVNULL)
+        self.server_starts += 1
+        wait_for_port(self.port, self.server_proc)
+        logging.info(f"Planner worker {self.worker_id} started RDDLSim session (pid {self.server_proc.pid}, "
+                     f"port {self.port})")
+
+    def is_alive(self):
+        """A worker without a server is always usable, otherwise the server must still run."""
+        return self.server_proc is None or self.server_proc.poll() is None
+
+    def _serve_file(self, name, text):
+        """Put a file into the workspace; returns True if the server does not know it yet."""
+        if self.served.get(name) == text:
+            return False
+        with open(self.workspace.file(name), "w") as f:
+            f.write(text)
+        self.served[name] = text
+        return True
+
+    def serve(self, domain, instance):
+        """
+        Make a domain/instance job known to the warm server (restarting it if
+        the files are new) and return the instance name to request from it.
+        """
+        with open(domain, "r") as f:
+            domain_text = f.read()
+        if isinstance(instance, MemoryInstance):
+            instance_text = instance.text
+        else:
+            with open(instance, "r") as f:
+                instance_text = f.read()
+        name, instance_text = served_instance(instance_text)
+        changed = self._serve_file(os.path.basename(domain), domain_text)
+        changed = self._serve_file(f"{name}.rddl", instance_text) or changed
+        if changed:
+            # RDDLSim reads its benchmark directory on start-up only
+            self.stop_server()
+            self.start()
+        return name
+
+    def build_command(self, domain, instance, settings):
+        """
+        Build the planner command line. A warm worker plans every job with the
+        PROST client against its server. A cold worker uses the self-contained
+        run_prost.sh script for a domain file; without one the PROST client
+        connects to the RDDLSim server that already knows the instance by name
+        (the worker's own if it has one, otherwise one started elsewhere).
+        """
+        if domain is not None and self.warm:
+            instance = self.serve(domain, instance)
+            domain = None
+        if domain is None:
+            command = [self.prost_client, os.fspath(instance)]
+            if self.server_proc is not None and (not self.warm or os.path.isfile(self.workspace.file(f"{instance}.rddl"))):
+                command += ["-p", str(self.port)]
+            return command + [settings]
+        return [self.planner_script, domain, os.fspath(instance), settings]
+
+    def client_env(self):
+        """Environment of the planner process; the PROST stand-in reads the served instances from the workspace."""
+        if self.workspace is None:
+            return None
+        return dict(os.environ, FAKE_PROST_INSTANCE_DIR=self.workspace.path)
+
+    def run(self, domain, instance, settings, check=False, timeout=None, on_line=None, job=None):
+        """
+        Run one planning job and return the planner output as text.
+
+        The output is read from the planner's stdout pipe until EOF and the
+        process is reaped, so the job only completes once the planner has really
+        finished. When the timeout expires the whole planner process group is
+        killed and subprocess.TimeoutExpired is raised with the partial output.
+        If on_line is given every line is handed to it as soon as it is read and
+        the output is not accumulated (an empty string is returned). A PlannerJob
+        passed as job can kill the planner early through PlannerJob.kill().
+        """
+        command = self.build_command(domain, instance, settings)
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                start_new_session=True, pass_fds=instance_fds(instance), env=self.client_env())
+        timed_out = threading.Event()
+
+        def expire():
+            timed_out.set()
+            kill_process_group(proc)
+
+        timer = threading.Timer(timeout, expire) if timeout is not None else None
+        if timer:
+            timer.start()
+        if job is not None:
+            job.attach(expire)
+        chunks = []
+        try:
+            for line in proc.stdout:
+                if on_line is None:
+                    chunks.append(line)
+                else:
+                    on_line(line)
+            proc.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            proc.stdout.close()
+        self.jobs_done += 1
+        output = "".join(chunks)
+
+        if timed_out.is_set():
+            logging.warning(f"Planner on {instance} was killed (timeout {timeout} s)")
+            raise subprocess.TimeoutExpired(command, timeout, output=output)
+        if check and proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, command, output=output, stderr=output)
+        return output
+
+    def stop_server(self):
+        """Shut down the RDDLSim server of this worker."""
+        if self.server_proc and self.server_proc.poll() is None:
+            self.server_proc.terminate()
+            try:
+                self.server_proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.server_proc.kill()
+                self.server_proc.wait()
+        self.server_proc = None
+
+    def stop(self):
+        """Shut down the RDDLSim session of this worker and remove its workspace."""
+        self.stop_server()
+        if self.workspace is not None:
+            self.workspace.cleanup()
+            self.workspace = None
+            self.served = {}
+
+
+class PlannerPool:
+    """
+    Keeps a fixed number of planner workers alive and hands planning jobs to
+    whichever worker is free. Workers are recycled after a number of jobs or as
+    soon as their RDDLSim session dies. With warm=True every worker keeps its
+    own RDDLSim server (see PlannerWorker); base_port None gives each server a
+    free port.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_jobs_per_worker=MAX_JOBS_PER_WORKER, planner_script=PLANNER_SCRIPT,
+                 prost_client=PROST_CLIENT, benchmark_dir=None, base_port=BASE_PORT, warm=False):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.planner_script = planner_script
+        self.prost_client = prost_client
+        self.benchmark_dir = benchmark_dir
+        self.base_port = base_port
+        self.warm = warm
+        self.jobs = queue.Queue()
+        self.recycled = 0
+        self._worker_ids = itertools.count()
+        self._threads = []
+        self._closed = False
+
+        # the workers (and their servers) are up by the time the pool is returned
+        for slot in range(size):
+            thread = threading.Thread(target=self._serve, args=(slot, self._new_worker(slot)), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _new_worker(self, slot):
+        port = self.base_port + slot if self.base_port is not None else None
+        worker = PlannerWorker(next(self._worker_ids), self.planner_script, self.prost_client,
+                               self.benchmark_dir, port, self.warm)
+        worker.start()
+        return worker
+
+    def _serve(self, slot, worker):
+        """Worker loop: take jobs from the queue until the pool shuts down."""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            future, domain, instance, settings, check, timeout, on_line = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if not worker.is_alive() or worker.jobs_done >= self.max_jobs_per_worker:
+                logging.info(f"Recycling planner worker {worker.worker_id} after {worker.jobs_done} jobs")
+                worker.stop()
+                worker = self._new_worker(slot)
+                self.recycled += 1
+
+            try:
+                future.set_result(worker.run(domain, instance, settings, check, timeout, on_line, future))
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+                future.set_exception(e)
+            except Exception as e:
+                logging.error(f"Planner worker {worker.worker_id} crashed on {instance}: {e}")
+                worker.stop()
+                worker = self._new_worker(slot)
+                self.recycled += 1
+                future.set_exception(e)
+        worker.stop()
+
+    def submit(self, domain, instance, settings=PLANNER_ARGS, check=False, timeout=None, on_line=None):
+        """
+        Queue a planning job and return a PlannerJob resolving to the planner
+        output. The job completes as soon as the planner exits (or is killed
+        after timeout seconds, in which case it raises subprocess.TimeoutExpired).
+        """
+        if self._closed:
+            raise RuntimeError("Planner pool has been shut down")
+        future = PlannerJob()
+        self.jobs.put((future, domain, instance, settings, check, timeout, on_line))
+        return future
+
+    def plan(self, domain, instance, settings=PLANNER_ARGS, check=False, timeout=None):
+        """Run a planning job on the pool and block until its output is available."""
+        return self.submit(domain, instance, settings, check, timeout).result()
+
+    def stream(self, domain, instance, settings=PLANNER_ARGS, check=False, timeout=None):
+        """
+        Run a planning job on the pool and yield its output lines while the
+        planner is still running. Errors of the job are raised once the output
+        is exhausted. Closing the generator early kills the planner.
+        """
+        lines = queue.Queue()
+        future = self.submit(domain, instance, settings, check, timeout, on_line=lines.put)
+        future.add_done_callback(lambda _: lines.put(None))
+        try:
+            while True:
+                line = lines.get()
+                if line is None:
+                    break
+                yield line
+        finally:
+            if not future.done():
+                future.kill()
+        future.result()
+
+    def shutdown(self):
+        """Stop all workers once the jobs already queued are done."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self.jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide planner pool, creating it on first use. With
+    WARM_SERVERS its workers keep warm RDDLSim servers that also serve the
+    instances of BENCHMARK_DIR, if that directory exists.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            benchmark_dir = BENCHMARK_DIR if os.path.isdir(BENCHMARK_DIR) else None
+            _default_pool = PlannerPool(benchmark_dir=benchmark_dir, warm=WARM_SERVERS)
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
+
+
+def shutdown_pool():
+    """
+    Shut down the process-wide pool (and its servers) if there is one. Worker
+    processes of a multiprocessing.Pool exit without running atexit handlers,
+    so code running in them calls this once it is done planning.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        pool, _default_pool = _default_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def run_planner(domain, instance, settings=PLANNER_ARGS, check=False, timeout=None):
+    """
+    Plan an instance on the shared pool and return the planner output.
+
+    :param domain: Path to the domain file, or None to plan a named instance via the PROST client.
+    :param instance: Path to the instance file, a MemoryInstance (or the instance name when domain is None).
+    :param settings: PROST search settings.
+    :param check: Raise CalledProcessError when the planner exits with an error.
+    :param timeout: Seconds after which the planner is killed and TimeoutExpired is raised.
+    :return: The planner output as text.
+    """
+    return get_pool().plan(domain, instance, settings, check, timeout)
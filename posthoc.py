@@ -1,73 +1,73 @@
 import subprocess
-import time
 import re
 import argparse
+import planner_pool
+import plan_cache
+import prost_output
+import run_context
+import rddl_prune
+import stage_timing
 
 # --- Configuration ---
 
-PLANNER_SCRIPT = "src/rosplan/rosplan_planning_system/common/bin/prost/run_prost.sh"
 DOMAIN_FILE = "./domain.rddl"
 INSTANCE_FILE = "./instance_failures_responses.rddl"
 PLANNER_ARGS = "[PROST -s 1 -se [IPPC2014]]"
 PLAN_FILE = "./rddl_plan_output.log"
+PLANNER_TIMEOUT = None  # seconds after which PROST is killed; None lets a slow search finish
+PRUNE_INSTANCES = True  # hand PROST the instance without groundings that can never fire
 
 # --- Run the Planner ---
 
-def run_planner(domain_path, instance_path):
-    print("Running planner via shell script...")
-    with open(PLAN_FILE, "w") as f:
-        subprocess.run([
-            PLANNER_SCRIPT,
-            domain_path,
-            instance_path,
-            PLANNER_ARGS
-        ], stdout=f, stderr=subprocess.STDOUT, text=True)
-
-# --- Wait for Output File ---
-
-def wait_for_plan(timeout=30):
+def run_planner(domain_path, instance_path, use_cache=False, timeout=PLANNER_TIMEOUT):
+    """Start the planner on the planner pool and return a Future for its raw output."""
+    print("Running planner via the planner pool...")
+    if PRUNE_INSTANCES:
+        with stage_timing.stage("derivation"):
+            instance_path = rddl_prune.planner_instance(instance_path)
+    if use_cache:
+        return plan_cache.submit_cached(domain_path, instance_path, PLANNER_ARGS, timeout=timeout)
+    return planner_pool.get_pool().submit(domain_path, instance_path, PLANNER_ARGS, timeout=timeout)
+
+# --- Wait for Planner Completion ---
+
+def wait_for_plan(job, plan_file=PLAN_FILE):
+    """
+    Block until the planner run behind job has exited and return its output lines.
+    The pool kills planners that exceed their timeout; no lines are returned then.
+    """
     print("Waiting for planner output...")
-    waited = 0
-    while waited < timeout:
-        try:
-            with open(PLAN_FILE, "r") as f:
-                lines = f.readlines()
-                if lines:
-                    return lines
-        except FileNotFoundError:
-            pass
-        time.sleep(2)
-        waited += 2
-    return []
+    try:
+        output = job.result()
+    except subprocess.TimeoutExpired as e:
+        print(f"Planner did not finish within {e.timeout} s and was stopped.")
+        return []
+    if plan_file:
+        with open(plan_file, "w") as f:
+            f.write(output)
+    return output.splitlines(keepends=True)
 
 # --- Analyze Plan for Explanation Actions ---
 
 def analyze_plan(plan_lines):
     """Extract give_response actions and generate general verbalizations."""
     explanations = []
-    for line in plan_lines:
-        if "** Actions received:" in line:
-            match = re.search(r"give_response\(([^,]+), ([^,]+), ([^,]+), ([^,]+), ([^)]+)\);", line)
-            if match:
-                robot, response_type, failure_type, book, human = match.groups()
-                readable = failure_type.replace("_", " ").lower()
-                response_readable = response_type.replace("_", " ").lower()
-                explanation = (
-                    f"The robot {robot} needed to provide a {response_readable} response "
-                    f"after encountering a {readable} problem while attempting to deliver {book} to {human}."
-                )
-                explanations.append(explanation)
+    for action in prost_output.plan_actions(plan_lines):
+        if action.name == "give_response" and len(action.args) == 5:
+            robot, response_type, failure_type, book, human = action.args
+            readable = failure_type.replace("_", " ").lower()
+            response_readable = response_type.replace("_", " ").lower()
+            explanation = (
+                f"The robot {robot} needed to provide a {response_readable} response "
+                f"after encountering a {readable} problem while attempting to deliver {book} to {human}."
+            )
+            explanations.append(explanation)
     return explanations
 
 # --- Print the Plan Actions ---
 
 def extract_actions(plan_lines):
-    actions = []
-    for line in plan_lines:
-        if "Actions received:" in line:
-            matches = re.findall(r"([a-zA-Z_]+\([^()]*\))", line)
-            actions.extend([a for a in matches if a != "noop()"])
-    return actions
+    return prost_output.action_strings(plan_lines)
 
 def print_plan_actions(plan_lines):
     """Print all meaningful actions from the plan."""
@@ -84,15 +84,19 @@ def print_plan_actions(plan_lines):
 
 # --- Main Execution ---
 
-def main_gui(domain_path, instance_path):
-    run_planner(domain_path, instance_path)
-    plan_lines = wait_for_plan()
+def main_gui(domain_path, instance_path, ctx=None, use_cache=True):
+    with run_context.use_context(ctx, "posthoc") as ctx:
+        job = run_planner(domain_path, instance_path, use_cache=use_cache)
+        with stage_timing.stage("planner"):
+            plan_lines = wait_for_plan(job, plan_file=ctx.file("rddl_plan_output.log"))
     if not plan_lines:
         print("No planner output found.")
     else:
         print("Planner output captured. Plan:")
-        plan = print_plan_actions(plan_lines)
-        explanations = analyze_plan(plan_lines)
+        with stage_timing.stage("parse"):
+            plan = print_plan_actions(plan_lines)
+        with stage_timing.stage("verbalization"):
+            explanations = analyze_plan(plan_lines)
         if explanations:
             print("\nPosthoc Explanation(s):")
             for exp in explanations:
@@ -111,8 +115,8 @@ def main():
     domain_path = args.domain
     instance_path = args.instance
 
-    run_planner(domain_path, instance_path)
-    plan_lines = wait_for_plan()
+    job = run_planner(domain_path, instance_path)
+    plan_lines = wait_for_plan(job)
     if not plan_lines:
         print("No planner output found.")
     else:
@@ -1,69 +1,79 @@
 
 import subprocess
-import time
 import re
-import shutil
 import os
 import argparse
 from pathlib import Path
+import planner_pool
+import plan_cache
+import prost_output
+import run_context
+import rddl_prune
+import stage_timing
+import rddl_model
 
 # --- Configuration ---
-PLANNER_SCRIPT = "src/rosplan/rosplan_planning_system/common/bin/prost/run_prost.sh"
 DOMAIN_FILE = "./domain.rddl"
 PLANNER_ARGS = "[PROST -s 1 -se [IPPC2014]]"
 PLAN_FILE = "./rddl_plan_output.log"
-
-def run_planner(domain_file, instance_file):
+PLANNER_TIMEOUT = None  # seconds after which PROST is killed; None lets a slow search finish
+PRUNE_INSTANCES = True  # hand PROST the instance without groundings that can never fire
+
+def submit_planner(domain_file, instance_file, use_cache=False, timeout=PLANNER_TIMEOUT):
+    """Start one planner run on the planner pool and return a Future for its raw output."""
+    if PRUNE_INSTANCES:
+        with stage_timing.stage("derivation"):
+            instance_file = rddl_prune.planner_instance(instance_file)
+    if use_cache:
+        return plan_cache.submit_cached(domain_file, instance_file, PLANNER_ARGS, timeout=timeout)
+    return planner_pool.get_pool().submit(domain_file, instance_file, PLANNER_ARGS, timeout=timeout)
+
+def run_planner(domain_file, instance_file, use_cache=False, timeout=PLANNER_TIMEOUT):
     print(f"\nRunning planner with instance: {instance_file}...")
-    with open(PLAN_FILE, "w") as f:
-        subprocess.run([
-            PLANNER_SCRIPT,
-            domain_file,
-            instance_file,
-            PLANNER_ARGS
-        ], stdout=f, stderr=subprocess.STDOUT, text=True)
-
-def wait_for_plan(timeout=30):
+    return submit_planner(domain_file, instance_file, use_cache, timeout)
+
+def plan_concurrently(domain_file, instance_files, use_cache=False, plan_files=None):
+    """
+    Start planner runs for several instances at once and wait for all of them.
+    The outputs are returned as line lists (in the order of instance_files) and
+    never go through the shared PLAN_FILE, so the runs cannot clobber each other;
+    each output is written to its own entry of plan_files instead, if given.
+    """
+    print(f"\nRunning planner concurrently on: {', '.join(instance_files)}...")
+    jobs = [submit_planner(domain_file, f, use_cache) for f in instance_files]
+    return [wait_for_plan(job, plan_file=plan_file) for job, plan_file in zip(jobs, plan_files or [None] * len(jobs))]
+
+def wait_for_plan(job, plan_file=PLAN_FILE):
+    """
+    Block until the planner run behind job has exited and return its output lines.
+    The pool kills planners that exceed their timeout; None is returned then,
+    so a killed search is not mistaken for an empty plan.
+    The output is also written to plan_file for later inspection.
+    """
     print("Waiting for planner output...")
-    waited = 0
-    while waited < timeout:
-        try:
-            with open(PLAN_FILE, "r") as f:
-                lines = f.readlines()
-                if lines:
-                    return lines
-        except FileNotFoundError:
-            pass
-        time.sleep(2)
-        waited += 2
-    return []
+    try:
+        output = job.result()
+    except subprocess.TimeoutExpired as e:
+        print(f"Planning failed: the planner did not finish within {e.timeout} s and was stopped.")
+        return None
+    if plan_file:
+        with open(plan_file, "w") as f:
+            f.write(output)
+    return output.splitlines(keepends=True)
 
 def extract_actions(plan_lines):
-    actions = []
-    for line in plan_lines:
-        if "Actions received:" in line:
-            matches = re.findall(r"([a-zA-Z_]+\([^()]*\))", line)
-            actions.extend([a for a in matches if a != "noop()"])
-    return actions
+    return prost_output.action_strings(plan_lines)
 
 def contains_failure(plan_lines):
     return any("give_response(" in line for line in plan_lines if "Actions received:" in line)
 
 def parse_instance_file(instance_file):
-    with open(instance_file, "r") as f:
-        content = f.read()
-
-    book_wants = re.findall(r"wants_book\(([^,]+), ([^)]+)\)", content)
-    prob_failure_entries = re.findall(r"prob_failure\(([^,]+), ([^)]+)\)\s*=\s*([0-9.]+);", content)
-
-    human_book_map = {h.strip(): b.strip() for h, b in book_wants}
-    book_failure_probs = {}
-    for book, failure, prob in prob_failure_entries:
-        book = book.strip()
-        failure = failure.strip()
-        prob = float(prob)
-        book_failure_probs.setdefault(book, {})[failure] = prob
-
+    instance = rddl_model.cached_instance(instance_file)
+    human_book_map = instance.wanted_books()
+    book_failure_probs = {
+        book: dict(zip(instance.objects_of("failure"), row))
+        for book, row in zip(instance.objects_of("book"), instance.failure_table)
+    }
     return human_book_map, book_failure_probs
 
 def analyze_explanation(plan_lines):
@@ -96,31 +106,18 @@ def verbalize_plan_differences(original_actions, new_actions, original_instance,
     if any("give_response" in a for a in removed):
         print("No explanation (give_response) action needed in the new plan — failure was avoided.")
 
-    with Path(original_instance).open("r") as f:
-       original_instance_content = f.read()
-
-    with Path(new_instance).open("r") as f:
-        new_instance_content = f.read()
-
-    # Extract all prob_failure entries from both files
-    original_entries = re.findall(r"prob_failure\(([^,]+), ([^)]+)\)\s*=\s*([\d.]+)", original_instance_content)
-    new_entries = re.findall(r"prob_failure\(([^,]+), ([^)]+)\)\s*=\s*([\d.]+)", new_instance_content)
-
-    original_probs = {}
-    new_probs = {}
-
-    for book, failure, prob in original_entries:
-        original_probs.setdefault(book, {})[failure] = float(prob)
-
-    for book, failure, prob in new_entries:
-        new_probs.setdefault(book, {})[failure] = float(prob)
+    original = rddl_model.cached_instance(original_instance)
+    new = rddl_model.cached_instance(new_instance)
+    new_books = new.index("book")
+    new_failures = new.index("failure")
 
     # Now compare the probabilities and create explanation sentences
     explanations = []
-    for book in original_probs:
-        for failure in original_probs[book]:
-            original_prob = original_probs[book][failure]
-            new_prob = new_probs.get(book, {}).get(failure, original_prob)
+    for book, row in zip(original.objects_of("book"), original.failure_table):
+        for failure, original_prob in zip(original.objects_of("failure"), row):
+            if book not in new_books or failure not in new_failures:
+                continue
+            new_prob = new.failure_table[new_books[book]][new_failures[failure]]
             if new_prob < original_prob:
                 explanations.append(
                     f"In the alternative instance, the probability of the failure '{failure}' for book '{book}' was lowered "
@@ -139,81 +136,73 @@ def print_plan_summary(actions):
     else:
         print("No meaningful actions in the plan.")
 
-def main_gui(domain_path, instance_path):
-    """Parse the arguments from the terminal and run the prehoc strategy"""
-    #parser = argparse.ArgumentParser()
-    #parser.add_argument("--domain", type=str, default="./domain.rddl", help="Path to the domain file")
-    #parser.add_argument("--instance", type=str, default="./instance_failures_responses.rddl", help="Path to the instance file")
-    #args = parser.parse_args()
-
-    # update domain and instance paths
-    #domain_path = args.domain
-    #instance_path = args.instance
-    instance_name = os.path.splitext(os.path.basename(instance_path))[0]
-    alt_path = "./" + instance_name + "_alternative.rddl"
-    alt_name = os.path.splitext(os.path.basename(alt_path))[0]
-    
-    # run the planner to get the original plan
-    run_planner(domain_path, instance_path)
-    original_output = wait_for_plan()
-    original_actions = extract_actions(original_output)
-    print_plan_summary(original_actions)
-
-    if contains_failure(original_output):
-        print("\nExplanation detected in the plan:")
-        for line in analyze_explanation(original_output):
-            print("  -", line)
-
-        run_planner(DOMAIN_FILE, alt_path)
-        new_output = wait_for_plan()
-        new_actions = extract_actions(new_output)
-
-        print("\nAlternative plan:")
-        print_plan_summary(new_actions)
-
-        verbalize_plan_differences(original_actions, new_actions, instance_path, alt_path)
-
-        return new_actions
-    else:
-        print("No explanation actions found. Failure was likely avoided in the original plan.")        
-
-    return original_actions
+def main_gui(domain_path, instance_path, concurrent=False, use_cache=True, ctx=None):
+    """
+    Run the prehoc strategy. In concurrent mode the alternative instance is
+    planned together with the original one; its plan is only used if the
+    original plan needs an explanation. Planner logs go to the workspace ctx
+    (a private RunContext is used when none is given).
+    """
+    with run_context.use_context(ctx, "prehoc") as ctx:
+        instance_name = os.path.splitext(os.path.basename(instance_path))[0]
+        alt_path = os.path.join(os.path.dirname(instance_path) or ".", instance_name + "_alternative.rddl")
+
+        # run the planner to get the original plan (and the alternative one if requested)
+        new_output = None
+        alternative_planned = concurrent and os.path.exists(alt_path)
+        if alternative_planned:
+            with stage_timing.stage("planner"):
+                original_output, new_output = plan_concurrently(
+                    domain_path, [instance_path, alt_path], use_cache,
+                    [ctx.file("rddl_plan_output.log"), ctx.file("rddl_plan_output_alternative.log")])
+        else:
+            job = run_planner(domain_path, instance_path, use_cache)
+            with stage_timing.stage("planner"):
+                original_output = wait_for_plan(job, plan_file=ctx.file("rddl_plan_output.log"))
+        if original_output is None:
+            return None
+        with stage_timing.stage("parse"):
+            original_actions = extract_actions(original_output)
+            failure = contains_failure(original_output)
+        print_plan_summary(original_actions)
+
+        if failure:
+            print("\nExplanation detected in the plan:")
+            with stage_timing.stage("verbalization"):
+                explanations = analyze_explanation(original_output)
+            for line in explanations:
+                print("  -", line)
+
+            if not alternative_planned:
+                job = run_planner(domain_path, alt_path, use_cache)
+                with stage_timing.stage("planner"):
+                    new_output = wait_for_plan(job, plan_file=ctx.file("rddl_plan_output_alternative.log"))
+            if new_output is None:
+                return None
+            with stage_timing.stage("parse"):
+                new_actions = extract_actions(new_output)
+
+            print("\nAlternative plan:")
+            print_plan_summary(new_actions)
+
+            with stage_timing.stage("verbalization"):
+                verbalize_plan_differences(original_actions, new_actions, instance_path, alt_path)
+
+            return new_actions
+        else:
+            print("No explanation actions found. Failure was likely avoided in the original plan.")        
+
+        return original_actions
 
 def main():
     """Parse the arguments from the terminal and run the prehoc strategy"""
     parser = argparse.ArgumentParser()
     parser.add_argument("--domain", type=str, default="./domain.rddl", help="Path to the domain file")
     parser.add_argument("--instance", type=str, default="./instance_failures_responses.rddl", help="Path to the instance file")
+    parser.add_argument("--concurrent", action="store_true", help="Plan the original and the alternative instance at the same time")
     args = parser.parse_args()
 
-    # update domain and instance paths
-    domain_path = args.domain
-    instance_path = args.instance
-    instance_name = os.path.splitext(os.path.basename(instance_path))[0]
-    alt_path = "./" + instance_name + "_alternative.rddl"
-    alt_name = os.path.splitext(os.path.basename(alt_path))[0]
-    
-    # run the planner to get the original plan
-    run_planner(domain_path, instance_path)
-    original_output = wait_for_plan()
-    original_actions = extract_actions(original_output)
-    print_plan_summary(original_actions)
-
-    if contains_failure(original_output):
-        print("\nExplanation detected in the plan:")
-        for line in analyze_explanation(original_output):
-            print("  -", line)
-
-        run_planner(DOMAIN_FILE, alt_path)
-        new_output = wait_for_plan()
-        new_actions = extract_actions(new_output)
-
-        print("\nAlternative plan:")
-        print_plan_summary(new_actions)
-
-        verbalize_plan_differences(original_actions, new_actions, instance_path, alt_path)
-    else:
-        print("No explanation actions found. Failure was likely avoided in the original plan.")
+    main_gui(args.domain, args.instance, concurrent=args.concurrent, use_cache=False)
 
 if __name__ == "__main__":
     main()
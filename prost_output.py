@@ -0,0 +1,125 @@
+# prost_output.py
+
+import re
+from collections import namedtuple
+
+ACTIONS_MARKER = "Actions received:"
+ACTION_PATTERN = re.compile(r"([a-zA-Z_][\w-]*)\(([^()]*)\)")
+ROUND_END_PATTERN = re.compile(r"END OF ROUND\s*(\d+).*?REWARD:\s*(-?[\d.]+)", re.IGNORECASE)
+
+
+class PlannedAction(namedtuple("PlannedAction", ["record", "name", "args"])):
+    """
+    One action of a PROST plan. record is the index of the "Actions received"
+    record the action came from, args is the tuple of its object arguments.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.name}({', '.join(self.args)})"
+
+
+def parse_action(text, record_index=0):
+    """Parse a single action string such as 'fetch_book(tiago, b1, h1)'."""
+    match = ACTION_PATTERN.search(text)
+    if not match:
+        return None
+    args = tuple(a.strip() for a in match.group(2).split(",") if a.strip())
+    return PlannedAction(record_index, match.group(1), args)
+
+
+def iter_actions(lines, skip_noop=True):
+    """
+    Yield a PlannedAction for every action of every "Actions received" record.
+
+    lines can be any iterable of text lines, including a planner's stdout pipe
+    or a generator over it, so actions are produced while the planner is still
+    running and only the current line is ever held in memory.
+    """
+    record_index = 0
+    for line in lines:
+        if ACTIONS_MARKER not in line:
+            continue
+        record = line.split(ACTIONS_MARKER, 1)[1]
+        for match in ACTION_PATTERN.finditer(record):
+            if skip_noop and match.group(1) == "noop":
+                continue
+            args = tuple(a.strip() for a in match.group(2).split(",") if a.strip())
+            yield PlannedAction(record_index, match.group(1), args)
+        record_index += 1
+
+
+def iter_rounds(lines, skip_noop=True):
+    """
+    Yield the actions of each round PROST ran as a list of PlannedAction.
+    Every round plans the instance from its initial state again, so each list
+    is a plan on its own. Records after the last "END OF ROUND" line (a round
+    that was still running) are yielded as a final round, if there are any.
+    """
+    current = []
+    record_index = 0
+    for line in lines:
+        if ACTIONS_MARKER in line:
+            current.extend(a._replace(record=record_index) for a in iter_actions([line], skip_noop))
+            record_index += 1
+        elif ROUND_END_PATTERN.search(line):
+            yield current
+            current = []
+    if current:
+        yield current
+
+
+def plan_actions(lines):
+    """
+    The plan in PROST output: the actions of its last round. Concatenating
+    the rounds would give a plan several horizons long.
+    """
+    rounds = list(iter_rounds(lines))
+    return rounds[-1] if rounds else []
+
+
+class RoundTracker:
+    """
+    Follows PROST output line by line and remembers the best plan seen so far:
+    the highest-reward completed round, or the actions of the running round as
+    long as no round has completed yet.
+    """
+
+    def __init__(self):
+        self.current = []
+        self.best = None
+        self.best_reward = None
+        self.rounds_completed = 0
+        self.records = 0
+
+    def feed(self, line):
+        """Consume one line of planner output."""
+        if ACTIONS_MARKER in line:
+            self.current.extend(a._replace(record=self.records) for a in iter_actions([line]))
+            self.records += 1
+            return
+        match = ROUND_END_PATTERN.search(line)
+        if match:
+            reward = float(match.group(2))
+            self.rounds_completed += 1
+            if self.best_reward is None or reward > self.best_reward:
+                self.best, self.best_reward = self.current, reward
+            self.current = []
+
+    def best_plan(self):
+        """Return the best plan seen so far as a list of PlannedAction."""
+        if self.best is not None:
+            return list(self.best)
+        return list(self.current)
+
+
+def iter_lines(stream):
+    """Yield the lines of a text stream as soon as each one is complete."""
+    for line in iter(stream.readline, ""):
+        yield line
+
+
+def action_strings(lines):
+    """Return the plan in the 'name(arg, ...)' string form used throughout the strategies."""
+    return [str(action) for action in plan_actions(lines)]
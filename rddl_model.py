@@ -0,0 +1,551 @@
+# rddl_model.py
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+# --- Configuration ---
+MAX_CACHED_FILES = 32
+
+# Non-fluent defaults of domains/domain.rddl, used when no parsed domain is at hand
+DEFAULT_NON_FLUENTS = {"prob_failure": 0.5, "prob_response": 0.5}
+
+TOKEN_PATTERN = re.compile(r"[?@]\w+|[A-Za-z_][\w\-']*|-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?|\S")
+
+PVariable = namedtuple("PVariable", ["name", "params", "kind", "range", "default"])
+
+
+class RDDLParseError(ValueError):
+    pass
+
+
+def tokenize(text):
+    """Split RDDL text into tokens, dropping // comments."""
+    text = re.sub(r"//[^\n]*", "", text)
+    return TOKEN_PATTERN.findall(text)
+
+
+def parse_value(token):
+    """Convert a literal token into a Python bool/int/float (or keep it as a name)."""
+    if token == "true":
+        return True
+    if token == "false":
+        return False
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+def format_value(value):
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return str(value)
+
+
+class TokenStream:
+    """Cursor over the token list with the small set of helpers the parser needs."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise RDDLParseError("Unexpected end of RDDL input")
+        self.pos += 1
+        return token
+
+    def expect(self, expected):
+        token = self.next()
+        if token != expected:
+            raise RDDLParseError(f"Expected '{expected}' but found '{token}'")
+        return token
+
+    def accept(self, expected):
+        if self.peek() == expected:
+            self.pos += 1
+            return True
+        return False
+
+    def skip_block(self):
+        """Skip a balanced { ... } block (the opening brace is the next token)."""
+        self.expect("{")
+        depth = 1
+        while depth:
+            token = self.next()
+            if token == "{":
+                depth += 1
+            elif token == "}":
+                depth -= 1
+
+    def skip_statement(self):
+        """Skip tokens up to and including the next ';' outside of any brackets."""
+        depth = 0
+        while True:
+            token = self.next()
+            if token in "{([":
+                depth += 1
+            elif token in "})]":
+                depth -= 1
+            elif token == ";" and depth == 0:
+                return
+
+    def name_list(self, closing):
+        """Read 'a, b, c' up to the closing token."""
+        names = []
+        while not self.accept(closing):
+            token = self.next()
+            if token != ",":
+                names.append(token)
+        return names
+
+
+class RDDLDomain:
+    """The parts of an RDDL domain the tooling needs: its types and pvariable declarations."""
+
+    def __init__(self, name):
+        self.name = name
+        self.types = OrderedDict()
+        self.pvariables = OrderedDict()
+
+    def default(self, fluent):
+        pvariable = self.pvariables.get(fluent)
+        return pvariable.default if pvariable else DEFAULT_NON_FLUENTS.get(fluent)
+
+
+class RDDLInstance:
+    """
+    A planning problem: an instance block joined with the non-fluents block it
+    references. Objects are grouped by type, non-fluents and the init-state are
+    kept as {(fluent, args): value}, and the failure/response probabilities are
+    additionally indexed as dense tables:
+
+        failure_table[book][failure]       prob_failure(book, failure)
+        response_table[failure][response]  prob_response(response, failure)
+
+    with row/column order given by objects["book"], objects["failure"] and
+    objects["response"], and unset entries filled with the domain default.
+    """
+
+    def __init__(self, name=None, domain_name=None, non_fluents_name=None, domain=None):
+        self.name = name
+        self.domain_name = domain_name
+        self.non_fluents_name = non_fluents_name
+        self.domain = domain
+        self.objects = OrderedDict()
+        self.non_fluents = OrderedDict()
+        self.init_state = OrderedDict()
+        self.max_nondef_actions = None
+        self.horizon = None
+        self.discount = None
+        self.failure_table = []
+        self.response_table = []
+        self.indices = {}
+
+    # --- Lookup ---
+
+    def objects_of(self, type_name):
+        return self.objects.get(type_name, [])
+
+    def index(self, type_name):
+        if type_name not in self.indices:
+            self.indices[type_name] = {name: i for i, name in enumerate(self.objects_of(type_name))}
+        return self.indices[type_name]
+
+    def default(self, fluent):
+        if self.domain is not None:
+            return self.domain.default(fluent)
+        return DEFAULT_NON_FLUENTS.get(fluent, False)
+
+    def value(self, fluent, *args):
+        """Value of a non-fluent, falling back to the domain default."""
+        return self.non_fluents.get((fluent, tuple(args)), self.default(fluent))
+
+    def failure_probability(self, book, failure):
+        return self.failure_table[self.index("book")[book]][self.index("failure")[failure]]
+
+    def response_probability(self, failure, response):
+        return self.response_table[self.index("failure")[failure]][self.index("response")[response]]
+
+    def facts(self, fluent):
+        """Argument tuples of all boolean non-fluents of one kind that are true."""
+        return [args for (name, args), value in self.non_fluents.items() if name == fluent and value is True]
+
+    def wanted_books(self):
+        """Return {human: book} from the wants_book non-fluents."""
+        return {human: book for human, book in self.facts("wants_book")}
+
+    def copy(self):
+        """Return an independent copy, e.g. to derive a new instance from a cached one."""
+        clone = RDDLInstance(self.name, self.domain_name, self.non_fluents_name, self.domain)
+        clone.objects = OrderedDict((type_name, list(names)) for type_name, names in self.objects.items())
+        clone.non_fluents = OrderedDict(self.non_fluents)
+        clone.init_state = OrderedDict(self.init_state)
+        clone.max_nondef_actions = self.max_nondef_actions
+        clone.horizon = self.horizon
+        clone.discount = self.discount
+        clone.failure_table = [list(row) for row in self.failure_table]
+        clone.response_table = [list(row) for row in self.response_table]
+        return clone
+
+    # --- Tables ---
+
+    def build_tables(self):
+        """(Re)build the dense probability tables from the non-fluents."""
+        self.indices = {}
+        books, failures, responses = self.objects_of("book"), self.objects_of("failure"), self.objects_of("response")
+        self.failure_table = [[self.value("prob_failure", b, f) for f in failures] for b in books]
+        self.response_table = [[self.value("prob_response", r, f) for r in responses] for f in failures]
+
+    def set_non_fluent(self, fluent, args, value):
+        """Set a non-fluent and keep the dense tables in sync."""
+        args = tuple(args)
+        self.non_fluents[(fluent, args)] = value
+        if fluent == "prob_failure":
+            self.failure_table[self.index("book")[args[0]]][self.index("failure")[args[1]]] = value
+        elif fluent == "prob_response":
+            self.response_table[self.index("failure")[args[1]]][self.index("response")[args[0]]] = value
+
+    # --- Serialization ---
+
+    def to_rddl(self):
+        """Write the instance back out as a non-fluents block followed by an instance block."""
+        lines = [f"non-fluents {self.non_fluents_name} {{", f"    domain = {self.domain_name};", "    objects {"]
+        for type_name, names in self.objects.items():
+            lines.append(f"        {type_name}: {{ {', '.join(names)} }};")
+        lines += ["    };", "", "    non-fluents {"]
+        lines += [f"        {format_atom(fluent, args, value)}" for (fluent, args), value in self.non_fluents.items()]
+        lines += ["    };", "}", "", f"instance {self.name} {{", f"    domain = {self.domain_name};",
+                  f"    non-fluents = {self.non_fluents_name};", "", "    init-state {"]
+        lines += [f"        {format_atom(fluent, args, value)}" for (fluent, args), value in self.init_state.items()]
+        lines.append("    };")
+        lines.append("")
+        if self.max_nondef_actions is not None:
+            lines.append(f"    max-nondef-actions = {self.max_nondef_actions};")
+        if self.horizon is not None:
+            lines.append(f"    horizon = {self.horizon};")
+        if self.discount is not None:
+            lines.append(f"    discount = {format_value(self.discount)};")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def format_atom(fluent, args, value):
+    atom = f"{fluent}({', '.join(args)})" if args else fluent
+    if value is True:
+        return f"{atom};"
+    if value is False:
+        return f"~{atom};"
+    return f"{atom} = {format_value(value)};"
+
+
+# --- Parser ---
+
+RDDLFile = namedtuple("RDDLFile", ["domains", "non_fluents", "instances"])
+
+
+def parse_atoms(stream):
+    """Parse '{ fluent(args) [= value]; ~fluent(args); ... }' into an ordered {(fluent, args): value}."""
+    atoms = OrderedDict()
+    stream.expect("{")
+    while not stream.accept("}"):
+        negated = stream.accept("~")
+        fluent = stream.next()
+        args = ()
+        if stream.accept("("):
+            args = tuple(stream.name_list(")"))
+        value = not negated
+        if stream.accept("="):
+            value = parse_value(stream.next())
+        stream.expect(";")
+        atoms[(fluent, args)] = value
+    return atoms
+
+
+def parse_objects(stream):
+    objects = OrderedDict()
+    stream.expect("{")
+    while not stream.accept("}"):
+        type_name = stream.next()
+        stream.expect(":")
+        stream.expect("{")
+        objects[type_name] = stream.name_list("}")
+        stream.expect(";")
+    return objects
+
+
+def parse_domain_block(stream, name):
+    domain = RDDLDomain(name)
+    stream.expect("{")
+    while not stream.accept("}"):
+        section = stream.next()
+        if section == "types":
+            stream.expect("{")
+            while not stream.accept("}"):
+                type_name = stream.next()
+                stream.expect(":")
+                domain.types[type_name] = stream.next()
+                stream.expect(";")
+        elif section == "pvariables":
+            stream.expect("{")
+            while not stream.accept("}"):
+                var_name = stream.next()
+                params = tuple(stream.name_list(")")) if stream.accept("(") else ()
+                stream.expect(":")
+                stream.expect("{")
+                fields = []
+                default = None
+                while not stream.accept("}"):
+                    token = stream.next()
+                    if token == "default":
+                        stream.expect("=")
+                        default = parse_value(stream.next())
+                    elif token != ",":
+                        fields.append(token)
+                stream.expect(";")
+                domain.pvariables[var_name] = PVariable(var_name, params, fields[0], fields[1], default)
+        elif stream.peek() == "{":
+            stream.skip_block()
+        else:
+            stream.skip_statement()
+            continue
+        stream.accept(";")
+    return domain
+
+
+def parse_non_fluents_block(stream, name):
+    block = {"name": name, "domain": None, "objects": OrderedDict(), "non_fluents": OrderedDict()}
+    stream.expect("{")
+    while not stream.accept("}"):
+        section = stream.next()
+        if section == "domain":
+            stream.expect("=")
+            block["domain"] = stream.next()
+        elif section == "objects":
+            block["objects"] = parse_objects(stream)
+        elif section == "non-fluents":
+            block["non_fluents"] = parse_atoms(stream)
+        elif stream.peek() == "{":
+            stream.skip_block()
+        else:
+            stream.skip_statement()
+            continue
+        stream.expect(";")
+    return block
+
+
+def parse_instance_block(stream, name):
+    block = {"name": name, "domain": None, "non_fluents": None, "objects": OrderedDict(),
+             "init_state": OrderedDict(), "max_nondef_actions": None, "horizon": None, "discount": None}
+    stream.expect("{")
+    while not stream.accept("}"):
+        section = stream.next()
+        if section in ("domain", "non-fluents"):
+            stream.expect("=")
+            block[section.replace("-", "_")] = stream.next()
+        elif section == "objects":
+            block["objects"] = parse_objects(stream)
+        elif section == "init-state":
+            block["init_state"] = parse_atoms(stream)
+        elif section in ("max-nondef-actions", "horizon", "discount"):
+            stream.expect("=")
+            block[section.replace("-", "_")] = parse_value(stream.next())
+        else:
+            stream.skip_statement()
+            continue
+        stream.expect(";")
+    return block
+
+
+def parse_rddl(text):
+    """Parse every domain, non-fluents and instance block of an RDDL text."""
+    stream = TokenStream(tokenize(text))
+    parsed = RDDLFile(OrderedDict(), OrderedDict(), OrderedDict())
+    while stream.peek() is not None:
+        kind = stream.next()
+        name = stream.next()
+        if kind == "domain":
+            parsed.domains[name] = parse_domain_block(stream, name)
+        elif kind == "non-fluents":
+            parsed.non_fluents[name] = parse_non_fluents_block(stream, name)
+        elif kind == "instance":
+            parsed.instances[name] = parse_instance_block(stream, name)
+        else:
+            raise RDDLParseError(f"Unknown top-level RDDL block '{kind}'")
+    return parsed
+
+
+def build_instance(parsed, instance_name=None, domain=None):
+    """Join an instance block with its non-fluents block into an RDDLInstance."""
+    if parsed.instances:
+        block = parsed.instances[instance_name] if instance_name else next(iter(parsed.instances.values()))
+        nf_block = parsed.non_fluents.get(block["non_fluents"])
+    else:
+        block, nf_block = None, next(iter(parsed.non_fluents.values()), None)
+
+    instance = RDDLInstance(domain=domain)
+    if nf_block is not None:
+        instance.non_fluents_name = nf_block["name"]
+        instance.domain_name = nf_block["domain"]
+        instance.objects.update(nf_block["objects"])
+        instance.non_fluents.update(nf_block["non_fluents"])
+    if block is not None:
+        instance.name = block["name"]
+        instance.domain_name = block["domain"] or instance.domain_name
+        instance.non_fluents_name = block["non_fluents"] or instance.non_fluents_name
+        instance.objects.update(block["objects"])
+        instance.init_state.update(block["init_state"])
+        instance.max_nondef_actions = block["max_nondef_actions"]
+        instance.horizon = block["horizon"]
+        instance.discount = block["discount"]
+    instance.build_tables()
+    return instance
+
+
+def parse_instance(text, domain=None):
+    return build_instance(parse_rddl(text), domain=domain)
+
+
+def load_instance(path, domain=None):
+    """Parse an RDDL instance file into an RDDLInstance."""
+    with open(path, "r") as f:
+        return parse_instance(f.read(), domain)
+
+
+def load_domain(path):
+    """Parse an RDDL domain file into an RDDLDomain."""
+    with open(path, "r") as f:
+        parsed = parse_rddl(f.read())
+    if not parsed.domains:
+        raise RDDLParseError(f"No domain block in {path}")
+    return next(iter(parsed.domains.values()))
+
+
+# --- Parsed model cache ---
+
+class CachedFile:
+    def __init__(self, signature, digest, text):
+        self.signature = signature
+        self.digest = digest
+        self.text = text
+        self.models = {}
+
+
+class ModelCache:
+    """
+    Process-wide cache of RDDL file contents and the models parsed from them,
+    keyed by absolute path. An entry is reused without touching the file as long
+    as its mtime and size are unchanged; if they changed, the file is re-read
+    and the models are only re-parsed when the content hash differs as well.
+    The least recently used files are dropped beyond max_files.
+
+    Models handed out are shared: treat them as read-only and copy() an
+    instance before modifying it.
+    """
+
+    def __init__(self, max_files=MAX_CACHED_FILES):
+        self.max_files = max_files
+        self.files = OrderedDict()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _file(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            cached = self.files.get(path)
+            if cached is not None and cached.signature == signature:
+                self.files.move_to_end(path)
+                self.hits += 1
+                return cached
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if cached is not None and cached.digest == digest:
+                cached.signature = signature
+                self.revalidations += 1
+            else:
+                cached = CachedFile(signature, digest, data.decode("utf-8"))
+                self.misses += 1
+            self.files[path] = cached
+            self.files.move_to_end(path)
+            while len(self.files) > self.max_files:
+                self.files.popitem(last=False)
+        return cached
+
+    def text(self, path):
+        return self._file(path).text
+
+    def digest(self, path):
+        return self._file(path).digest
+
+    def domain(self, path):
+        return self._domain(self._file(path), path)
+
+    def _domain(self, cached, path):
+        if "domain" not in cached.models:
+            parsed = parse_rddl(cached.text)
+            if not parsed.domains:
+                raise RDDLParseError(f"No domain block in {path}")
+            cached.models["domain"] = next(iter(parsed.domains.values()))
+        return cached.models["domain"]
+
+    def instance(self, path, domain_path=None):
+        cached = self._file(path)
+        domain, key = None, ("instance", None)
+        if domain_path:
+            domain_file = self._file(domain_path)
+            domain, key = self._domain(domain_file, domain_path), ("instance", domain_file.digest)
+        if key not in cached.models:
+            cached.models[key] = parse_instance(cached.text, domain)
+        return cached.models[key]
+
+    def clear(self):
+        with self.lock:
+            self.files.clear()
+
+    def stats(self):
+        return {"files": len(self.files), "hits": self.hits,
+                "revalidations": self.revalidations, "misses": self.misses}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide model cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ModelCache()
+        return _default_cache
+
+
+def cached_instance(path, domain_path=None):
+    """Shared, read-only RDDLInstance for a file (see ModelCache)."""
+    return get_cache().instance(path, domain_path)
+
+
+def cached_domain(path):
+    """Shared, read-only RDDLDomain for a file (see ModelCache)."""
+    return get_cache().domain(path)
@@ -0,0 +1,101 @@
+# rddl_prune.py
+
+import logging
+import os
+import planner_pool
+import prost_output
+import rddl_model
+
+
+class PrunedInstance:
+    """
+    Result of prune_instance: the reduced instance and what was removed from
+    the original. Objects keep their names, so plans computed on the reduced
+    instance are valid for the original one as they are.
+    """
+
+    def __init__(self, instance, original, removed):
+        self.instance = instance
+        self.original = original
+        self.removed = removed
+
+    @property
+    def pruned(self):
+        return any(self.removed.values())
+
+    def restore_plan(self, plan):
+        """Map a plan of the reduced instance back to the original (checking every object exists there)."""
+        known = {name for names in self.original.objects.values() for name in names}
+        restored = []
+        for action in plan:
+            parsed = prost_output.parse_action(action) if isinstance(action, str) else action
+            missing = [a for a in parsed.args if a not in known]
+            if missing:
+                raise ValueError(f"{parsed} refers to objects {missing} that are not in the original instance")
+            restored.append(str(parsed))
+        return restored
+
+    def restore_rates(self, type_name, values, default=0.0):
+        """Extend a {object: value} result of the reduced instance to all objects of the original."""
+        return {name: values.get(name, default) for name in self.original.objects_of(type_name)}
+
+
+def prune_instance(instance):
+    """
+    Remove the groundings of instance that can never take part in a trajectory:
+
+    - books nobody wants, or that are nowhere (fetch_book can never apply),
+    - failures with prob_failure 0.0 for every remaining book,
+    - responses with prob_response 0.0 for every remaining failure,
+    - humans that want none of the remaining books and are not at any waypoint.
+
+    Objects referenced by the init-state are always kept, and every type keeps
+    at least one object. Unset probabilities count with their domain default.
+    """
+    books, failures, responses = instance.objects_of("book"), instance.objects_of("failure"), instance.objects_of("response")
+    placed = {book for book, _ in instance.facts("book_at")}
+    wanted = {book for _, book in instance.facts("wants_book")}
+    in_init = {name for _, args in instance.init_state for name in args}
+
+    keep_books = [b for b in books if (b in placed and b in wanted) or b in in_init]
+    book_rows = [instance.failure_table[i] for i, b in enumerate(books) if b in keep_books]
+    keep_failures = [f for j, f in enumerate(failures)
+                     if any(row[j] > 0 for row in book_rows) or f in in_init]
+    failure_rows = [instance.response_table[j] for j, f in enumerate(failures) if f in keep_failures]
+    keep_responses = [r for k, r in enumerate(responses)
+                      if any(row[k] > 0 for row in failure_rows) or r in in_init]
+    needed_humans = {human for human, _ in instance.facts("human_at")} | in_init
+    needed_humans |= {human for human, book in instance.facts("wants_book") if book in keep_books}
+    keep_humans = [h for h in instance.objects_of("human") if h in needed_humans]
+
+    kept = {"book": keep_books, "failure": keep_failures, "response": keep_responses, "human": keep_humans}
+    for type_name, names in kept.items():
+        if not names and instance.objects_of(type_name):
+            names.append(instance.objects_of(type_name)[0])
+
+    reduced = instance.copy()
+    removed = {}
+    for type_name, names in kept.items():
+        removed[type_name] = [n for n in instance.objects_of(type_name) if n not in names]
+        if type_name in reduced.objects:
+            reduced.objects[type_name] = names
+    dropped = {name for names in removed.values() for name in names}
+    for key in [key for key in reduced.non_fluents if any(a in dropped for a in key[1])]:
+        del reduced.non_fluents[key]
+    reduced.build_tables()
+    return PrunedInstance(reduced, instance, removed)
+
+
+def planner_instance(instance_path, domain_path=None):
+    """
+    Return what to hand the planner for instance_path: a MemoryInstance with the
+    pruned instance if anything could be removed, otherwise the path itself.
+    """
+    if not os.path.isfile(instance_path):
+        return instance_path
+    result = prune_instance(rddl_model.cached_instance(instance_path, domain_path))
+    if not result.pruned:
+        return instance_path
+    logging.info(f"Pruned {instance_path}: " + ", ".join(
+        f"{len(names)} {type_name}(s)" for type_name, names in result.removed.items() if names))
+    return planner_pool.MemoryInstance(result.instance.to_rddl(), result.instance.name)
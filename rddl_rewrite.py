@@ -0,0 +1,93 @@
+# rddl_rewrite.py
+
+from collections import OrderedDict, namedtuple
+import rddl_model
+
+# Declarative edits on an RDDL instance
+SetNonFluent = namedtuple("SetNonFluent", ["fluent", "args", "value"])  # e.g. a prob_failure/prob_response entry
+AddInitFluent = namedtuple("AddInitFluent", ["fluent", "args", "value"])
+RenameInstance = namedtuple("RenameInstance", ["old", "new"])  # old None renames whatever the instance is called
+RenameNonFluents = namedtuple("RenameNonFluents", ["old", "new"])
+MoveRobot = namedtuple("MoveRobot", ["robot", "waypoint"])
+SetInitState = namedtuple("SetInitState", ["atoms"])  # replaces the whole init-state; atoms: ((fluent, args), value) pairs
+SetHorizon = namedtuple("SetHorizon", ["horizon"])
+
+
+def set_probability(fluent, args, value):
+    return SetNonFluent(fluent, tuple(args), float(value))
+
+
+def add_init_fluent(fluent, args=(), value=True):
+    return AddInitFluent(fluent, tuple(args), value)
+
+
+def set_init_state(atoms):
+    """atoms: a {(fluent, args): value} dict or an iterable of ((fluent, args), value) pairs."""
+    return SetInitState(tuple(atoms.items() if isinstance(atoms, dict) else atoms))
+
+
+def _set_non_fluent(instance, edit):
+    instance.set_non_fluent(edit.fluent, edit.args, edit.value)
+
+
+def _add_init_fluent(instance, edit):
+    instance.init_state[(edit.fluent, edit.args)] = edit.value
+
+
+def _rename_instance(instance, edit):
+    if edit.old is None or instance.name == edit.old:
+        instance.name = edit.new
+
+
+def _rename_non_fluents(instance, edit):
+    if edit.old is None or instance.non_fluents_name == edit.old:
+        instance.non_fluents_name = edit.new
+
+
+def _move_robot(instance, edit):
+    for key in [key for key in instance.init_state if key[0] == "robot_at" and key[1][0] == edit.robot]:
+        del instance.init_state[key]
+    instance.init_state[("robot_at", (edit.robot, edit.waypoint))] = True
+
+
+def _set_init_state(instance, edit):
+    instance.init_state = OrderedDict(edit.atoms)
+
+
+def _set_horizon(instance, edit):
+    instance.horizon = edit.horizon
+
+
+EDIT_HANDLERS = {
+    SetNonFluent: _set_non_fluent,
+    AddInitFluent: _add_init_fluent,
+    RenameInstance: _rename_instance,
+    RenameNonFluents: _rename_non_fluents,
+    MoveRobot: _move_robot,
+    SetInitState: _set_init_state,
+    SetHorizon: _set_horizon,
+}
+
+
+def apply_edits(instance, edits):
+    """
+    Apply the edits to a parsed instance in place and return it. Each edit is a
+    dictionary update on the model, so the cost is one step per edit regardless
+    of how many entries the instance has.
+    """
+    for edit in edits:
+        EDIT_HANDLERS[type(edit)](instance, edit)
+    return instance
+
+
+def derive_instance(input_path, edits):
+    """Return a new instance: a copy of the cached model of input_path with the edits applied."""
+    return apply_edits(rddl_model.cached_instance(input_path).copy(), edits)
+
+
+def rewrite_instance(input_path, output_path, edits):
+    """Parse input_path (through the model cache), apply the edits to a copy and write the result."""
+    instance = derive_instance(input_path, edits)
+    with open(output_path, "w") as f:
+        f.write(instance.to_rddl())
+    return instance
@@ -0,0 +1,115 @@
+# rddl_simulator.py
+
+import prost_output
+import rddl_model
+import simulator_client
+from plan_evaluator import MonteCarloEvaluator, REWARD_COMPLETED, REWARD_OTHERWISE
+
+# --- Configuration ---
+BACKENDS = ("embedded", "rddlsim")
+STATE_FLUENTS = ("robot_at", "book_fetched", "failure_occurred", "response_triggered",
+                 "response_given", "book_given", "task_completed", "task_failed")
+
+
+def state_atoms(state):
+    """The true state fluents of a step result, as the {(fluent, args): True} atoms of an init-state."""
+    return {(fluent, args): True for (fluent, args), value in state["fluents"].items()
+            if fluent in STATE_FLUENTS and value is True}
+
+
+class EmbeddedSimulator:
+    """
+    In-process simulator of the explanation_planning domain: the CPFs of
+    MonteCarloEvaluator run for a single episode, with seeded Bernoulli draws.
+    It has the step interface of simulator_client.SimulatorClient, so the
+    reactive loops can use it in place of an RDDLSim process: step() applies
+    one action and returns the same kind of state dict.
+    """
+
+    def __init__(self, instance, seed=None):
+        self.evaluator = MonteCarloEvaluator(instance, seed)
+        self.rng = self.evaluator.rng
+        self._objects = {
+            "robot_at": ("robot", "waypoint"),
+            "book_fetched": ("book", "robot", "human"),
+            "failure_occurred": ("book", "robot", "human", "failure"),
+            "response_triggered": ("response", "failure"),
+            "response_given": ("response", "failure"),
+            "book_given": ("book", "robot", "human"),
+        }
+        self.load(instance)
+
+    def load(self, instance):
+        """Simulate another instance from its initial state; the random stream carries on."""
+        self.instance = instance
+        if self.evaluator.instance is not instance:
+            self.evaluator = MonteCarloEvaluator(instance)
+            self.evaluator.rng = self.rng
+        self.reset()
+
+    def reset(self):
+        """Go back to the instance's initial state."""
+        self.state = self.evaluator.initial_state(1)
+        self.steps = 0
+
+    def observe(self):
+        """The current state as a dict (see simulator_client.parse_state); the reward is that of this state."""
+        fluents = {}
+        for fluent in STATE_FLUENTS:
+            values = self.state[fluent][0]
+            if fluent not in self._objects:
+                fluents[(fluent, ())] = bool(values)
+                continue
+            names = [self.instance.objects_of(type_name) for type_name in self._objects[fluent]]
+            for position in zip(*values.nonzero()):
+                fluents[(fluent, tuple(n[i] for n, i in zip(names, position)))] = True
+        completed = fluents[("task_completed", ())]
+        robot_at = {args[0]: args[1] for (fluent, args) in fluents if fluent == "robot_at"}
+        return {
+            "task_failed": fluents[("task_failed", ())],
+            "task_completed": completed,
+            "robot_at": robot_at,
+            "reward": REWARD_COMPLETED if completed else REWARD_OTHERWISE,
+            "fluents": fluents,
+            "lines": [rddl_model.format_atom(fluent, args, value) for (fluent, args), value in fluents.items()],
+        }
+
+    def step(self, action, timeout=None):
+        """
+        Apply one action ('name(arg, ...)', a PlannedAction, or None/'noop' for
+        no action) and return the resulting state. As in the evaluator, an action
+        whose precondition does not hold has no effect. The reward in the result
+        is the one earned by the step, i.e. that of the state it started from.
+        timeout is accepted for interface compatibility and ignored.
+        """
+        if isinstance(action, str):
+            action = prost_output.parse_action(action)
+        grounded = self.evaluator.ground(action) if action is not None and action.name != "noop" else None
+        reward = REWARD_COMPLETED if self.state["task_completed"][0] else REWARD_OTHERWISE
+        self.evaluator.step(self.state, grounded)
+        self.steps += 1
+        observation = self.observe()
+        observation["reward"] = reward
+        return observation
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def start_simulator(backend, instance_path, rddlsim_command=None, domain_path=None, seed=None):
+    """
+    Start a simulator for the reactive loops: "embedded" (EmbeddedSimulator on
+    the parsed instance) or "rddlsim" (an RDDLSim process run with
+    rddlsim_command, driven through simulator_client).
+    """
+    if backend == "embedded":
+        return EmbeddedSimulator(rddl_model.cached_instance(instance_path, domain_path), seed)
+    if backend == "rddlsim":
+        return simulator_client.SimulatorClient.start(rddlsim_command)
+    raise ValueError(f"Unknown simulator backend '{backend}', expected one of {BACKENDS}")
@@ -1,39 +1,62 @@
 import subprocess
-import time
-import re
 import os
-import sys
 import argparse
+import plan_repair
+import planner_pool
+import prost_output
+import run_context
+import rddl_model
+import rddl_rewrite
+import rddl_simulator
+import replan_speculation
+import simulator_session
+import simulator_client
+import stage_timing
 
-PLANNER_SCRIPT = "src/rosplan/rosplan_planning_system/common/bin/prost/run_prost.sh"
 PLANNER_ARGS = "[PROST -s 1 -se [IPPC2014]]"
 OUTPUT_PLAN_FILE = "./plan_output.txt"
 DOMAIN_FILE = "./domain.rddl"
 DEFAULT_INSTANCE_FILE = "./instance_failure_probability.rddl"
 REACTIVE_INSTANCE_FILE = "./instance_failure_probability_reactive.rddl"
-
-def run_planner(domain, instance):
+SIMULATOR_SCRIPT = planner_pool.configured(
+    "RDDLSIM_SERVER", "/home/robolab/planning_ws/planners/prost/testbed/run-server.py", planner_pool.FAKE_RDDLSIM)
+SIMULATOR_BACKEND = "embedded"  # "embedded" (in-process, see rddl_simulator) or "rddlsim"
+SIMULATOR_SEED = None
+SPECULATIVE_REPLANNING = False  # plan the replans of possible fetch_book failures during execution
+PLAN_REPAIR = False  # on a failure plan only the rest of the horizon, from the observed state
+
+def run_planner(domain, instance, output_file=OUTPUT_PLAN_FILE):
     print(f"Running planner on: {instance}")
-    with open(OUTPUT_PLAN_FILE, "w") as f:
-        subprocess.run([PLANNER_SCRIPT, domain, instance, PLANNER_ARGS, OUTPUT_PLAN_FILE], stdout=f, stderr=subprocess.STDOUT)
+    output = planner_pool.run_planner(domain, instance, PLANNER_ARGS)
+    with open(output_file, "w") as f:
+        f.write(output)
 
 def extract_plan(plan_file):
     with open(plan_file, "r") as f:
-        text = f.read()
-    actions = re.findall(r"\*\* Actions received: \[(.*?)\]", text)
-    flat_actions = [a.strip() for group in actions if group for a in group.split(';') if a.strip()]
-    return flat_actions
-
-def start_simulator():
-    print("Launching RDDLSim...")
-    return subprocess.Popen(
-        ["python3", "/home/robolab/planning_ws/planners/prost/testbed/run-server.py", "-b", "./"],
-        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
-
-def simulate_plan(plan):
-    proc = start_simulator()
-    time.sleep(2)
+        return prost_output.action_strings(f)
+
+def start_simulator(instance_path=DEFAULT_INSTANCE_FILE, backend=SIMULATOR_BACKEND, domain_path=None):
+    """
+    Return the simulator session of this process with instance_path loaded.
+    The session outlives the plan, so later plans reuse the running simulator.
+    """
+    session = simulator_session.get_session(backend, ["python3", SIMULATOR_SCRIPT, "-b", "./"], SIMULATOR_SEED)
+    if not session.is_alive():
+        print("Launching RDDLSim..." if backend == "rddlsim" else "Starting embedded simulator...")
+    session.load(instance_path, domain_path=domain_path)
+    return session
+
+def simulate_plan(plan, instance_path=DEFAULT_INSTANCE_FILE, backend=SIMULATOR_BACKEND, domain_path=None,
+                  step_timeout=simulator_client.STEP_TIMEOUT, on_step=None, states=None):
+    """
+    Execute the plan step by step in the simulator until task_failed becomes
+    true. Every step returns as soon as the simulator has answered (or fails
+    after step_timeout); on_step(action, state) is called after every step
+    that did not fail. If a list is passed as states, the state after every
+    executed step (the failing one included) is appended to it.
+    Returns (failure detected, failing action).
+    """
+    session = start_simulator(instance_path, backend, domain_path)
     state_history = []
     failure_detected = False
     current_action = None
@@ -41,92 +64,154 @@ def simulate_plan(plan):
     for i, action in enumerate(plan):
         print(f"Step {i+1}: Executing action: {action}")
         try:
-            proc.stdin.write(action + "\n")
-            proc.stdin.flush()
-            time.sleep(1)
-            output = proc.stdout.readline()
-            if "task_failed = true" in output.lower():
-                print("Failure detected at action:", action)
-                failure_detected = True
-                current_action = action
-                break
-            state_history.append(output.strip())
-        except Exception as e:
+            state = session.step(action, step_timeout)
+        except (subprocess.TimeoutExpired, simulator_client.SimulatorClosed, ValueError) as e:
             print("Simulator error:", e)
             break
+        if states is not None:
+            states.append(state)
+        if state["task_failed"]:
+            print("Failure detected at action:", action)
+            failure_detected = True
+            current_action = action
+            break
+        state_history.append(state)
+        if on_step is not None:
+            on_step(action, state)
 
-    proc.terminate()
     return failure_detected, current_action
 
-def generate_reactive_instance(original_instance_path, new_instance_path, failure_action):
-    with open(original_instance_path, "r") as f:
-        content = f.read()
-
-    match = re.search(r"fetch_book\(([^,]+),\s*([^,]+),\s*([^)]+)\)", failure_action)
-    if not match:
+def derive_reactive_instance(original_instance_path, failure_action):
+    """
+    Derive the replanning instance in memory: the failure probabilities of the
+    book the failing fetch_book was handling are set to 0.0. Returns None if
+    the action does not name a book.
+    """
+    action = prost_output.parse_action(failure_action)
+    if action is None or action.name != "fetch_book" or len(action.args) != 3:
         print("Could not extract book from failing action.")
-        return
+        return None
 
-    _, failing_book, _ = match.groups()
+    _, failing_book, _ = action.args
+    failures = rddl_model.cached_instance(original_instance_path).objects_of("failure")
 
     # Set all prob_failure for the failing book to 0.0
-    content = re.sub(
-        rf"prob_failure\({failing_book}, ([^)]+)\)\s*=\s*[0-9.]+;",
-        rf"prob_failure({failing_book}, \1) = 0.0;",
-        content
-    )
-
-    content = re.sub(
-        r"instance\s+([^\s]+)",
-        "instance instance_failure_probability_reactive",
-        content
-    )
+    edits = [rddl_rewrite.set_probability("prob_failure", (failing_book, failure), 0.0) for failure in failures]
+    edits.append(rddl_rewrite.RenameInstance(None, "instance_failure_probability_reactive"))
+    return rddl_rewrite.derive_instance(original_instance_path, edits)
+
+def generate_reactive_instance(original_instance_path, new_instance_path, failure_action):
+    instance = derive_reactive_instance(original_instance_path, failure_action)
+    if instance is None:
+        return
 
     with open(new_instance_path, "w") as f:
-        f.write(content)
+        f.write(instance.to_rddl())
 
     print(f"Generated new instance: {new_instance_path}")
 
+def main_gui(domain_path, instance_path, ctx=None, simulator=SIMULATOR_BACKEND, speculate=SPECULATIVE_REPLANNING,
+             repair=PLAN_REPAIR):
+    """
+    Run the reactive strategy: plan, simulate the plan step by step and replan
+    from a derived instance if the simulated execution fails. The plan output
+    lives in the workspace ctx; the derived instance is only kept in memory
+    and handed to the planner directly. simulator selects the backend
+    ("embedded" or "rddlsim"). With speculate the replans for the plan's
+    fetch_book actions are planned in the background while it is executed
+    (see replan_speculation), so a failure does not wait for a fresh replan.
+    With repair a failure is handled by plan_repair instead: only the rest of
+    the horizon is planned, from the state the failure left, and the result is
+    the executed prefix followed by that suffix (speculate is then ignored).
+    """
+    with run_context.use_context(ctx, "reactive") as ctx:
+        plan_file = ctx.file(os.path.basename(OUTPUT_PLAN_FILE))
+
+        # run the planner to get the original plan
+        with stage_timing.stage("planner"):
+            run_planner(domain_path, instance_path, plan_file)
+        print("Waiting for planner output...")
+        with stage_timing.stage("parse"):
+            plan = extract_plan(plan_file)
+
+        if not plan:
+            print("No plan generated.")
+            return []
+
+        print("Plan generated:")
+        for a in plan:
+            print("  -", a)
+
+        speculate = speculate and not repair
+        states = []
+        with replan_speculation.SpeculativeReplanner(domain_path, instance_path, derive_reactive_instance) as speculation:
+            if speculate:
+                with stage_timing.stage("derivation"):
+                    speculation.speculate(plan)
+
+            print("Simulating plan step-by-step...")
+            with stage_timing.stage("simulation"):
+                failure, fail_action = simulate_plan(plan, instance_path, simulator, domain_path,
+                                                     on_step=speculation.discard if speculate else None,
+                                                     states=states)
+            print(failure, fail_action)
+
+            output = None
+            if failure and speculate:
+                with stage_timing.stage("planner"):
+                    output = speculation.take(fail_action)
+                speculation.cancel()
+
+        if failure and repair:
+            with stage_timing.stage("derivation"):
+                instance = rddl_model.cached_instance(instance_path, domain_path)
+                prefix = plan[:len(states)]
+                repaired = plan_repair.repair_instance(instance, states[-1], len(prefix))
+            print(f"Repairing the plan from the failure state (horizon {repaired.horizon})...")
+            with stage_timing.stage("planner"):
+                suffix = plan_repair.plan_suffix(domain_path, repaired, PLANNER_ARGS)
+            new_plan = plan_repair.splice(prefix, suffix)
+            print("Repaired plan (executed prefix + new suffix):")
+            for a in new_plan:
+                print("  -", a)
+            return new_plan
+        if failure:
+            if output is not None:
+                print("Using the speculatively planned replan...")
+                with open(plan_file, "w") as f:
+                    f.write(output)
+            else:
+                with stage_timing.stage("derivation"):
+                    reactive_instance = derive_reactive_instance(instance_path, fail_action)
+                    derived = reactive_instance and planner_pool.MemoryInstance(reactive_instance.to_rddl(), reactive_instance.name)
+                if derived is None:
+                    return plan
+                print("Replanning from new instance...")
+                with derived, stage_timing.stage("planner"):
+                    run_planner(domain_path, derived, plan_file)
+            with stage_timing.stage("parse"):
+                new_plan = extract_plan(plan_file)
+            print("New plan generated:")
+            for a in new_plan:
+                print("  -", a)
+            return new_plan
+        else:
+            print("Original plan executed successfully without failure.")
+
+        return plan
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--domain", type=str, default="./domain.rddl", help="Path to the domain file")
     parser.add_argument("--instance", type=str, default="./instance_failures_responses.rddl", help="Path to the instance file")
+    parser.add_argument("--simulator", choices=rddl_simulator.BACKENDS, default=SIMULATOR_BACKEND)
+    parser.add_argument("--speculate", action="store_true", default=SPECULATIVE_REPLANNING,
+                        help="Plan replans for possible failures while the plan is executed")
+    parser.add_argument("--repair", action="store_true", default=PLAN_REPAIR,
+                        help="On a failure plan only the remaining steps from the failure state")
     args = parser.parse_args()
 
-    # update domain and instance paths
-    domain_path = args.domain
-    instance_path = args.instance
-    instance_name = os.path.splitext(os.path.basename(instance_path))[0]
-    #alt_path = "./" + instance_name + "_alternative.rddl"
-    #alt_name = os.path.splitext(os.path.basename(alt_path))[0]
-    
-    # run the planner to get the original plan
-    run_planner(domain_path, instance_path)
-    print("Waiting for planner output...")
-    plan = extract_plan(OUTPUT_PLAN_FILE)
-
-    if not plan:
-        print("No plan generated.")
-        return
-
-    print("Plan generated:")
-    for a in plan:
-        print("  -", a)
-
-    print("Simulating plan step-by-step...")
-    failure, fail_action = simulate_plan(plan)
-    print(failure, fail_action)
-
-    if failure:
-        generate_reactive_instance(instance_path, REACTIVE_INSTANCE_FILE, fail_action)
-        print("Replanning from new instance...")
-        run_planner(domain_path, REACTIVE_INSTANCE_FILE, OUTPUT_PLAN_FILE)
-        new_plan = extract_plan(OUTPUT_PLAN_FILE)
-        print("New plan generated:")
-        for a in new_plan:
-            print("  -", a)
-    else:
-        print("Original plan executed successfully without failure.")
+    main_gui(args.domain, args.instance, simulator=args.simulator, speculate=args.speculate, repair=args.repair)
 
 if __name__ == "__main__":
     main()
@@ -1,118 +1,186 @@
 import subprocess
-import time
 import os
-import re
-import shutil
 import argparse
+import plan_repair
+import prost_output
+import run_context
+import rddl_model
+import rddl_rewrite
+import rddl_simulator
+import simulator_session
+import planner_pool
+import simulator_client
 
 DOMAIN_FILE = "./domain.rddl"
 ORIGINAL_INSTANCE = "./instance_failure_probability.rddl"
 ALT_INSTANCE = "./instance_failure_probability_reactive.rddl"
 PLAN_FILE = "./plan_output.txt"
 SEARCH_OPTIONS = "[PROST -s 1 -se [IPPC2014]]"
-PLANNER_SCRIPT = "src/rosplan/rosplan_planning_system/common/bin/prost/run_prost_online.sh"
+PLANNER_SCRIPT = planner_pool.configured(
+    "PROST_ONLINE_SCRIPT", "src/rosplan/rosplan_planning_system/common/bin/prost/run_prost_online.sh",
+    planner_pool.FAKE_PROST)
+SIMULATOR_SCRIPT = planner_pool.configured(
+    "RDDLSIM_SERVER", "src/rosplan/rosplan_planning_system/common/bin/prost/testbed/run-server.py",
+    planner_pool.FAKE_RDDLSIM)
+SIMULATOR_BACKEND = "embedded"  # "embedded" (in-process, see rddl_simulator) or "rddlsim"
+SIMULATOR_SEED = None
 TASK_FAILED_VAR = "task_failed"
+FAILURE_VAR = "failure_occurred"
 
-def run_planner(instance_file):
+def run_planner(instance_file, plan_file=PLAN_FILE):
+    """Plan an instance file or a planner_pool.MemoryInstance, writing the output to plan_file."""
     print(f"Running planner on: {instance_file}")
-    with open(PLAN_FILE, "w") as out:
+    with open(plan_file, "w") as out:
         subprocess.run([
             PLANNER_SCRIPT,
             DOMAIN_FILE,
-            instance_file,
+            os.fspath(instance_file),
             SEARCH_OPTIONS,
-            PLAN_FILE
-        ], stdout=out, stderr=subprocess.STDOUT, text=True)
-
-def extract_plan_actions():
-    with open(PLAN_FILE) as f:
-        content = f.read()
-    pattern = r"\*\* Actions received: \[([^\]]*)\]"
-    matches = re.findall(pattern, content)
-    actions = []
-    for group in matches:
-        acts = [a.strip() for a in group.split(";") if a.strip()]
-        actions.extend(acts)
-    return actions
-
-def start_simulator(domain_path, instance_path):
-    return subprocess.Popen([
-        "python3", "src/rosplan/rosplan_planning_system/common/bin/prost/testbed/run-server.py",
-        "-b", os.path.dirname(domain_path)
-    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE, text=True)
-
-def step_simulation(sim_proc, action):
-    sim_proc.stdin.write(action + "\n")
-    sim_proc.stdin.flush()
-    time.sleep(0.5)
-    output = []
-    while True:
-        line = sim_proc.stdout.readline()
-        if not line:
-            break
-        output.append(line.strip())
-        if TASK_FAILED_VAR in line:
-            break
-        if "state reward" in line or "----------" in line:
-            break
-    return output
-
-def detect_task_failure(output_lines):
-    for line in output_lines:
-        if TASK_FAILED_VAR in line and "true" in line.lower():
-            return True
-    return False
-
-def modify_instance_to_avoid_failure(original_instance, new_instance, failed_action):
-    with open(original_instance, "r") as f:
-        content = f.read()
-
-    print("Generating new instance to avoid failure...")
+            plan_file
+        ], stdout=out, stderr=subprocess.STDOUT, text=True, pass_fds=planner_pool.instance_fds(instance_file))
+
+def extract_plan_actions(plan_file=PLAN_FILE):
+    with open(plan_file) as f:
+        return prost_output.action_strings(f)
+
+def start_simulator(domain_path, instance_path, backend=SIMULATOR_BACKEND):
+    """Start a simulator session with instance_path loaded; it is kept for the replanned execution."""
+    session = simulator_session.SimulatorSession(
+        backend, ["python3", SIMULATOR_SCRIPT, "-b", os.path.dirname(domain_path)], seed=SIMULATOR_SEED)
+    session.load(instance_path, domain_path=domain_path)
+    return session
+
+def step_simulation(session, action, timeout=simulator_client.STEP_TIMEOUT):
+    """Execute one action and return the parsed state as soon as the simulator has answered."""
+    return session.step(action, timeout)
+
+def detect_task_failure(state):
+    return state[TASK_FAILED_VAR]
+
+def failures_occurred(state):
+    """The failure_occurred atoms that are true in state."""
+    return {args for (fluent, args), value in state["fluents"].items() if fluent == FAILURE_VAR and value is True}
+
+def detect_new_failure(before, after):
+    """
+    A step from state before to state after ran into a failure: task_failed
+    turned on, or a failure_occurred atom did. task_failed stays true once set,
+    so in a state that has already failed only the atoms tell a new failure.
+    """
+    if before is None:
+        return detect_task_failure(after)
+    return (detect_task_failure(after) and not detect_task_failure(before)) \
+        or bool(failures_occurred(after) - failures_occurred(before))
+
+def execute_plan(session, actions):
+    """
+    Step through actions until one of them makes the task fail; returns its
+    index or None (see detect_new_failure).
+    """
+    state = session.state
+    for step, action in enumerate(actions):
+        print(f"Step {step+1}: Executing action: {action}")
+        state, before = step_simulation(session, action), state
+        if detect_new_failure(before, state):
+            return step
+    return None
+
+def derive_instance_avoiding_failure(original_instance, failed_action):
+    """Derive the replanning instance in memory (see modify_instance_to_avoid_failure)."""
+    instance = rddl_model.cached_instance(original_instance)
+    edits = []
     if "fetch_book" in failed_action:
         # Disable failure probabilities
-        content = re.sub(r"prob_failure\(([^,]+), ([^)]+)\)\s*=\s*[\d.]+", r"prob_failure(\1, \2) = 0.0", content)
+        edits = [rddl_rewrite.set_probability("prob_failure", (book, failure), 0.0)
+                 for book in instance.objects_of("book") for failure in instance.objects_of("failure")]
+
+    edits.append(rddl_rewrite.RenameInstance(
+        None, instance.name.replace("instance_failure_probability", "instance_failure_probability_reactive")))
+    edits.append(rddl_rewrite.RenameNonFluents(
+        None, instance.non_fluents_name.replace("instance_failure_probability", "instance_failure_probability_reactive")))
+    return rddl_rewrite.derive_instance(original_instance, edits)
 
-    content = content.replace("instance_failure_probability", "instance_failure_probability_reactive")
+def modify_instance_to_avoid_failure(original_instance, new_instance, failed_action):
+    print("Generating new instance to avoid failure...")
+    instance = derive_instance_avoiding_failure(original_instance, failed_action)
     with open(new_instance, "w") as f:
-        f.write(content)
+        f.write(instance.to_rddl())
+
+def repair_from_failure(session, instance_path, prefix, plan_file=PLAN_FILE):
+    """
+    Plan only the rest of the horizon from the state the session is in after
+    the failing step (see plan_repair) and execute it from there, so the
+    executed prefix is kept. Returns the repaired plan (prefix + suffix).
+    """
+    repaired = plan_repair.repair_instance(rddl_model.cached_instance(instance_path), session.state, len(prefix))
+    print(f"Repairing the plan from the failure state (horizon {repaired.horizon})...")
+    with planner_pool.MemoryInstance(repaired.to_rddl(), repaired.name) as memory_instance:
+        run_planner(memory_instance, plan_file)
+    suffix = extract_plan_actions(plan_file)
+    print("Repaired plan (executed prefix + new suffix):")
+    for a in plan_repair.splice(prefix, suffix):
+        print(f"  - {a}")
+
+    # the session is still in the failure state, so the suffix simply continues from it
+    print("Simulating repaired suffix step-by-step...")
+    if execute_plan(session, suffix) is None:
+        print("Repaired plan executed successfully without failure.")
+    else:
+        print("Repaired plan failed as well.")
+    return plan_repair.splice(prefix, suffix)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--instance", default=ORIGINAL_INSTANCE)
+    parser.add_argument("--simulator", choices=rddl_simulator.BACKENDS, default=SIMULATOR_BACKEND)
+    parser.add_argument("--repair", action="store_true",
+                        help="On a failure plan only the remaining steps from the failure state")
     args = parser.parse_args()
 
-    run_planner(args.instance)
-    actions = extract_plan_actions()
-    if not actions:
-        print("No actions found.")
-        return
+    with run_context.RunContext("reactive_online") as ctx:
+        plan_file = ctx.file(os.path.basename(PLAN_FILE))
 
-    print("Plan generated:")
-    for a in actions:
-        print(f"  - {a}")
+        run_planner(args.instance, plan_file)
+        actions = extract_plan_actions(plan_file)
+        if not actions:
+            print("No actions found.")
+            return
 
-    print("Launching RDDLSim...")
-    sim_proc = start_simulator(DOMAIN_FILE, args.instance)
-    time.sleep(1)
+        print("Plan generated:")
+        for a in actions:
+            print(f"  - {a}")
+
+        print("Launching RDDLSim..." if args.simulator == "rddlsim" else "Starting embedded simulator...")
+        with start_simulator(DOMAIN_FILE, args.instance, args.simulator) as session:
+            print("Simulating plan step-by-step...")
+            failed = execute_plan(session, actions)
+            if failed is None:
+                print("Original plan executed successfully without failure.")
+                return
 
-    print("Simulating plan step-by-step...")
-    for step, action in enumerate(actions):
-        print(f"Step {step+1}: Executing action: {action}")
-        out = step_simulation(sim_proc, action)
-        if detect_task_failure(out):
             print("Failure detected during execution!")
-            sim_proc.kill()
-            modify_instance_to_avoid_failure(args.instance, ALT_INSTANCE, action)
-            print(f"Generated new instance: {ALT_INSTANCE}")
+            if args.repair:
+                repair_from_failure(session, args.instance, actions[:failed + 1], plan_file)
+                return
+
+            print("Generating new instance to avoid failure...")
+            alt_instance = derive_instance_avoiding_failure(args.instance, actions[failed])
+            print(f"Generated new instance: {alt_instance.name}")
             print("Replanning from new instance...")
-            run_planner(ALT_INSTANCE)
-            new_actions = extract_plan_actions()
+            with planner_pool.MemoryInstance(alt_instance.to_rddl(), alt_instance.name) as derived:
+                run_planner(derived, plan_file)
+            new_actions = extract_plan_actions(plan_file)
             print("New plan generated:")
             for a in new_actions:
                 print(f"  - {a}")
-            return
 
-    print("Original plan executed successfully without failure.")
+            # the running simulator switches to the derived instance, no new server is started
+            session.load(alt_instance)
+            print("Simulating new plan step-by-step...")
+            if execute_plan(session, new_actions) is None:
+                print("New plan executed successfully without failure.")
+            else:
+                print("New plan failed as well.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,122 @@
+# replan_speculation.py
+
+import logging
+import threading
+from collections import OrderedDict
+import planner_pool
+import prost_output
+
+# --- Configuration ---
+MAX_SPECULATIONS = 4  # replans planned or kept ahead of execution at any time
+
+
+class Speculation:
+    """One candidate failure: the derived instance and the planning job for it."""
+
+    def __init__(self, action, memory_instance, job):
+        self.action = action
+        self.memory_instance = memory_instance
+        self.job = job
+        # the planner has its own copy of the descriptor once it runs
+        job.add_done_callback(lambda _: memory_instance.close())
+
+
+class SpeculativeReplanner:
+    """
+    Plans the reactive replans of a plan before they are needed. Every
+    fetch_book of the plan can fail, and the instance to replan from only
+    depends on that action, so while the plan is executed the replans for its
+    fetch_book actions are derived and planned on the planner pool. On a
+    failure the plan for the failing action is taken from there (waiting for
+    it if it is still running); speculations of fetch_book actions that went
+    through are cancelled, which makes room for the next candidates.
+
+    :param derive: derive(instance_path, action) -> RDDLInstance or None, e.g.
+        reactive.derive_reactive_instance.
+    """
+
+    def __init__(self, domain_path, instance_path, derive, settings=planner_pool.PLANNER_ARGS,
+                 max_speculations=MAX_SPECULATIONS, pool=None):
+        self.domain_path = domain_path
+        self.instance_path = instance_path
+        self.derive = derive
+        self.settings = settings
+        self.max_speculations = max_speculations
+        self.pool = pool
+        self.pending = []
+        self.speculations = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def speculate(self, plan):
+        """Queue a replan for every distinct fetch_book of plan, in execution order."""
+        with self._lock:
+            for action in plan:
+                parsed = prost_output.parse_action(action)
+                if parsed is not None and parsed.name == "fetch_book" and action not in self.pending \
+                        and action not in self.speculations:
+                    self.pending.append(action)
+            self._fill()
+
+    def _fill(self):
+        """Start pending speculations while there is room (called with the lock held)."""
+        pool = self.pool or planner_pool.get_pool()
+        while self.pending and len(self.speculations) < self.max_speculations:
+            action = self.pending.pop(0)
+            instance = self.derive(self.instance_path, action)
+            if instance is None:
+                continue
+            memory_instance = planner_pool.MemoryInstance(instance.to_rddl(), instance.name)
+            job = pool.submit(self.domain_path, memory_instance, self.settings)
+            self.speculations[action] = Speculation(action, memory_instance, job)
+            logging.info(f"Speculating on a failure of {action}")
+
+    def discard(self, action, state=None):
+        """
+        action was executed without failure, so its replan will not be needed:
+        cancel it (killing the planner if it runs) and start the next candidate.
+        Can be passed as the per-step callback of reactive.simulate_plan.
+        """
+        with self._lock:
+            if action in self.pending:
+                self.pending.remove(action)
+            speculation = self.speculations.pop(action, None)
+            if speculation is not None:
+                speculation.job.kill()
+                self._fill()
+
+    def take(self, action, timeout=None):
+        """
+        Return the planner output of the replan for a failure of action, or
+        None if it was not speculated on or its planning failed (the caller
+        then replans itself). Blocks until a running speculation is done.
+        """
+        with self._lock:
+            speculation = self.speculations.pop(action, None)
+        if speculation is None:
+            self.misses += 1
+            return None
+        try:
+            output = speculation.job.result(timeout)
+        except Exception as e:
+            speculation.job.kill()
+            logging.warning(f"Speculative replan for {action} failed: {e!r}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return output
+
+    def cancel(self):
+        """Cancel everything that is still pending or running."""
+        with self._lock:
+            self.pending.clear()
+            speculations, self.speculations = list(self.speculations.values()), OrderedDict()
+        for speculation in speculations:
+            speculation.job.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel()
@@ -0,0 +1,59 @@
+# run_context.py
+
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# --- Configuration ---
+WORKSPACE_PREFIX = "explanation_planning_"
+WORKSPACE_ROOT = None  # None -> system temp directory
+
+
+class RunContext:
+    """
+    Private workspace of one planning job. Instance copies, derived instances,
+    planner logs and plan outputs of the job all live in a freshly allocated
+    directory, so several jobs can run at the same time without overwriting
+    each other's files. The directory is removed when the context is closed.
+    """
+
+    def __init__(self, name="run", root=WORKSPACE_ROOT, keep=False):
+        self.name = name
+        self.keep = keep
+        self.path = tempfile.mkdtemp(prefix=f"{WORKSPACE_PREFIX}{name}_", dir=root)
+        logging.info(f"Allocated workspace {self.path}")
+
+    def file(self, filename):
+        """Return the path of a file inside the workspace."""
+        return os.path.join(self.path, filename)
+
+    def copy_in(self, path):
+        """Copy an input file into the workspace and return the path of the copy."""
+        target = self.file(os.path.basename(path))
+        shutil.copyfile(path, target)
+        return target
+
+    def cleanup(self):
+        """Remove the workspace and everything in it (unless it should be kept)."""
+        if self.keep or self.path is None:
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+@contextmanager
+def use_context(ctx=None, name="run"):
+    """Yield ctx if the caller provided one, otherwise a new workspace that is cleaned up afterwards."""
+    if ctx is not None:
+        yield ctx
+        return
+    with RunContext(name) as owned:
+        yield owned
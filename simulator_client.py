@@ -0,0 +1,194 @@
+# simulator_client.py
+
+import logging
+import os
+import re
+import selectors
+import subprocess
+import time
+
+# --- Configuration ---
+STEP_TIMEOUT = 10.0  # seconds to wait for the answer to one action
+STARTUP_TIMEOUT = 60.0  # the first answer also waits for the server start-up
+FRAME_GRACE = 0.05  # quiet time after "state reward" that ends a response without separator
+SEPARATOR_PATTERN = re.compile(r"^\s*-{5,}\s*$")
+ATOM_PATTERN = re.compile(r"^\s*([A-Za-z_][\w-]*)\s*(?:\(([^)]*)\))?\s*[:=]\s*(\S+)\s*$")
+REWARD_PATTERN = re.compile(r"state reward\s*[:=]?\s*(-?[\d.]+(?:[eE][-+]?\d+)?)", re.IGNORECASE)
+
+
+class SimulatorClosed(RuntimeError):
+    """The simulator closed its output (exited) before answering."""
+
+
+def parse_value(text):
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def parse_state(lines):
+    """
+    Turn the lines of one simulator response into a state dict:
+    task_failed, task_completed (bools), robot_at ({robot: waypoint}), reward
+    (float or None), fluents ({(fluent, args): value} of every atom line) and
+    the raw lines.
+    """
+    fluents = {}
+    reward = None
+    for line in lines:
+        match = REWARD_PATTERN.search(line)
+        if match:
+            reward = float(match.group(1))
+            continue
+        match = ATOM_PATTERN.match(line)
+        if match:
+            args = tuple(a.strip() for a in (match.group(2) or "").split(",") if a.strip())
+            fluents[(match.group(1), args)] = parse_value(match.group(3))
+    robot_at = {args[0]: args[1] for (fluent, args), value in fluents.items()
+                if fluent == "robot_at" and len(args) == 2 and value is True}
+    return {
+        "task_failed": fluents.get(("task_failed", ())) is True,
+        "task_completed": fluents.get(("task_completed", ())) is True,
+        "robot_at": robot_at,
+        "reward": reward,
+        "fluents": fluents,
+        "lines": list(lines),
+    }
+
+
+class SimulatorClient:
+    """
+    Drives an interactive simulator process (RDDLSim's run-server.py or a
+    stand-in) that reads one action per line on stdin and answers with a state
+    block. The process output is read without blocking through a selector, so
+    a step returns as soon as its response is complete: at a line of dashes, or
+    when the output goes quiet after the "state reward" line. stderr is drained
+    alongside (and logged) so it can never fill up and stall the simulator.
+    """
+
+    def __init__(self, proc, startup_timeout=STARTUP_TIMEOUT):
+        self.proc = proc
+        self.startup_timeout = startup_timeout
+        self.steps = 0
+        self._buffers = {}
+        self._lines = []
+        self._closed = False
+        self._selector = selectors.DefaultSelector()
+        for stream in (proc.stdout, proc.stderr):
+            if stream is not None:
+                fd = stream.fileno()
+                os.set_blocking(fd, False)
+                self._selector.register(fd, selectors.EVENT_READ, stream is proc.stdout)
+                self._buffers[fd] = b""
+
+    @classmethod
+    def start(cls, command, startup_timeout=STARTUP_TIMEOUT, **popen_args):
+        """Start the simulator command with piped stdin/stdout/stderr and return a client for it."""
+        popen_args.setdefault("text", True)
+        proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                **popen_args)
+        return cls(proc, startup_timeout)
+
+    def _read(self, timeout):
+        """Wait up to timeout for output and split what arrived into complete stdout lines."""
+        for key, _ in self._selector.select(timeout):
+            fd, is_stdout = key.fd, key.data
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                continue
+            if not data:
+                self._selector.unregister(fd)
+                if is_stdout:
+                    self._closed = True
+                continue
+            *lines, self._buffers[fd] = (self._buffers[fd] + data).split(b"\n")
+            for line in lines:
+                text = line.decode(errors="replace").rstrip("\r")
+                if is_stdout:
+                    self._lines.append(text)
+                else:
+                    logging.debug(f"[simulator] {text}")
+
+    def _take_frame(self):
+        """Pop one complete response (without its separator) from the lines read, or None."""
+        for i, line in enumerate(self._lines):
+            if SEPARATOR_PATTERN.match(line):
+                frame, self._lines = self._lines[:i], self._lines[i + 1:]
+                if any(l.strip() for l in frame):
+                    return frame
+                return self._take_frame()  # separator left over from the previous response
+        return None
+
+    def read_response(self, timeout=STEP_TIMEOUT):
+        """
+        Return the lines of the next response. Raises subprocess.TimeoutExpired
+        (with the partial response as output) if it is not complete in time and
+        SimulatorClosed if the simulator exits first.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            frame = self._take_frame()
+            if frame is not None:
+                return frame
+            if self._closed:
+                if any(l.strip() for l in self._lines):
+                    frame, self._lines = self._lines, []
+                    return frame
+                raise SimulatorClosed(f"Simulator exited (return code {self.proc.poll()})")
+            if any(REWARD_PATTERN.search(l) for l in self._lines):
+                # no separator is needed once the reward is there and nothing follows it
+                before = len(self._lines)
+                self._read(FRAME_GRACE)
+                if len(self._lines) == before and not self._closed:
+                    frame, self._lines = self._lines, []
+                    return frame
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.proc.args, timeout, output="\n".join(self._lines))
+            self._read(remaining)
+
+    def request(self, lines, timeout=STEP_TIMEOUT):
+        """Send lines to the simulator and return the lines of its response."""
+        if self.steps == 0:
+            timeout = max(timeout, self.startup_timeout)
+        try:
+            self.proc.stdin.write("".join(line + "\n" for line in lines))
+            self.proc.stdin.flush()
+        except BrokenPipeError:
+            raise SimulatorClosed(f"Simulator exited (return code {self.proc.poll()})")
+        response = self.read_response(timeout)
+        self.steps += 1
+        return response
+
+    def step(self, action, timeout=STEP_TIMEOUT):
+        """Send one action and return the parsed state the simulator answers with (see parse_state)."""
+        return parse_state(self.request([action], timeout))
+
+    def close(self):
+        """Stop the simulator process and release the selector."""
+        self._selector.close()
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        for stream in (self.proc.stdin, self.proc.stdout, self.proc.stderr):
+            if stream is not None:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
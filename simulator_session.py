@@ -0,0 +1,263 @@
+# simulator_session.py
+
+import atexit
+import logging
+import os
+import re
+import subprocess
+import threading
+import planner_pool
+import rddl_model
+import rddl_rewrite
+import rddl_simulator
+import run_context
+import simulator_client
+
+# --- Configuration ---
+PING_TIMEOUT = 2.0
+SPARE_SERVER = True  # keep a second RDDLSim server up on the loaded instance, for the next load/reset of it
+DOMAIN_PATTERN = re.compile(r"^\s*domain\s+[\w-]+\s*\{", re.MULTILINE)
+
+
+def resume_instance(instance, state):
+    """
+    Copy of instance whose init-state is the observed state (the true state
+    fluents of a step result), so simulating or planning it continues from
+    where execution stopped.
+    """
+    return rddl_rewrite.apply_edits(instance.copy(), [rddl_rewrite.set_init_state(rddl_simulator.state_atoms(state))])
+
+
+def benchmark_dir(command):
+    """The benchmark directory ('-b') an RDDLSim server command reads its instances from, or None."""
+    command = list(command or ())
+    if "-b" in command[:-1]:
+        return command[command.index("-b") + 1] or os.curdir
+    return None
+
+
+def server_command(command, directory):
+    """command with its benchmark directory ('-b') replaced by directory."""
+    command = list(command)
+    if "-b" in command[:-1]:
+        command[command.index("-b") + 1] = directory
+        return command
+    return command + ["-b", directory]
+
+
+def domain_files(directory):
+    """The .rddl files of directory that hold a domain."""
+    paths = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith(".rddl") and os.path.isfile(path):
+            with open(path, "r") as f:
+                if DOMAIN_PATTERN.search(f.read()):
+                    paths.append(path)
+    return paths
+
+
+class SimulatorSession:
+    """
+    A simulator that stays up across plans and replans. The backend (the
+    embedded simulator or an RDDLSim process) is started once; switching to
+    another instance or back to the initial state goes through load()/reset()
+    instead of a new server, as long as the process speaks the session
+    commands ('#load', '#reset', '#ping'; control=None means "only if it is
+    fake_rddlsim.py").
+
+    The real RDDLSim server does not: it reads its instances from its
+    benchmark directory ('-b') when it starts, and cannot go back to the
+    initial state. The session runs it on a private workspace holding the
+    domain and the loaded instance (see _write_workspace). Loading the
+    instance that is already loaded reuses a server that has not been
+    stepped yet, or swaps in a spare server that was started on it in the
+    background (SPARE_SERVER, unless the command has a fixed port '-p'); only
+    a new instance restarts the server.
+    """
+
+    def __init__(self, backend=rddl_simulator.BACKENDS[0], command=None, control=None, seed=None):
+        if backend not in rddl_simulator.BACKENDS:
+            raise ValueError(f"Unknown simulator backend '{backend}', expected one of {rddl_simulator.BACKENDS}")
+        self.backend = backend
+        self.command = command
+        self.control = control if control is not None else bool(command) and planner_pool.FAKE_RDDLSIM in command
+        self.seed = seed
+        self.simulator = None
+        self.instance = None
+        self.state = None
+        self.starts = 0
+        self.spare = None
+        self.domain_path = None
+        self.workspace = None
+        self.served_text = None
+        self._lock = threading.RLock()
+
+    def _start_client(self):
+        command = self.command if self.control else server_command(self.command, self.workspace.path)
+        client = simulator_client.SimulatorClient.start(command)
+        self.starts += 1
+        logging.info(f"Simulator session started {command[:2]} (pid {client.proc.pid})")
+        return client
+
+    def _start_process(self):
+        self.simulator = self._start_client()
+
+    def _instance_model(self, instance, domain_path=None):
+        if isinstance(instance, rddl_model.RDDLInstance):
+            return instance
+        return rddl_model.cached_instance(os.fspath(instance), domain_path)
+
+    def _write_workspace(self, text, domain_path=None):
+        """
+        Make the workspace the benchmark directory of an RDDLSim server on the
+        instance text: a fresh RunContext with the domain (domain_path, or the
+        domain files of the command's '-b' directory) and the instance. Being
+        private, it cannot clash with the files of any other instance.
+        """
+        self.domain_path = domain_path or self.domain_path
+        if self.workspace is not None:
+            self.workspace.cleanup()
+        self.workspace = run_context.RunContext("simulator_session")
+        if self.domain_path is not None:
+            self.workspace.copy_in(self.domain_path)
+        else:
+            for path in domain_files(benchmark_dir(self.command) or os.curdir):
+                self.workspace.copy_in(path)
+        with open(self.workspace.file("instance.rddl"), "w") as f:
+            f.write(text)
+        self.served_text = text
+
+    def _close_servers(self):
+        for client in (self.simulator, self.spare):
+            if client is not None:
+                client.close()
+        self.simulator = self.spare = None
+
+    def _load_server(self, model, domain_path=None):
+        """Put an RDDLSim server (without session commands) on model, restarting it only if it has to."""
+        text = model.to_rddl()
+        spare_alive = self.spare is not None and self.spare.proc.poll() is None
+        if text == self.served_text and self.is_alive() and not self.simulator.steps:
+            logging.info(f"Simulator session reuses the fresh server on {model.name}")
+        elif text == self.served_text and spare_alive:
+            if self.simulator is not None:
+                self.simulator.close()
+            self.simulator, self.spare = self.spare, None
+            logging.info(f"Simulator session swapped in the spare server on {model.name}")
+        else:
+            self._close_servers()
+            self._write_workspace(text, domain_path)
+            self._start_process()
+            logging.info(f"Simulator session restarted on {model.name}")
+        if SPARE_SERVER and self.spare is None and "-p" not in self.command:
+            self.spare = self._start_client()
+
+    def load(self, instance, resume=False, domain_path=None, timeout=simulator_client.STEP_TIMEOUT):
+        """
+        Continue with instance (a path or an RDDLInstance) from its initial state,
+        or with resume=True from the state the session is in now (the instance's
+        init-state is replaced by it). Returns the state the session starts from;
+        None with the real RDDLSim server, which only reports a state once it is
+        stepped.
+        """
+        with self._lock:
+            model = self._instance_model(instance, domain_path)
+            if resume and self.state is not None:
+                model = resume_instance(model, self.state)
+            self.instance = model
+            if self.backend == "embedded":
+                if self.simulator is None:
+                    self.simulator = rddl_simulator.EmbeddedSimulator(model, self.seed)
+                else:
+                    self.simulator.load(model)
+                self.state = self.simulator.observe()
+            elif self.control:
+                if self.simulator is None or not self.is_alive():
+                    self._start_process()
+                self.state = simulator_client.parse_state(
+                    self.simulator.request(["#load", model.to_rddl().rstrip("\n"), "#end"], timeout))
+            else:
+                self._load_server(model, domain_path)
+                self.state = None
+            return self.state
+
+    def reset(self, timeout=simulator_client.STEP_TIMEOUT):
+        """Back to the initial state of the current instance."""
+        with self._lock:
+            if self.backend == "embedded" and self.simulator is not None:
+                self.simulator.reset()
+                self.state = self.simulator.observe()
+            elif self.control and self.simulator is not None and self.is_alive():
+                self.state = simulator_client.parse_state(self.simulator.request(["#reset"], timeout))
+            elif self.instance is None:
+                raise RuntimeError("No instance loaded in the simulator session")
+            else:
+                return self.load(self.instance)
+            return self.state
+
+    def step(self, action, timeout=simulator_client.STEP_TIMEOUT):
+        """Execute one action and return the resulting state."""
+        with self._lock:
+            if self.simulator is None:
+                raise RuntimeError("No instance loaded in the simulator session")
+            self.state = self.simulator.step(action, timeout)
+            return self.state
+
+    def is_alive(self):
+        """The backend can still be used (the embedded simulator always can)."""
+        if self.backend == "embedded":
+            return self.simulator is not None
+        return self.simulator is not None and self.simulator.proc.poll() is None
+
+    def ping(self, timeout=PING_TIMEOUT):
+        """Health check: the backend is alive and, if it speaks the session commands, answers."""
+        with self._lock:
+            if not self.is_alive():
+                return False
+            if self.backend == "embedded" or not self.control:
+                return True
+            try:
+                return self.simulator.request(["#ping"], timeout) == ["pong"]
+            except (subprocess.TimeoutExpired, simulator_client.SimulatorClosed):
+                return False
+
+    def ensure_alive(self):
+        """Restart a dead or unresponsive backend and put it back into the last observed state."""
+        with self._lock:
+            if self.ping():
+                return False
+            logging.warning("Simulator session is not responding, restarting it")
+            if self.simulator is not None:
+                self.simulator.close()
+            self.simulator = None
+            if self.instance is not None:
+                self.load(self.instance, resume=self.state is not None)
+            return True
+
+    def close(self):
+        with self._lock:
+            self._close_servers()
+            if self.workspace is not None:
+                self.workspace.cleanup()
+            self.workspace = self.served_text = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(backend, command=None, seed=None):
+    """Return the process-wide session for a backend and command, creating it on first use."""
+    key = (backend, tuple(command or ()))
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = SimulatorSession(backend, command, seed=seed)
+            atexit.register(_sessions[key].close)
+        return _sessions[key]
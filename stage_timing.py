@@ -0,0 +1,37 @@
+# stage_timing.py
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Stages the strategy pipelines report
+STAGES = ("derivation", "planner", "parse", "simulation", "verbalization")
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block as one pipeline stage. The time is added to the collector of
+    the current thread, if any; without a collector this costs two clock reads.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times = getattr(_local, "times", None)
+        if times is not None:
+            times[name] = times.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def collect():
+    """Collect the stage times of the current thread into the yielded dict (seconds per stage)."""
+    previous = getattr(_local, "times", None)
+    _local.times = OrderedDict((name, 0.0) for name in STAGES)
+    try:
+        yield _local.times
+    finally:
+        _local.times = previous
@@ -0,0 +1,108 @@
+# test_plan_cache.py
+
+import os
+from concurrent.futures import Future
+import plan_cache
+import planner_pool
+
+DOMAINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domains")
+DOMAIN_FILE = os.path.join(DOMAINS_DIR, "domain.rddl")
+INSTANCE_FILE = os.path.join(DOMAINS_DIR, "instance_failure_probability.rddl")
+OUTPUT = "** Actions received: [fetch_book(tiago, b1, h1);]\n>>> END OF ROUND 1 -- REWARD: 0.0\n"
+
+
+class RecordingPool:
+    """Stands in for the planner pool: answers every job with a fixed output and counts the jobs."""
+
+    def __init__(self, planner_script="prost.sh", output=OUTPUT):
+        self.planner_script = planner_script
+        self.prost_client = "prost.py"
+        self.output = output
+        self.jobs = 0
+
+    def submit(self, domain, instance, settings, check=False, timeout=None):
+        self.jobs += 1
+        future = Future()
+        future.set_result(self.output)
+        return future
+
+
+def test_normalize_rddl_ignores_formatting():
+    assert plan_cache.normalize_rddl("a  b // comment\n\tc;\n") == "a b c;"
+
+
+def test_plan_key():
+    key = plan_cache.plan_key("domain", "instance { x; }", "[PROST]", None, "prost")
+    assert plan_cache.plan_key("domain", "instance {\n    x;   // note\n}", "[PROST]", None, "prost") == key
+    assert plan_cache.plan_key("domain", "instance { y; }", "[PROST]", None, "prost") != key
+    assert plan_cache.plan_key("domain", "instance { x; }", "[PROST -s 2]", None, "prost") != key
+    assert plan_cache.plan_key("domain", "instance { x; }", "[PROST]", 1, "prost") != key
+    assert plan_cache.plan_key("domain", "instance { x; }", "[PROST]", None, "fake_prost") != key
+
+
+def test_planner_identity_tells_planners_apart():
+    assert plan_cache.planner_identity(RecordingPool("prost.sh")) != plan_cache.planner_identity(RecordingPool("fake_prost.py"))
+
+
+def test_read_source():
+    assert plan_cache.read_source(None) == ""
+    with open(INSTANCE_FILE) as f:
+        assert plan_cache.read_source(INSTANCE_FILE) == f.read()
+    with planner_pool.MemoryInstance("instance text", "memory") as memory_instance:
+        assert plan_cache.read_source(memory_instance) == "instance text"
+    assert plan_cache.read_source("no_such_instance") is None
+
+
+def test_memory_level_is_lru():
+    cache = plan_cache.PlanCache(cache_dir=None, max_entries=2)
+    cache.put("a", "output a")
+    cache.put("b", "output b")
+    assert cache.get("a") == "output a"
+    cache.put("c", "output c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "output a"
+    assert cache.stats() == {"hits": 2, "disk_hits": 0, "misses": 1, "memory_entries": 2}
+
+
+def test_disk_level_survives_the_memory_level(tmp_path):
+    cache_dir = str(tmp_path / "plans")
+    plan_cache.PlanCache(cache_dir).put("a", "output a")
+    cache = plan_cache.PlanCache(cache_dir)
+    assert cache.get("a") == "output a"
+    assert cache.stats()["disk_hits"] == 1
+    cache.clear()
+    assert cache.get("a") is None
+    assert os.listdir(cache_dir) == []
+
+
+def test_disk_level_is_capped(tmp_path):
+    cache_dir = str(tmp_path / "plans")
+    cache = plan_cache.PlanCache(cache_dir, max_disk_bytes=15)
+    cache.put("a", "x" * 10)
+    os.utime(os.path.join(cache_dir, "a.log"), (0, 0))
+    cache.put("b", "y" * 10)
+    assert os.listdir(cache_dir) == ["b.log"]
+
+
+def test_submit_cached_plans_once(tmp_path, monkeypatch):
+    pool = RecordingPool()
+    monkeypatch.setattr(planner_pool, "get_pool", lambda: pool)
+    monkeypatch.setattr(plan_cache, "_default_cache", plan_cache.PlanCache(str(tmp_path / "plans")))
+
+    assert plan_cache.run_planner_cached(DOMAIN_FILE, INSTANCE_FILE) == OUTPUT
+    assert plan_cache.run_planner_cached(DOMAIN_FILE, INSTANCE_FILE) == OUTPUT
+    assert pool.jobs == 1
+    # an instance known only by a name that resolves to no file is never cached
+    plan_cache.run_planner_cached(None, "no_such_instance")
+    plan_cache.run_planner_cached(None, "no_such_instance")
+    assert pool.jobs == 3
+
+
+def test_failed_runs_are_not_cached(tmp_path, monkeypatch):
+    pool = RecordingPool(output="planner crashed\n")
+    monkeypatch.setattr(planner_pool, "get_pool", lambda: pool)
+    monkeypatch.setattr(plan_cache, "_default_cache", plan_cache.PlanCache(str(tmp_path / "plans")))
+
+    plan_cache.run_planner_cached(DOMAIN_FILE, INSTANCE_FILE)
+    plan_cache.run_planner_cached(DOMAIN_FILE, INSTANCE_FILE)
+    assert pool.jobs == 2
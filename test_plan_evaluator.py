@@ -0,0 +1,71 @@
+# test_plan_evaluator.py
+
+import os
+import pytest
+import plan_evaluator
+import rddl_model
+import rddl_rewrite
+
+DOMAINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domains")
+INSTANCE_FILE = os.path.join(DOMAINS_DIR, "instance_failure_probability.rddl")
+RESPONSE_PLAN = ["fetch_book(tiago, b1, h1)", "goto_waypoint(tiago, w2, w1)",
+                 "give_response(tiago, why_explanation, agent_error, b1, h1)"]
+DELIVERY_PLAN = ["fetch_book(tiago, b1, h1)", "goto_waypoint(tiago, w2, w1)", "give_book(tiago, b1, h1)"]
+# three steps of the plan and the step that completes the task earn REWARD_OTHERWISE, the other 11 of the horizon 15 REWARD_COMPLETED
+COMPLETED_REWARD = 4 * plan_evaluator.REWARD_OTHERWISE + 11 * plan_evaluator.REWARD_COMPLETED
+
+
+def evaluate(instance, plan, episodes=200):
+    return plan_evaluator.MonteCarloEvaluator(instance, seed=0).evaluate(plan, episodes)
+
+
+def test_certain_failure_is_answered_with_a_response():
+    # prob_failure and prob_response are 1.0: every episode fails and is completed by the response
+    result = evaluate(rddl_model.load_instance(INSTANCE_FILE), RESPONSE_PLAN)
+    assert result.expected_reward == (COMPLETED_REWARD, COMPLETED_REWARD, COMPLETED_REWARD)
+    for rate in (result.completion_rate, result.task_failure_rate, result.failures["agent_error"],
+                 result.responses_triggered["why_explanation"], result.responses_given["why_explanation"]):
+        assert rate.mean == 1.0
+
+
+def test_certain_failure_blocks_the_delivery():
+    result = evaluate(rddl_model.load_instance(INSTANCE_FILE), DELIVERY_PLAN)
+    assert result.completion_rate.mean == 0.0
+    assert result.task_failure_rate.mean == 1.0
+    assert result.expected_reward.mean == 15 * plan_evaluator.REWARD_OTHERWISE
+
+
+def test_no_failure_delivers_the_book():
+    instance = rddl_rewrite.apply_edits(rddl_model.load_instance(INSTANCE_FILE), [
+        rddl_rewrite.set_probability("prob_failure", ("b1", "agent_error"), 0.0)])
+    result = evaluate(instance, DELIVERY_PLAN)
+    assert result.expected_reward.mean == COMPLETED_REWARD
+    assert result.completion_rate.mean == 1.0
+    assert result.task_failure_rate.mean == 0.0
+    assert result.failures["agent_error"].mean == 0.0
+    assert result.responses_given["why_explanation"].mean == 0.0
+
+
+def test_failure_rate_matches_the_probability():
+    result = plan_evaluator.evaluate_plan(os.path.join(DOMAINS_DIR, "instance_failure_probability_alternative.rddl"),
+                                          DELIVERY_PLAN, episodes=2000, seed=0)
+    failures = result.failures["agent_error"]
+    assert failures.low <= 0.2 <= failures.high
+    assert result.completion_rate.mean == pytest.approx(1.0 - result.task_failure_rate.mean, abs=0.05)
+
+
+def test_rate_estimate_interval():
+    estimate = plan_evaluator.rate_estimate(0, 100)
+    assert estimate.mean == 0.0 and estimate.low == 0.0 and 0.0 < estimate.high < 0.05
+    estimate = plan_evaluator.rate_estimate(50, 100)
+    assert estimate.low < 0.5 < estimate.high
+
+
+def test_unknown_actions_and_objects_are_rejected():
+    evaluator = plan_evaluator.MonteCarloEvaluator(rddl_model.load_instance(INSTANCE_FILE))
+    with pytest.raises(ValueError):
+        evaluator.evaluate(["fly(tiago, w1)"], episodes=1)
+    with pytest.raises(ValueError):
+        evaluator.evaluate(["fetch_book(tiago, b9, h1)"], episodes=1)
+    with pytest.raises(ValueError):
+        evaluator.evaluate(["fetch_book(tiago, b1)"], episodes=1)
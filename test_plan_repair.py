@@ -0,0 +1,65 @@
+# test_plan_repair.py
+
+import os
+import plan_repair
+import planner_pool
+import rddl_model
+import rddl_simulator
+
+DOMAINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domains")
+DOMAIN_FILE = os.path.join(DOMAINS_DIR, "domain.rddl")
+INSTANCE_FILE = os.path.join(DOMAINS_DIR, "instance_failure_probability.rddl")
+PREFIX = ["fetch_book(tiago, b1, h1)", "goto_waypoint(tiago, w2, w1)"]
+SUFFIX_OUTPUT = """\
+** Actions received: [give_response(tiago, why_explanation, agent_error, b1, h1);]
+** Actions received: [noop();]
+>>> END OF ROUND 1 -- REWARD: 1300.0
+** Actions received: [give_response(tiago, why_explanation, agent_error, b1, h1);]
+>>> END OF ROUND 2 -- REWARD: 1300.0
+"""
+
+
+def executed_state(instance, prefix):
+    simulator = rddl_simulator.EmbeddedSimulator(instance, seed=0)
+    state = None
+    for action in prefix:
+        state = simulator.step(action)
+    return state
+
+
+def test_repair_instance_starts_from_the_observed_state():
+    instance = rddl_model.load_instance(INSTANCE_FILE)
+    repaired = plan_repair.repair_instance(instance, executed_state(instance, PREFIX), len(PREFIX))
+
+    assert repaired.name == "instance_failure_probability" + plan_repair.REPAIR_SUFFIX
+    assert repaired.horizon == instance.horizon - len(PREFIX)
+    assert repaired.init_state[("robot_at", ("tiago", "w1"))] is True
+    assert repaired.init_state[("failure_occurred", ("b1", "tiago", "h1", "agent_error"))] is True
+    assert repaired.init_state[("response_triggered", ("why_explanation", "agent_error"))] is True
+    assert ("robot_at", ("tiago", "w2")) not in repaired.init_state
+    # the original model is left as it was, and the repair instance can be written out for the planner
+    assert instance.init_state == {("robot_at", ("tiago", "w2")): True}
+    assert rddl_model.parse_instance(repaired.to_rddl()).init_state == repaired.init_state
+
+
+def test_repair_horizon_never_runs_out():
+    instance = rddl_model.load_instance(INSTANCE_FILE)
+    state = executed_state(instance, PREFIX)
+    assert plan_repair.repair_instance(instance, state, 40).horizon == plan_repair.MIN_HORIZON
+
+
+def test_repair_plan_splices_one_round_onto_the_prefix(monkeypatch):
+    planned = []
+
+    def run_planner(domain, instance, settings, timeout=None):
+        planned.append(rddl_model.parse_instance(instance.text))
+        return SUFFIX_OUTPUT
+
+    monkeypatch.setattr(planner_pool, "run_planner", run_planner)
+    instance = rddl_model.load_instance(INSTANCE_FILE)
+    result = plan_repair.repair_plan(DOMAIN_FILE, instance, executed_state(instance, PREFIX), PREFIX)
+
+    assert result.suffix == ["give_response(tiago, why_explanation, agent_error, b1, h1)"]
+    assert result.plan == PREFIX + result.suffix
+    assert result.prefix == PREFIX
+    assert planned[0].init_state == result.instance.init_state
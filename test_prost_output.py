@@ -0,0 +1,62 @@
+# test_prost_output.py
+
+import io
+import prost_output
+
+TWO_ROUNDS = [
+    "Remaining time: 10s\n",
+    "** Actions received: [fetch_book(tiago, b1, h1);]\n",
+    "** Actions received: [noop();]\n",
+    "** Actions received: [goto_waypoint(tiago, w2, w1);]\n",
+    ">>> END OF ROUND 1 -- REWARD: -20.0\n",
+    "** Actions received: [goto_waypoint(tiago, w2, w1);]\n",
+    "** Actions received: []\n",
+    ">>> END OF ROUND 2 -- REWARD: 80.0\n",
+]
+
+
+def test_parse_action():
+    action = prost_output.parse_action("give_response(tiago, why_explanation, agent_error, b1, h1)", 3)
+    assert action == prost_output.PlannedAction(3, "give_response", ("tiago", "why_explanation", "agent_error", "b1", "h1"))
+    assert str(action) == "give_response(tiago, why_explanation, agent_error, b1, h1)"
+    assert prost_output.parse_action("noop()").args == ()
+    assert prost_output.parse_action("no action here") is None
+
+
+def test_iter_actions_indexes_records_and_skips_noops():
+    actions = list(prost_output.iter_actions(TWO_ROUNDS))
+    assert [(a.record, a.name) for a in actions] == [
+        (0, "fetch_book"), (2, "goto_waypoint"), (3, "goto_waypoint")]
+    assert len(list(prost_output.iter_actions(TWO_ROUNDS, skip_noop=False))) == 4
+
+
+def test_iter_rounds_splits_at_round_end():
+    rounds = list(prost_output.iter_rounds(TWO_ROUNDS))
+    assert [[str(a) for a in r] for r in rounds] == [
+        ["fetch_book(tiago, b1, h1)", "goto_waypoint(tiago, w2, w1)"],
+        ["goto_waypoint(tiago, w2, w1)"],
+    ]
+
+
+def test_action_strings_is_one_round():
+    assert prost_output.action_strings(TWO_ROUNDS) == ["goto_waypoint(tiago, w2, w1)"]
+    # output without round markers is a single round
+    assert prost_output.action_strings(TWO_ROUNDS[:4]) == ["fetch_book(tiago, b1, h1)", "goto_waypoint(tiago, w2, w1)"]
+    assert prost_output.action_strings([]) == []
+
+
+def test_round_tracker_keeps_best_round():
+    tracker = prost_output.RoundTracker()
+    for line in TWO_ROUNDS[:3]:
+        tracker.feed(line)
+    assert [a.name for a in tracker.best_plan()] == ["fetch_book"]
+    for line in TWO_ROUNDS[3:]:
+        tracker.feed(line)
+    assert tracker.rounds_completed == 2
+    assert tracker.records == 5
+    assert tracker.best_reward == 80.0
+    assert [str(a) for a in tracker.best_plan()] == ["goto_waypoint(tiago, w2, w1)"]
+
+
+def test_iter_lines_reads_a_stream():
+    assert list(prost_output.iter_lines(io.StringIO("a\nb\n"))) == ["a\n", "b\n"]
@@ -0,0 +1,83 @@
+# test_rddl_model.py
+
+import glob
+import os
+import pytest
+import rddl_model
+
+DOMAINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domains")
+DOMAIN_FILE = os.path.join(DOMAINS_DIR, "domain.rddl")
+INSTANCE_FILES = sorted(glob.glob(os.path.join(DOMAINS_DIR, "instance_*.rddl")))
+
+
+def model_fields(instance):
+    return (instance.name, instance.domain_name, instance.non_fluents_name, instance.objects,
+            instance.non_fluents, instance.init_state, instance.max_nondef_actions, instance.horizon,
+            instance.discount, instance.failure_table, instance.response_table)
+
+
+def test_tokenize_keeps_signed_numbers_and_drops_comments():
+    assert rddl_model.tokenize("p(?b) = -0.5; q = 1e-3; // comment") == [
+        "p", "(", "?b", ")", "=", "-0.5", ";", "q", "=", "1e-3", ";"]
+
+
+def test_parse_and_format_value():
+    assert rddl_model.parse_value("true") is True
+    assert rddl_model.parse_value("false") is False
+    assert rddl_model.parse_value("15") == 15
+    assert rddl_model.parse_value("-0.25") == -0.25
+    assert rddl_model.parse_value("w1") == "w1"
+    assert [rddl_model.format_value(v) for v in (True, False, 0.5)] == ["true", "false", "0.5"]
+
+
+def test_load_domain():
+    domain = rddl_model.load_domain(DOMAIN_FILE)
+    assert domain.name == "explanation_planning"
+    assert {"robot", "human", "book", "waypoint", "failure", "response"} <= set(domain.types)
+    assert domain.pvariables["prob_failure"].params == ("book", "failure")
+    assert domain.default("prob_failure") == 0.5
+
+
+@pytest.mark.parametrize("path", INSTANCE_FILES, ids=os.path.basename)
+def test_bundled_instances_round_trip(path):
+    domain = rddl_model.load_domain(DOMAIN_FILE)
+    instance = rddl_model.load_instance(path, domain)
+    assert instance.name == os.path.splitext(os.path.basename(path))[0]
+    assert instance.horizon == 15
+    reparsed = rddl_model.parse_instance(instance.to_rddl(), domain)
+    assert model_fields(reparsed) == model_fields(instance)
+
+
+def test_tables_follow_the_non_fluents():
+    instance = rddl_model.load_instance(os.path.join(DOMAINS_DIR, "instance_failure_probability.rddl"))
+    assert instance.wanted_books() == {"h1": "b1"}
+    assert instance.failure_probability("b1", "agent_error") == 1.0
+    # unset entries fall back to the domain default
+    assert instance.failure_probability("b2", "agent_error") == rddl_model.DEFAULT_NON_FLUENTS["prob_failure"]
+
+    clone = instance.copy()
+    clone.set_non_fluent("prob_failure", ("b1", "agent_error"), 0.25)
+    assert clone.failure_probability("b1", "agent_error") == 0.25
+    assert instance.failure_probability("b1", "agent_error") == 1.0
+
+
+def test_unknown_block_is_a_parse_error():
+    with pytest.raises(rddl_model.RDDLParseError):
+        rddl_model.parse_rddl("problem p { };")
+
+
+def test_model_cache_reparses_changed_files(tmp_path):
+    path = tmp_path / "instance.rddl"
+    text = open(INSTANCE_FILES[0]).read()
+    path.write_text(text)
+    cache = rddl_model.ModelCache()
+
+    first = cache.instance(str(path))
+    assert cache.instance(str(path)) is first
+    assert cache.stats()["hits"] == 1
+
+    path.write_text(text.replace("horizon = 15", "horizon = 20"))
+    os.utime(path, ns=(0, 0))
+    changed = cache.instance(str(path))
+    assert changed is not first
+    assert changed.horizon == 20
@@ -0,0 +1,76 @@
+# test_rddl_prune.py
+
+import glob
+import os
+import pytest
+import plan_evaluator
+import planner_pool
+import rddl_model
+import rddl_prune
+import rddl_rewrite
+
+DOMAINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domains")
+INSTANCE_FILE = os.path.join(DOMAINS_DIR, "instance_failure_probability.rddl")
+PLAN = ["fetch_book(tiago, b1, h1)", "goto_waypoint(tiago, w2, w1)",
+        "give_response(tiago, why_explanation, agent_error, b1, h1)"]
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(DOMAINS_DIR, "instance_*.rddl"))), ids=os.path.basename)
+def test_pruning_invariants(path):
+    instance = rddl_model.load_instance(path)
+    result = rddl_prune.prune_instance(instance)
+    reduced = result.instance
+    dropped = {name for names in result.removed.values() for name in names}
+
+    for type_name, names in instance.objects.items():
+        kept = reduced.objects_of(type_name)
+        assert kept, f"every type keeps an object, {type_name} has none"
+        assert set(kept) | set(result.removed.get(type_name, [])) == set(names)
+    assert not any(a in dropped for _, args in reduced.non_fluents for a in args)
+    assert not any(a in dropped for _, args in reduced.init_state for a in args)
+    assert reduced.wanted_books() == instance.wanted_books()
+    # the original model is left as it was
+    assert instance.objects == rddl_model.load_instance(path).objects
+
+
+def test_prune_removes_unused_groundings():
+    result = rddl_prune.prune_instance(rddl_model.load_instance(os.path.join(DOMAINS_DIR, "instance_failures_responses.rddl")))
+    assert result.pruned
+    assert result.removed["book"] == ["b2"]
+    assert result.instance.objects_of("response") == ["why_explanation"]
+    assert result.removed["failure"] == []
+
+
+def test_objects_in_the_init_state_are_kept():
+    instance = rddl_rewrite.apply_edits(rddl_model.load_instance(INSTANCE_FILE),
+                                        [rddl_rewrite.add_init_fluent("book_fetched", ("b2", "tiago", "h1"))])
+    result = rddl_prune.prune_instance(instance)
+    assert not result.pruned
+    assert result.instance.objects_of("book") == ["b1", "b2"]
+
+
+def test_pruned_instance_has_the_same_outcome():
+    instance = rddl_model.load_instance(INSTANCE_FILE)
+    result = rddl_prune.prune_instance(instance)
+    original = plan_evaluator.MonteCarloEvaluator(instance, seed=1).evaluate(PLAN, episodes=200)
+    reduced = plan_evaluator.MonteCarloEvaluator(result.instance, seed=1).evaluate(PLAN, episodes=200)
+    assert reduced.expected_reward == original.expected_reward
+    assert reduced.completion_rate == original.completion_rate
+    assert result.restore_plan(PLAN) == PLAN
+
+
+def test_restore_plan_and_rates():
+    result = rddl_prune.prune_instance(rddl_model.load_instance(INSTANCE_FILE))
+    with pytest.raises(ValueError):
+        result.restore_plan(["fetch_book(tiago, b3, h1)"])
+    assert result.restore_rates("book", {"b1": 0.5}) == {"b1": 0.5, "b2": 0.0}
+
+
+def test_planner_instance():
+    memory_instance = rddl_prune.planner_instance(INSTANCE_FILE)
+    with memory_instance:
+        assert isinstance(memory_instance, planner_pool.MemoryInstance)
+        assert rddl_model.parse_instance(memory_instance.text).objects_of("book") == ["b1"]
+    alternative = os.path.join(DOMAINS_DIR, "instance_failure_probability_alternative.rddl")
+    assert rddl_prune.planner_instance(alternative) == alternative
+    assert rddl_prune.planner_instance("instance_by_name") == "instance_by_name"
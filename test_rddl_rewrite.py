@@ -0,0 +1,51 @@
+# test_rddl_rewrite.py
+
+import os
+import rddl_model
+import rddl_rewrite
+
+INSTANCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domains", "instance_failure_probability.rddl")
+
+
+def test_edits_update_the_model():
+    instance = rddl_model.load_instance(INSTANCE_FILE)
+    rddl_rewrite.apply_edits(instance, [
+        rddl_rewrite.set_probability("prob_failure", ("b1", "agent_error"), "0.2"),
+        rddl_rewrite.add_init_fluent("book_fetched", ("b1", "tiago", "h1")),
+        rddl_rewrite.MoveRobot("tiago", "w1"),
+        rddl_rewrite.RenameInstance("instance_failure_probability", "derived"),
+        rddl_rewrite.RenameNonFluents("other_name", "not_applied"),
+        rddl_rewrite.SetHorizon(5),
+    ])
+    assert instance.failure_probability("b1", "agent_error") == 0.2
+    assert instance.init_state == {
+        ("book_fetched", ("b1", "tiago", "h1")): True,
+        ("robot_at", ("tiago", "w1")): True,
+    }
+    assert instance.name == "derived"
+    assert instance.non_fluents_name == "nf_instance_failure_probability"
+    assert instance.horizon == 5
+
+
+def test_set_init_state_replaces_the_init_state():
+    instance = rddl_model.load_instance(INSTANCE_FILE)
+    rddl_rewrite.apply_edits(instance, [rddl_rewrite.set_init_state({("robot_at", ("tiago", "w1")): True})])
+    assert list(instance.init_state.items()) == [(("robot_at", ("tiago", "w1")), True)]
+
+
+def test_derive_instance_leaves_the_cached_model_alone():
+    derived = rddl_rewrite.derive_instance(INSTANCE_FILE, [rddl_rewrite.SetHorizon(3)])
+    assert derived.horizon == 3
+    assert rddl_model.cached_instance(INSTANCE_FILE).horizon == 15
+
+
+def test_rewrite_instance_writes_a_parsable_file(tmp_path):
+    output_path = str(tmp_path / "derived.rddl")
+    written = rddl_rewrite.rewrite_instance(INSTANCE_FILE, output_path, [
+        rddl_rewrite.set_probability("prob_failure", ("b1", "agent_error"), 0.0),
+        rddl_rewrite.RenameInstance(None, "derived"),
+    ])
+    reparsed = rddl_model.load_instance(output_path)
+    assert reparsed.name == "derived"
+    assert reparsed.failure_table == written.failure_table
+    assert reparsed.failure_probability("b1", "agent_error") == 0.0